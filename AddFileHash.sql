@@ -0,0 +1,31 @@
+USE [QualityShareData]
+GO
+
+-- Adds the content hash column (and its index) to the existing measurement tables.
+-- The importers write the hash of the source file with every row and skip files whose content
+-- was already imported under another path (a copy on another share, a moved folder).
+-- Safe to re-run. New tables get the column from their Create*.sql scripts.
+
+IF OBJECT_ID('dbo.CMM_Measurements', 'U') IS NOT NULL AND COL_LENGTH('dbo.CMM_Measurements', 'FileHash') IS NULL
+    ALTER TABLE [dbo].[CMM_Measurements] ADD [FileHash] [varchar](40) NULL;
+IF OBJECT_ID('dbo.CMM_Files', 'U') IS NOT NULL AND COL_LENGTH('dbo.CMM_Files', 'FileHash') IS NULL
+    ALTER TABLE [dbo].[CMM_Files] ADD [FileHash] [varchar](40) NULL;
+IF OBJECT_ID('dbo.SurfcomMeasurements', 'U') IS NOT NULL AND COL_LENGTH('dbo.SurfcomMeasurements', 'file_hash') IS NULL
+    ALTER TABLE [dbo].[SurfcomMeasurements] ADD [file_hash] [varchar](40) NULL;
+IF OBJECT_ID('dbo.Surfcom_CamHousing_Assy', 'U') IS NOT NULL AND COL_LENGTH('dbo.Surfcom_CamHousing_Assy', 'file_hash') IS NULL
+    ALTER TABLE [dbo].[Surfcom_CamHousing_Assy] ADD [file_hash] [varchar](40) NULL;
+GO
+
+IF COL_LENGTH('dbo.CMM_Measurements', 'FileHash') IS NOT NULL
+   AND NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_CMM_Measurements_FileHash')
+    CREATE NONCLUSTERED INDEX [IX_CMM_Measurements_FileHash] ON [dbo].[CMM_Measurements] ([FileHash] ASC);
+IF COL_LENGTH('dbo.CMM_Files', 'FileHash') IS NOT NULL
+   AND NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_CMM_Files_FileHash')
+    CREATE NONCLUSTERED INDEX [IX_CMM_Files_FileHash] ON [dbo].[CMM_Files] ([FileHash] ASC);
+IF COL_LENGTH('dbo.SurfcomMeasurements', 'file_hash') IS NOT NULL
+   AND NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_SurfcomMeasurements_FileHash')
+    CREATE NONCLUSTERED INDEX [IX_SurfcomMeasurements_FileHash] ON [dbo].[SurfcomMeasurements] ([file_hash] ASC);
+IF COL_LENGTH('dbo.Surfcom_CamHousing_Assy', 'file_hash') IS NOT NULL
+   AND NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Surfcom_CamHousing_Assy_FileHash')
+    CREATE NONCLUSTERED INDEX [IX_Surfcom_CamHousing_Assy_FileHash] ON [dbo].[Surfcom_CamHousing_Assy] ([file_hash] ASC);
+GO
@@ -1,30 +1,51 @@
-import pdfplumber
-import pyodbc
 import os
 import re
 from datetime import datetime
 
+import lab_db
+import path_metadata
+from file_catalog import CHANGED, SKIP, file_hash, open_catalog
+from lab_scanner import DirScanner, descend_within
+from parse_pool import DEFAULT_WORKERS, imap_files
+from pdf_fasttext import FALLBACK, HitCounter, open_report
+from pdf_pages import words_right_of
+from pdf_templates import get_template
+from run_metrics import RunMetrics, TimedCall
+
 # --- CONFIGURATION ---
 ROOT_PATH = r"C:\Users\User\OneDrive - oticsusa.com\Lab_Data\Cam Housing"
-DB_CONFIG = {
-    'server': r'(local)\SQLEXPRESS', 
-    'database': 'QualityShareData'
-}
+DB_TABLE = 'Surfcom_CamHousing_Assy'
+# Folders deeper than this below ROOT_PATH are only entered when they match the ASSY folder rule.
+# None = every folder is entered: the ASSY folders are not all at one depth (Cam Housing\<Model>\
+# Surfcom\<Month>\<Day>\ASSY ... is depth 5, deeper with a year folder). Pruned folders are printed.
+FOLDER_SEARCH_DEPTH = None
+FOLDER_PATTERN = r"ASSY"  # Folder rule (regex, case-insensitive) of the ASSY report folders
+CATALOG_NAME = 'ch_assy'  # Key of this importer in the local file catalog
+PARSE_WORKERS = DEFAULT_WORKERS  # Worker processes for PDF parsing (1 = single-core, original behaviour)
+PARSE_TIMEOUT = 120              # Seconds one PDF may take before it is skipped (and retried next run)
+READ_AHEAD = True                # Read the next PDFs into memory on threads while the workers parse (parse_pool)
+FILES_PER_COMMIT = 50            # Files per DB transaction (1 = per file, 0 = autocommit, original behaviour)
+REPORT_TEMPLATE = 'ch_assy'      # Page regions parsed (pdf_templates)
+DB_COLUMNS = ['part_model', 'sub_folder', 'operator_initials', 'file_date', 'journal_no',
+              'measured_item', 'measured_value', 'spec', 'full_file_path']
+HASH_COLUMN = 'file_hash'  # Content hash of the source file, stored with every row (AddFileHash.sql)
+
+DATE_RE = re.compile(r"(\d{4}/\d{2}/\d{2})")
+LABEL_RE = re.compile(r"(Ramax|Ra\(\d+\))")
 
 def get_metadata_from_path(full_path):
-    parts = full_path.split(os.sep)
-    part_model, sub_folder = "Unknown", "Unknown"
-    for i, p in enumerate(parts):
-        if p == "Surfcom" and i > 0: part_model = parts[i-1]
-        if any(keyword in p.upper() for keyword in ["ASSY", "LINE", "OP"]): sub_folder = p
-    filename = os.path.basename(full_path)
-    name_parts = os.path.splitext(filename)[0].split()
-    operator_initials = name_parts[-1] if len(name_parts) > 1 else ""
-    return part_model, sub_folder, operator_initials
-
-def extract_pdf_data(file_path):
+    """(part_model, sub_folder, operator_initials); folder parts are classified once per folder."""
+    return path_metadata.classify_ch(full_path, 'assy')
+
+def extract_pdf_data(file_path, template=None, data=None):
+    """
+    (rows, report date, extractor) of an ASSY report; only the template's page regions are parsed,
+    from the raw-text fast path when it finds the template's labels (pdf_fasttext).
+    """
+    template = template or get_template(REPORT_TEMPLATE)
     results = []
     file_date = None
+    extractor = FALLBACK
     filename_upper = os.path.basename(file_path).upper()
     
     # Logic: EX files start at Journal 6, IN files start at Journal 5
@@ -36,41 +57,33 @@ def extract_pdf_data(file_path):
         prefix = "Intake"
 
     try:
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                words = page.extract_words(x_tolerance=3, y_tolerance=3)
-                if not words: continue
-                
-                lines = {}
-                for w in words:
-                    y = round(w['top'], 0)
-                    lines.setdefault(y, []).append(w)
-                
-                sorted_y = sorted(lines.keys())
-                for y in sorted_y:
-                    line_words = sorted(lines[y], key=lambda x: x['x0'])
-                    line_text = " ".join([w['text'] for w in line_words]).strip()
-
-                    # 1. Capture Date
-                    date_match = re.search(r"(\d{4}/\d{2}/\d{2})", line_text)
-                    if date_match and not file_date:
-                        file_date = date_match.group(1)
+        with open_report(file_path, template, data=data) as (pages, extractor):
+            for page in template.select(pages):
+                # 1. Capture Date (regions sharing a bbox share one extraction)
+                if not file_date:
+                    for line_words, line_text in template.lines(page, 'date', x_tolerance=3, y_tolerance=3):
+                        date_match = DATE_RE.search(line_text)
+                        if date_match:
+                            file_date = date_match.group(1)
+                            break
+
+                for line_words, line_text in template.lines(page, 'values', x_tolerance=3, y_tolerance=3):
+                    line_text = line_text.strip()
 
                     # 2. Measurement Detection
-                    label_match = re.search(r"(Ramax|Ra\(\d+\))", line_text)
+                    label_match = LABEL_RE.search(line_text)
                     if label_match:
                         item_name = label_match.group(1)
                         
                         # COORDINATE FILTER: Only get numbers to the right of label
-                        label_x1 = [w['x1'] for w in line_words if item_name in w['text']][0]
+                        label_x1 = next(w['x1'] for w in line_words if item_name in w['text'])
                         measurements = []
-                        for w in line_words:
-                            if w['x0'] > label_x1:
-                                clean_val = w['text'].replace('µm', '').replace('$', '').replace('~', '').strip()
-                                try:
-                                    val = float(clean_val.replace(',', '.'))
-                                    measurements.append(val)
-                                except ValueError: continue
+                        for w in words_right_of(line_words, label_x1):
+                            clean_val = w['text'].replace('µm', '').replace('$', '').replace('~', '').strip()
+                            try:
+                                val = float(clean_val.replace(',', '.'))
+                                measurements.append(val)
+                            except ValueError: continue
                         
                         if measurements:
                             results.append({
@@ -87,40 +100,145 @@ def extract_pdf_data(file_path):
     except Exception as e:
         print(f"Error in {os.path.basename(file_path)}: {e}")
 
-    return results, file_date
+    return results, file_date, extractor
+
+def is_target_folder(folder):
+    folder_upper = folder.upper()
+    return bool("ASSY" in folder_upper)
+
+def is_target_file(full_path):
+    """True for the EX/IN PDFs inside ASSY folders handled by this importer."""
+    file_upper = os.path.basename(full_path).upper()
+    return is_target_folder(os.path.dirname(full_path)) and file_upper.endswith(".PDF") and ("EX" in file_upper or "IN" in file_upper)
+
+def parse_file(full_path, data=None):
+    """
+    Parses one PDF into (DB rows as tuples in DB_COLUMNS order, extractor used).
+    Runs in the parse workers; data is the PDF's content when it was read ahead.
+    """
+    part_model, sub_folder, initials = get_metadata_from_path(full_path)
+    extracted_rows, pdf_date, extractor = extract_pdf_data(full_path, data=data)
+    return [
+        (part_model, sub_folder, initials, pdf_date, row['journal_no'], row['measured_item'], row['measured_value'], row['spec'], full_path)
+        for row in extracted_rows
+    ], extractor
+
+def write_rows(cursor, full_path, status, rows, digest=None):
+    """
+    Inserts the parsed rows of one file with its content hash (digest, hashed here when None),
+    replacing the old rows of a CHANGED file.
+    Returns the number of rows written. The caller owns the transaction and the catalog.
+    """
+    # Re-measured file: replace its old rows
+    if status == CHANGED:
+        lab_db.delete_file_rows(cursor, DB_TABLE, [full_path])
+
+    # One bulk insert per file instead of one INSERT per measurement
+    digest = digest or file_hash(full_path)
+    return lab_db.bulk_insert(cursor, DB_TABLE, DB_COLUMNS + [HASH_COLUMN], [row + (digest,) for row in rows])
+
+def import_file(cursor, full_path, status, digest=None):
+    """
+    Parses and inserts one PDF (used by the watch-folder service), digest: its content hash when
+    the caller has it already. Returns the number of rows written.
+    """
+    rows, extractor = parse_file(full_path)
+    return write_rows(cursor, full_path, status, rows, digest)
+
+def iter_new_files(scanner, catalog, file_state, metrics):
+    """
+    Yields the target PDFs under ROOT_PATH that are new or changed since they were imported.
+    The stat result and catalog status of each yielded path are stored in file_state.
+    """
+    for root, entries in metrics.timed_iter('walk', scanner.walk(ROOT_PATH)):
+        if not is_target_folder(root):
+            continue
+        for entry in entries:
+            if is_target_file(entry.path):
+                with metrics.timer('stat'):
+                    st = entry.stat()
+                with metrics.timer('dedup_check'):
+                    status = catalog.check(entry.path, st)
+                metrics.count(status)
+                if status in SKIP: continue  # Imported and unmodified, or a copy of imported content
+                file_state[entry.path] = (st, status)
+                yield entry.path
 
 def run_import():
-    conn_str = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={DB_CONFIG['server']};DATABASE={DB_CONFIG['database']};Trusted_Connection=yes;"
-    conn = pyodbc.connect(conn_str, autocommit=True)
+    # Stage timers and counters of this run, saved as a run report at the end (run_metrics)
+    metrics = RunMetrics(CATALOG_NAME)
+    conn = metrics.connection(lab_db.connect(autocommit=(FILES_PER_COMMIT == 0)))
     cursor = conn.cursor()
 
+    # Local catalog of imported files; the DB manifest is only loaded to seed it on the first run
+    with metrics.timer('catalog_open'):
+        catalog = open_catalog(CATALOG_NAME, lambda: lab_db.load_imported_paths(cursor, DB_TABLE, hash_column=HASH_COLUMN))
     print(f"[{datetime.now().strftime('%H:%M:%S')}] Starting sequence-based scan...")
     files_processed = 0
     
-    for root, dirs, files in os.walk(ROOT_PATH):
-        folder_upper = root.upper()
-        if "ASSY" in folder_upper:
-            for file in files:
-                file_upper = file.upper()
-                if file_upper.endswith(".PDF") and ("EX" in file_upper or "IN" in file_upper):
-                    full_path = os.path.join(root, file)
-                    
-                    cursor.execute("SELECT COUNT(*) FROM Surfcom_CamHousing_Assy WHERE full_file_path = ?", (full_path,))
-                    if cursor.fetchone()[0] > 0: continue
-
-                    part_model, sub_folder, initials = get_metadata_from_path(full_path)
-                    extracted_rows, pdf_date = extract_pdf_data(full_path)
-
-                    for row in extracted_rows:
-                        cursor.execute('''
-                            INSERT INTO Surfcom_CamHousing_Assy 
-                            (part_model, sub_folder, operator_initials, file_date, journal_no, measured_item, measured_value, spec, full_file_path)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        ''', (part_model, sub_folder, initials, pdf_date, row['journal_no'], row['measured_item'], row['measured_value'], row['spec'], full_path))
-
-                    files_processed += 1
+    # Non-ASSY subtrees are pruned before they are listed (when FOLDER_SEARCH_DEPTH is set),
+    # folders unchanged since the last run are skipped
+    scanner = DirScanner(CATALOG_NAME, descend=descend_within(FOLDER_PATTERN, FOLDER_SEARCH_DEPTH))
+    file_state = {}
+    hits = HitCounter()
+
+    def committed(files):
+        # Only record files in the catalog once their rows are committed
+        for path, st in files:
+            catalog.mark(path, st)
+        catalog.commit()
+
+    def retry(path):
+        # Not imported: listed again next run, together with any copies held back for it
+        for p in [path, *catalog.release(path)]:
+            scanner.retry_later(p)
+
+    def rolled_back(files):
+        for path, st in files:
+            retry(path)
+
+    # A failed file is rolled back on its own, files are committed FILES_PER_COMMIT at a time
+    unit = lab_db.UnitOfWork(conn, FILES_PER_COMMIT, on_commit=committed, on_rollback=rolled_back)
+    # PDFs are parsed in worker processes (PARSE_WORKERS), this process is the single DB writer.
+    # Results arrive in scan order, a PDF that hangs the parser is dropped after PARSE_TIMEOUT.
+    new_files = iter_new_files(scanner, catalog, file_state, metrics)
+    results = imap_files(TimedCall(parse_file), new_files, PARSE_WORKERS, timeout=PARSE_TIMEOUT, prefetch=READ_AHEAD)
+    for full_path, result, error in metrics.timed_iter('parse_wait', results):
+        st, status = file_state.pop(full_path)
+        if error:
+            print(f"Error in {os.path.basename(full_path)}: {error}")
+            metrics.count('parse_errors')
+            retry(full_path)
+            continue
+        (rows, extractor), seconds = result
+        metrics.add('parse', seconds, f"{REPORT_TEMPLATE}/{extractor}")
+        hits.record(REPORT_TEMPLATE, extractor)
+
+        try:
+            written = unit.write((full_path, st), lambda cur: write_rows(cur, full_path, status, rows, catalog.digest(full_path)))
+        except Exception as e:
+            print(f"Error writing {os.path.basename(full_path)}: {e}")
+            metrics.count('write_errors')
+            retry(full_path)
+            continue
+        if not written:
+            retry(full_path)
+            continue
+        files_processed += 1
 
+    unit.commit()
     conn.close()
+    catalog.close()
+    scanner.commit()
+    scanner.close()
+    print(f"Scan: {scanner.summary()}")
+    scanner.log_pruned()
+    print(f"Fast text path: {hits.summary()}")
+    print(f"DB writes: {unit.summary()}")
+    metrics.update(scanner.totals())
+    metrics.update(hits.totals())
+    metrics.update({'files_imported': unit.files, 'rows_written': unit.rows})
+    metrics.finish()
     print(f"[{datetime.now().strftime('%H:%M:%S')}] Finished! Total imported: {files_processed}")
 
 if __name__ == "__main__":
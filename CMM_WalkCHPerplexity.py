@@ -2,17 +2,32 @@ import os
 import re
 from datetime import datetime
 
-import pdfplumber
-import pyodbc
+import lab_db
+import path_metadata
+from file_catalog import CHANGED, SKIP, open_catalog
+from lab_scanner import DirScanner
+from pdf_pages import PageCache, open_pages
+from run_metrics import RunMetrics
 
 # --- CONFIGURATION ---
 
 ROOT_PATH = r"C:\Users\User\OneDrive - oticsusa.com\Lab_Data\Cam Housing\2.4L CH\Surfcom\12-Dec"
 
-DB_CONFIG = {
-    "server": r"(local)\SQLEXPRESS",
-    "database": "QualityShareData",
-}
+DB_TABLE = "Surfcom_CamHousing_Assy"
+CATALOG_NAME = "ch_perplexity"  # key of this importer in the local file catalog
+FILES_PER_COMMIT = 50  # files per DB transaction (1 = per file, 0 = autocommit, original behaviour)
+DB_COLUMNS = [
+    "part_model",
+    "sub_folder",
+    "file_date",
+    "journal_no",
+    "measured_item",
+    "measured_value",
+    "spec",
+    "operator_initials",
+    "full_file_path",
+]
+HASH_COLUMN = "file_hash"  # content hash of the source file, stored with every row (AddFileHash.sql)
 
 LOG_FILE = "log_surfcom.txt"
 
@@ -22,12 +37,12 @@ def log_message(message: str) -> None:
         f.write(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}\n")
 
 
-def parse_report_date(page) -> datetime.date | None:
+def parse_report_date(page: PageCache) -> datetime.date | None:
     """
     Look for 'Date' followed by a yyyy/mm/dd or yyyymmdd number on the page.
     Returns a date object or None if not found.
     """
-    text = page.extract_text() or ""
+    text = page.text()
     # Surfcom example: 'Date' then '2025/12/30'
     m = re.search(r"Date\s+(\d{4})[/-]?(\d{2})[/-]?(\d{2})", text)
     if not m:
@@ -40,43 +55,67 @@ def parse_report_date(page) -> datetime.date | None:
 
 
 def process_cam_housing_assy() -> None:
-    conn_str = (
-        f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-        f"SERVER={DB_CONFIG['server']};"
-        f"DATABASE={DB_CONFIG['database']};"
-        "Trusted_Connection=yes;"
-    )
-
-    conn = pyodbc.connect(conn_str, autocommit=True)
+    # stage timers and counters of this run, saved as a run report (run_metrics)
+    metrics = RunMetrics(CATALOG_NAME)
+    conn = metrics.connection(lab_db.connect(autocommit=(FILES_PER_COMMIT == 0)))
     cursor = conn.cursor()
-
-    MODELS = [
-        "2.4L CH",
-        "A25 CH Gas",
-        "A25 CH Hybrid",
-        "M20 CH",
-        "2GR KAI CH",
-        "V6T LH CH",
-        "V6T RH CH Gas",
-        "V6T LH CH Hybrid",
-    ]
-    SUBFOLDERS = ["ASSY", "LINE 1", "LINE 2", "LINE 3", "LINE 4", "LINE 5"]
+    # Files already imported (and unchanged since) are skipped using the local catalog
+    with metrics.timer("catalog_open"):
+        catalog = open_catalog(
+            CATALOG_NAME,
+            lambda: lab_db.load_imported_paths(
+                cursor, DB_TABLE, hash_column=HASH_COLUMN
+            ),
+        )
 
     new_count = 0
     print("Processing... (Updates every 100 files)")
 
+    # folders unchanged since the last run are not listed again
+    scanner = DirScanner(CATALOG_NAME)
+
+    def committed(files):
+        # files are only recorded in the catalog once their rows are committed
+        for path, st in files:
+            catalog.mark(path, st)
+        catalog.commit()
+
+    def retry(path):
+        # not imported: listed again next run, together with any copies held back for it
+        for p in [path, *catalog.release(path)]:
+            scanner.retry_later(p)
+
+    def rolled_back(files):
+        for path, st in files:
+            retry(path)
+
+    # a failed file is rolled back on its own, files are committed FILES_PER_COMMIT at a time
+    unit = lab_db.UnitOfWork(
+        conn, FILES_PER_COMMIT, on_commit=committed, on_rollback=rolled_back
+    )
+
     try:
-        for root, dirs, files in os.walk(ROOT_PATH):
-            path_up = root.upper()
-            current_sub = next((s for s in SUBFOLDERS if s in path_up), "Other")
+        for root, entries in metrics.timed_iter("walk", scanner.walk(ROOT_PATH)):
+            # Model and sub-folder are properties of the folder, classified once per folder
+            found_model, current_sub = path_metadata.classify_ch_folder(root)
 
-            for file in files:
+            for entry in entries:
+                file = entry.name
                 if not file.lower().endswith(".pdf"):
                     continue
 
-                full_path = os.path.join(root, file)
+                full_path = entry.path
 
                 try:
+                    with metrics.timer("stat"):
+                        st = entry.stat()
+                    with metrics.timer("dedup_check"):
+                        status = catalog.check(full_path, st)
+                    metrics.count(status)
+                    # imported and unmodified, or a copy of content imported before
+                    if status in SKIP:
+                        continue
+
                     # --- 1. Filename metadata ---
                     file_up = file.upper()
                     if "EX" in file_up:
@@ -87,25 +126,28 @@ def process_cam_housing_assy() -> None:
                         prefix = ""
 
                     op_initials = file.split(".")[0][-2:].strip().upper()
-                    found_model = next((m for m in MODELS if m.upper() in path_up), "Unknown")
 
-                    with pdfplumber.open(full_path) as pdf:
-                        page = pdf.pages[0]
+                    # Page text is extracted once and shared by the date and journal parsers
+                    with (
+                        metrics.timer("parse", f"{CATALOG_NAME}/pdfplumber"),
+                        open_pages(full_path) as pages,
+                    ):
+                        page = pages[0]
 
                         # --- 2. Report date from header ---
                         report_date = parse_report_date(page)
                         if report_date is None:
-                            report_date = datetime.fromtimestamp(
-                                os.path.getmtime(full_path)
-                            ).date()
+                            # st comes from the directory listing, no extra stat
+                            report_date = datetime.fromtimestamp(st.st_mtime).date()
 
                         # --- 3. Line-based journal / Ra parsing ---
-                        text = page.extract_text() or ""
+                        text = page.text()
                         lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
 
                         current_j_num = None   # boxed journal number
                         spec_value = None      # current spec for this group
                         pending_label = None   # Ramax or Ra(1)...Ra(5) waiting for value
+                        file_rows = []         # rows for this file, sent in one bulk insert
 
                         for i, line in enumerate(lines):
                             # Journal number line (boxed integer, e.g. "6", "5", "4"...)
@@ -139,20 +181,7 @@ def process_cam_housing_assy() -> None:
 
                                     final_journal = f"{prefix}Journal {current_j_num}".strip()
 
-                                    cursor.execute(
-                                        """
-                                        INSERT INTO Surfcom_CamHousing_Assy
-                                            (part_model,
-                                             sub_folder,
-                                             file_date,
-                                             journal_no,
-                                             measured_item,
-                                             measured_value,
-                                             spec,
-                                             operator_initials,
-                                             full_file_path)
-                                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                                        """,
+                                    file_rows.append(
                                         (
                                             found_model,
                                             current_sub,
@@ -163,25 +192,52 @@ def process_cam_housing_assy() -> None:
                                             spec_value,
                                             op_initials,
                                             full_path,
-                                        ),
-                                    )
-
-                                    new_count += 1
-                                    if new_count % 100 == 0:
-                                        print(
-                                            f"[{datetime.now().strftime('%H:%M:%S')}] "
-                                            f"Processed {new_count} rows..."
                                         )
+                                    )
                                 # whether matched or not, continue loop
                                 continue
 
+                    if not file_rows:
+                        # Nothing parsed: no write, so not marked imported; listed again next run
+                        retry(full_path)
+                        continue
+
+                    def write_rows(cur):
+                        if status == CHANGED:
+                            lab_db.delete_file_rows(cur, DB_TABLE, [full_path])
+                        digest = catalog.digest(full_path)
+                        return lab_db.bulk_insert(
+                            cur,
+                            DB_TABLE,
+                            DB_COLUMNS + [HASH_COLUMN],
+                            [row + (digest,) for row in file_rows],
+                        )
+
+                    previous_count = new_count
+                    new_count += unit.write((full_path, st), write_rows)
+                    if new_count // 100 > previous_count // 100:
+                        print(
+                            f"[{datetime.now().strftime('%H:%M:%S')}] "
+                            f"Processed {new_count} rows..."
+                        )
+
                 except Exception as e:
                     log_message(f"Error {file}: {e}")
+                    metrics.count("file_errors")
+                    retry(full_path)
 
+        unit.commit()
+        scanner.commit()
     finally:
         conn.close()
+        catalog.close()
+        scanner.close()
 
     print(f"\nFINISHED: Imported {new_count} rows.")
+    print(f"DB writes: {unit.summary()}")
+    metrics.update(scanner.totals())
+    metrics.update({"files_imported": unit.files, "rows_written": unit.rows})
+    metrics.finish()
     input("Press Enter to exit...")
 
 
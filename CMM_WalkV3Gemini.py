@@ -1,10 +1,29 @@
+import io
+import locale
+import numpy as np
 import pandas as pd
 import re
 import os
+import sys
 import urllib
+import time
 import warnings
 from datetime import datetime
+from operator import itemgetter
 from sqlalchemy import create_engine, inspect
+from sqlalchemy.exc import DBAPIError
+
+import path_metadata
+from file_catalog import CHANGED, SKIP, file_hash, open_catalog
+from lab_db import bulk_insert, delete_file_rows, staged_insert, staged_insert_normalized
+from lab_scanner import DirScanner
+from parse_pool import DEFAULT_WORKERS, imap_files
+from run_metrics import RunMetrics, TimedCall
+
+try:
+    import pyodbc
+except ImportError:  # Only the SQL Server connection needs it
+    pyodbc = None
 
 # --- SILENCE WARNINGS ---
 warnings.filterwarnings("ignore", category=UserWarning, module='sqlalchemy')
@@ -16,7 +35,37 @@ except ImportError:
 
 # --- CONFIGURATION ---
 ROOT_DIRECTORY = r'C:\Users\User\OneDrive - oticsusa.com\Lab_Data\Rear Cover'
-DB_TABLE = 'CMM_Measurements'
+DB_TABLE = 'CMM_Measurements'  # or 'CMM_A25CH_Measurements' (run MigrateA25CHForStagedLoad.sql first)
+CATALOG_NAME = 'cmm_rear_cover'  # Key of this importer in the local file catalog
+PARSE_WORKERS = DEFAULT_WORKERS  # Worker processes for .asc parsing (1 = single-core, original behaviour)
+# Rows buffered before each flush to DB_TABLE (bounds peak memory). A staged flush of >= 102,400 rows
+# is loaded straight into compressed columnstore rowgroups (CreateMasterTable.sql) instead of the delta store
+BATCH_ROWS = 102400
+# 'bytes' (columnar on the raw bytes, only text fields decoded), 'columnar' (vectorized on the decoded
+# text) or 'rowwise' (original per-line parser)
+ASC_PARSER = 'bytes'
+READ_AHEAD = True                # Read the next files into memory on threads while the workers parse (parse_pool)
+# 'staged': bulk load into a #temp heap, then one INSERT ... SELECT into DB_TABLE skipping files already there
+# 'direct': bulk insert straight into DB_TABLE (original behaviour)
+LOAD_MODE = 'staged'
+# 'flat': one wide DB_TABLE row per measurement (original layout)
+# 'normalized': one DB_FILES_TABLE row per file + narrow DB_VALUES_TABLE rows (CreateNormalizedTables.sql)
+DB_LAYOUT = 'flat'
+DB_FILES_TABLE = 'CMM_Files'
+DB_VALUES_TABLE = 'CMM_Values'
+
+# Column ordering to match SQL
+SQL_COLS = [
+    'PartType', 'Model', 'FilePath', 'FileName', 'FileCreatedAt', 'Line#', 'QShift', 'Piece', 
+    'ProcessNo', 'Cavity', 'PosNo', 'Item', 'Element', 'Nominal', 
+    'UpperLimit', 'LowerLimit', 'Actual', 'Deviation', 'Bar', 'UL', 'LL'
+]
+HASH_COLUMN = 'FileHash'  # Content hash of the source file, stored with every row (AddFileHash.sql)
+# Uploaded rows: the parsed SQL_COLS plus the file's content hash (added by the writer)
+UPLOAD_COLS = SQL_COLS + [HASH_COLUMN]
+# Normalized layout: per-file columns and per-measurement columns (UpperLimit/LowerLimit are computed in SQL)
+FILE_COLS = SQL_COLS[:10] + [HASH_COLUMN]
+VALUE_COLS = ['PosNo', 'Item', 'Element', 'Nominal', 'Actual', 'Deviation', 'Bar', 'UL', 'LL']
 
 # Database Connection - ODBC Driver 18
 params = urllib.parse.quote_plus(
@@ -26,53 +75,44 @@ params = urllib.parse.quote_plus(
     r'Trusted_Connection=yes;'
     r'TrustServerCertificate=yes;'
 )
-engine = create_engine(f"mssql+pyodbc:///?odbc_connect={params}")
+_engine = None
+# Errors of the SQL Server connection (raw_connection() raises the pyodbc ones unwrapped)
+DB_ERRORS = (DBAPIError, pyodbc.Error) if pyodbc else (DBAPIError,)
+
+def get_engine():
+    """The SQLAlchemy engine, created on first use (so importing this module needs no ODBC driver)."""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(f"mssql+pyodbc:///?odbc_connect={params}")
+    return _engine
 
-def extract_date_from_filename(file_path):
+def extract_date_from_filename(file_path, st=None):
     """
     Parses the date and time from the filename string.
     Priority:
-    1. Regex match in filename (e.g., 20251101321 -> 2025-01-10 13:21)
-    2. OS File Creation Date (fallback)
-    """
-    filename = os.path.basename(file_path)
-    # Look for a sequence of 10 to 12 digits
-    match = re.search(r'(\d{10,12})', filename)
-    
-    # Fallback to OS time if no regex match
-    if not match:
-        return pd.to_datetime(os.path.getctime(file_path), unit='s')
-
-    ds = match.group(1)
-    try:
-        year = int(ds[:4])
-        # Default minute/seconds if string is short
-        minute = int(ds[-2:])
-        mid = ds[4:-2]
-        
-        # Handle variable length month/day formatting
-        if len(mid) == 4:
-            month, day, hour = int(mid[0]), int(mid[1:3]), int(mid[3])
-        elif len(mid) == 5:
-            month, day, hour = int(mid[0]), int(mid[1:3]), int(mid[3:5])
-        elif len(mid) == 6:
-            month, day, hour = int(mid[0:2]), int(mid[2:4]), int(mid[4:6])
-        else:
-            # Fallback if structure is weird
-            return pd.to_datetime(os.path.getctime(file_path), unit='s')
+    1. Regex match in filename (e.g., 20251101321 -> 2025-01-10 13:21), memoized per filename
+    2. OS File Creation Date (fallback), taken from st when the walk already stat'ed the file
+    """
+    stamp = path_metadata.filename_datetime(os.path.basename(file_path))
+    if stamp is not None:
+        return pd.Timestamp(stamp)
+    if st is None:
+        st = os.stat(file_path)
+    return pd.to_datetime(st.st_ctime, unit='s')
 
-        return pd.Timestamp(year=year, month=month, day=day, hour=hour, minute=minute)
-    except Exception:
-        # Fallback if parsing crashes
-        return pd.to_datetime(os.path.getctime(file_path), unit='s')
+def open_asc(file_path, data=None):
+    """Text handle of an .asc file: its prefetched bytes when given (same decoding as open), else the file."""
+    if data is not None:
+        return io.TextIOWrapper(io.BytesIO(data), errors='ignore')
+    return open(file_path, 'r', errors='ignore')
 
-def parse_asc_measurements(file_path):
+def parse_asc_measurements(file_path, data=None):
     """
     Parses semicolon-delimited (.asc) files and returns a list of dictionaries.
     """
     rows = []
     try:
-        with open(file_path, 'r', errors='ignore') as f:
+        with open_asc(file_path, data) as f:
             lines = f.readlines()
 
         for line in lines:
@@ -123,111 +163,349 @@ def parse_asc_measurements(file_path):
         print(f"Error parsing {os.path.basename(file_path)}: {e}")
     return rows
 
-def extract_metadata_from_path(full_path):
+# Semicolon field index -> column, for the fields parsed as numbers
+ASC_NUMERIC_FIELDS = {3: 'Nominal', 4: 'UL', 5: 'LL', 6: 'Actual', 7: 'Deviation'}
+ASC_TEXT_FIELDS = {0: 'PosNo', 1: 'Item', 2: 'Element', 8: 'Bar'}
+ASC_FIELD_COUNT = 9
+ASC_NUM_CLEAN = re.compile(r"[^0-9eE+\-\.]")
+ASC_ENCODING = locale.getpreferredencoding(False)  # What open() decodes the .asc text with
+
+def _clean_num(s):
+    """to_num semantics for a single raw field (str or bytes), NaN instead of None."""
+    if isinstance(s, bytes):
+        s = s.decode(ASC_ENCODING, 'ignore')
+    s = s.strip() if s is not None else ''
+    if not s: return np.nan
+    try: return float(ASC_NUM_CLEAN.sub('', s))
+    except ValueError: return np.nan
+
+def _fast_num(s):
+    try: return float(s)
+    except (TypeError, ValueError):
+        # float() only takes ASCII from bytes; the decoded text gets the same chance as in text mode
+        if isinstance(s, bytes): return _fast_num(s.decode(ASC_ENCODING, 'ignore'))
+        return _clean_num(s)
+
+def _to_num_column(raw):
+    """
+    Converts one raw numeric column to a float array (NaN = null), same results as to_num.
+    Clean CMM values convert with a single float() each; only the fields that fail
+    (blank, units, 'inf'...) go through the regex cleanup.
+    """
+    try:
+        values = np.array([float(v) for v in raw], dtype=float)
+    except (TypeError, ValueError):
+        values = np.array([_fast_num(v) for v in raw], dtype=float)
+    for i in np.flatnonzero(~np.isfinite(values)):
+        values[i] = _clean_num(raw[i])
+    return values
+
+def _nullable(values):
+    """Float array -> list with None for NaN."""
+    out = values.astype(object)
+    out[np.isnan(values)] = None
+    return out.tolist()
+
+def parse_asc_columnar(file_path, data=None):
+    """
+    Columnar version of parse_asc_measurements: splits the whole file at once, pulls each
+    field out as a column and converts/combines the numeric columns as NumPy arrays.
+    Returns a dict of column -> list with the same values and null handling as the
+    row-wise parser (None for nulls, LL defaulting to 0.0).
+    """
+    try:
+        with open_asc(file_path, data) as f:
+            lines = f.read().split('\n')
+
+        # Skip empty lines (only blanks/semicolons) and the '1;;...' header artifact
+        parts = [ln.split(';') for ln in lines if ln.replace(';', '').strip()]
+        parts = [p for p in parts if not (p[0].strip() == '1' and not (p[1].strip() if len(p) > 1 else ''))]
+        return _asc_columns(_pad_columns(parts), _strip_column)
+    except Exception as e:
+        print(f"Error parsing {os.path.basename(file_path)}: {e}")
+        return {}
+
+def _pad_columns(parts):
+    """Raw columns (field index -> values) of the split lines, None for fields a short line lacks."""
+    if not parts:
+        return None
+    # Pad short lines once so every field can be pulled out with itemgetter
+    parts = [p if len(p) >= ASC_FIELD_COUNT else p + [None] * (ASC_FIELD_COUNT - len(p)) for p in parts]
+    return [list(map(itemgetter(i), parts)) for i in range(ASC_FIELD_COUNT)]
+
+def _asc_columns(columns, text):
+    """Column dict from the raw columns; text(raw values) gives the values of a text column."""
+    if not columns:
+        return {}
+
+    result = {}
+    for i, name in ASC_TEXT_FIELDS.items():
+        result[name] = text(columns[i])
+
+    nums = {name: _to_num_column(columns[i]) for i, name in ASC_NUMERIC_FIELDS.items()}
+    # LL NULL HANDLING: Default to 0.0 if missing
+    nums['LL'] = np.where(np.isnan(nums['LL']), 0.0, nums['LL'])
+    nums['UpperLimit'] = nums['Nominal'] + nums['UL']
+    nums['LowerLimit'] = nums['Nominal'] + nums['LL']
+    for name, values in nums.items():
+        result[name] = _nullable(values)
+    return result
+
+def _strip_column(values):
+    return [v.strip() if v is not None else None for v in values]
+
+# Blanks that str.strip() removes but bytes.strip() keeps. Files with them (or any non-ASCII byte)
+# decode the fields they check, so blank/header detection matches text mode
+ASC_STR_ONLY_BLANKS = (b'\x1c', b'\x1d', b'\x1e', b'\x1f')
+ASC_HEADER_LINE = re.compile(rb"\s*1\s*(?:;\s*(?:;|$)|$)")  # '1;;...' header artifact
+
+def _decode_column(values):
+    """Decodes a raw text column with one decode call (b'\\n' never occurs inside a field)."""
+    if None not in values:
+        return [t.strip() for t in b'\n'.join(values).decode(ASC_ENCODING, 'ignore').split('\n')]
+    text = b'\n'.join(v or b'' for v in values).decode(ASC_ENCODING, 'ignore').split('\n')
+    return [t.strip() if v is not None else None for t, v in zip(text, values)]
+
+def _decoded(raw):
+    return raw.decode(ASC_ENCODING, 'ignore').strip()
+
+def _flat_columns(lines):
+    """
+    Raw columns of lines that all have the same number of fields (>= ASC_FIELD_COUNT), None otherwise:
+    one split of the joined lines, then every n-th field, without a list per line.
+    """
+    widths = {ln.count(b';') for ln in lines}
+    if len(widths) != 1:
+        return None
+    n = widths.pop() + 1
+    if n < ASC_FIELD_COUNT:
+        return None
+    fields = b';'.join(lines).split(b';')
+    return [fields[i::n] for i in range(ASC_FIELD_COUNT)]
+
+def read_asc_bytes(file_path, data=None):
+    """Raw content of an .asc file (data when it was read ahead) with text-mode newlines."""
+    if data is None:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+    if b'\r' in data:
+        data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    return data
+
+def parse_asc_bytes(file_path, data=None):
+    """
+    Byte-level version of parse_asc_columnar: the file is split on b'\\n' and b';' without decoding it,
+    numeric fields go to float() as bytes and only the text columns (PosNo, Item, Element, Bar) are
+    decoded, one decode per column. Same values as the text parsers (ASC_ENCODING, like open()).
+    """
+    try:
+        data = read_asc_bytes(file_path, data)
+        lines = data.split(b'\n')
+        if data.isascii() and not any(blank in data for blank in ASC_STR_ONLY_BLANKS):
+            # Skip empty lines (only blanks/semicolons) and the '1;;...' header artifact
+            lines = [ln for ln in lines if ln.replace(b';', b'').strip() and not ASC_HEADER_LINE.match(ln)]
+            columns = _flat_columns(lines) if lines else None
+            if columns:
+                return _asc_columns(columns, _decode_column)
+            parts = [ln.split(b';') for ln in lines]
+        else:
+            # Non-ASCII blanks (e.g. NBSP) count as whitespace, like str.strip() in text mode
+            parts = [ln.split(b';') for ln in lines if _decoded(ln).replace(';', '').strip()]
+            parts = [p for p in parts if not (_decoded(p[0]) == '1' and not (_decoded(p[1]) if len(p) > 1 else ''))]
+        return _asc_columns(_pad_columns(parts), _decode_column)
+    except Exception as e:
+        print(f"Error parsing {os.path.basename(file_path)}: {e}")
+        return {}
+
+def extract_metadata_from_path(full_path, st=None):
     """
-    Extracts file-level metadata using regex on path and filename.
-    Includes smart date extraction from filename.
+    File-level metadata from the path and filename (rules in path_metadata, folder
+    part cached per folder). Includes smart date extraction from filename.
     """
-    path_up = full_path.upper()
-    
-    # --- UPDATED DATE LOGIC ---
+    meta = path_metadata.classify_cmm(full_path)
     # Uses the helper function to prioritize filename dates over OS dates
-    file_created_at = extract_date_from_filename(full_path)
-
-    # Model Detection
-    model = "Unknown"
-    if "967" in path_up: model = "967K"
-    elif "031" in path_up: model = "031C"
-    elif "T324" in path_up: model = "T324"
-    
-    # Line# 
-    line_no = ""
-    line_match = re.search(r'(LINE|L)\s*(\d+)', full_path, re.IGNORECASE)
-    if line_match: line_no = line_match.group(2)
-    
-    # ProcessNo
-    process = "N/A"
-    process_match = re.search(r'(#(?:1[0-9]0|200|[1-9]0|80LL)|MQC)', path_up)
-    if process_match: process = process_match.group(1)
-            
-    # QShift
-    shift = ""
-    if "1ST" in path_up: shift = "1"
-    elif "3RD" in path_up: shift = "3"
-        
-    # Piece
-    piece = "N/A"
-    piece_match = re.search(r'[\\ ]([13])(ATC|BTC|TC|F|M|L)', full_path)
-    if piece_match:
-        piece = piece_match.group(2)
-        if shift == "": shift = piece_match.group(1)
-    
-    # Cavity
-    cavity = ""
-    cav_match = re.search(r'Cavity-([\w\d]+)', os.path.basename(full_path), re.IGNORECASE)
-    if cav_match: cavity = cav_match.group(1)[:3] 
-
-    return {
-        "PartType": "Rear Cover" if "Rear Cover" in full_path else "Unknown",
-        "Model": model,
-        "FilePath": full_path,
-        "FileName": os.path.basename(full_path),
-        "FileCreatedAt": file_created_at,  # Populated by new logic
-        "Line#": line_no,
-        "QShift": shift,
-        "Piece": piece,
-        "ProcessNo": process,
-        "Cavity": cavity if cavity else "N/A"
-    }
+    meta["FileCreatedAt"] = extract_date_from_filename(full_path, st)
+    return meta
+
+def parse_asc_file(full_path, st=None, data=None):
+    """
+    Metadata + measurements for one .asc file, as upload rows
+    (tuples in SQL_COLS order; smaller than dicts to send back from the workers).
+    st is the file's stat result from the walk, if any, so the date fallback needs no extra stat.
+    data is the file's content when it was read ahead (parse_pool), otherwise the file is opened here.
+    """
+    file_meta = extract_metadata_from_path(full_path, st)
+    if ASC_PARSER == 'rowwise':
+        measurements = parse_asc_measurements(full_path, data)
+        return [tuple({**file_meta, **m}.get(c) for c in SQL_COLS) for m in measurements]
+
+    if ASC_PARSER == 'bytes':
+        columns = parse_asc_bytes(full_path, data)
+    else:
+        columns = parse_asc_columnar(full_path, data)
+    if not columns:
+        return []
+    n = len(columns['PosNo'])
+    return list(zip(*[columns[c] if c in columns else [file_meta.get(c)] * n for c in SQL_COLS]))
+
+def parse_asc_job(job, data=None):
+    """Worker entry point for a (full_path, stat) job from iter_new_asc_files (data: read-ahead bytes)."""
+    return parse_asc_file(*job, data=data)
+
+def iter_new_asc_files(scanner, catalog, file_state, metrics):
+    """
+    Yields (path, stat) of .asc files under ROOT_DIRECTORY that are new or changed since they were imported.
+    The stat result and catalog status of each yielded path are stored in file_state.
+    """
+    for root, entries in metrics.timed_iter('walk', scanner.walk(ROOT_DIRECTORY)):
+        for entry in entries:
+            if entry.name.lower().endswith(".asc"):
+                full_path = entry.path
+                with metrics.timer('stat'):
+                    st = entry.stat()
+                with metrics.timer('dedup_check'):
+                    status = catalog.check(full_path, st)
+                metrics.count(status)
+                if status in SKIP: continue  # Imported and unmodified, or a copy of imported content
+                file_state[full_path] = (st, status)
+                yield full_path, st
+
+def write_batch(cursor, rows, replace_paths=()):
+    """
+    Writes one batch of rows (tuples in UPLOAD_COLS order) to DB_TABLE through the shared bulk-load layer (lab_db.BULK_STRATEGY).
+    Rows of replace_paths (files changed since their import) are deleted first.
+    DB_LAYOUT 'normalized' writes DB_FILES_TABLE + DB_VALUES_TABLE (always staged) instead of DB_TABLE.
+    Returns the number of measurement rows added (the staged loads skip files already in the DB).
+    The caller owns the transaction and the catalog (used by import_lab_data's shared writer).
+    """
+    if DB_LAYOUT == 'normalized':
+        return staged_insert_normalized(cursor, DB_FILES_TABLE, DB_VALUES_TABLE, UPLOAD_COLS, FILE_COLS,
+                                        VALUE_COLS, rows, 'FilePath', 'FileID', replace_paths)
+    if LOAD_MODE == 'staged':
+        return staged_insert(cursor, DB_TABLE, UPLOAD_COLS, rows, 'FilePath', replace_paths)
+    delete_file_rows(cursor, DB_TABLE, replace_paths, column='FilePath')
+    return bulk_insert(cursor, DB_TABLE, UPLOAD_COLS, rows)
+
+def upload_batch(rows, replace_paths=(), metrics=None):
+    """
+    write_batch in its own transaction, so batches already written survive a crash later in the run.
+    Returns the number of measurement rows added. With metrics (run_metrics) its round trips are timed.
+    """
+    conn = get_engine().raw_connection()
+    if metrics is not None:
+        conn = metrics.connection(conn)
+    try:
+        written = write_batch(conn.cursor(), rows, replace_paths)
+        conn.commit()
+    finally:
+        conn.close()
+    return written
+
+def import_file(full_path, status, st=None, digest=None):
+    """
+    Parses and uploads a single .asc file in its own transaction (used by the watch-folder service),
+    digest: its content hash when the caller has it already. Returns the number of rows written.
+    """
+    rows = parse_asc_file(full_path, st)
+    if not rows:
+        return 0
+    digest = digest or file_hash(full_path)
+    upload_batch([row + (digest,) for row in rows], [full_path] if status == CHANGED else ())
+    # A file the staged load skipped is already in DB_TABLE, so it counts as imported too
+    return len(rows)
+
+def target_table():
+    """Table holding one row (or more) per imported file in the configured DB_LAYOUT."""
+    return DB_FILES_TABLE if DB_LAYOUT == 'normalized' else DB_TABLE
+
+def load_db_paths():
+    """{FilePath: FileHash} of the imported files, seeds the local catalog."""
+    query = f"SELECT FilePath, MAX({HASH_COLUMN}) AS FileHash FROM {target_table()} GROUP BY FilePath"
+    df = pd.read_sql(query, get_engine())
+    return {path: digest if isinstance(digest, str) else None for path, digest in zip(df['FilePath'], df['FileHash'])}
 
 def main():
-    existing_paths = set()
-    if inspect(engine).has_table(DB_TABLE):
-        query = f"SELECT DISTINCT FilePath FROM {DB_TABLE}"
-        existing_paths = set(pd.read_sql(query, engine)['FilePath'])
-        print(f"Connected to DB. {len(existing_paths)} existing files found.")
-
-    all_rows_to_upload = []
-    print(f"Scanning {ROOT_DIRECTORY}...")
-    
-    for root, dirs, files in os.walk(ROOT_DIRECTORY):
-        for file in files:
-            if file.lower().endswith(".asc"):
-                full_path = os.path.join(root, file)
-                if full_path in existing_paths: continue
-                
-                try:
-                    file_meta = extract_metadata_from_path(full_path)
-                    measurements = parse_asc_measurements(full_path)
-                    
-                    # Merge metadata into every measurement row
-                    for m in measurements:
-                        all_rows_to_upload.append({**file_meta, **m})
-                except Exception as e:
-                    print(f"Error processing {file}: {e}")
-
-    if not all_rows_to_upload:
-        print("No new data.")
+    if not inspect(get_engine()).has_table(target_table()):
+        script = 'CreateNormalizedTables.sql' if DB_LAYOUT == 'normalized' else 'CreateMasterTable.sql'
+        print(f"Table {target_table()} not found. Run {script} first.")
         return
+    # Stage timers and counters of this run, saved as a run report at the end (run_metrics)
+    metrics = RunMetrics(CATALOG_NAME)
+    with metrics.timer('catalog_open'):
+        catalog = open_catalog(CATALOG_NAME, load_db_paths)
+    scanner = DirScanner(CATALOG_NAME)
+
+    batch = []
+    batch_files = []
+    file_state = {}
+    print(f"Scanning {ROOT_DIRECTORY} with {PARSE_WORKERS} worker(s)...")
+    start = time.perf_counter()
+    files_parsed = 0
+    rows_uploaded = 0
+
+    def flush():
+        nonlocal rows_uploaded
+        replace_paths = [p for p in batch_files if file_state[p][1] == CHANGED]
+        rows_uploaded += upload_batch(batch, replace_paths, metrics)
+        # Only record files in the catalog once their rows are committed
+        for p in batch_files:
+            catalog.mark(p, file_state.pop(p)[0])
+        catalog.commit()
 
-    df = pd.DataFrame(all_rows_to_upload)
-    
-    # Column ordering to match SQL
-    sql_cols = [
-        'PartType', 'Model', 'FilePath', 'FileName', 'FileCreatedAt', 'Line#', 'QShift', 'Piece', 
-        'ProcessNo', 'Cavity', 'PosNo', 'Item', 'Element', 'Nominal', 
-        'UpperLimit', 'LowerLimit', 'Actual', 'Deviation', 'Bar', 'UL', 'LL'
-    ]
-    
-    final_cols = [c for c in sql_cols if c in df.columns]
-    df = df[final_cols]
-
-    print(f"Uploading {len(df)} rows...")
     try:
-        df.to_sql(DB_TABLE, engine, if_exists='append', index=False, chunksize=10000)
-        print("Upload successful.")
-    except Exception as e:
+        # Workers parse in parallel, this process is the single writer streaming their rows
+        new_files = iter_new_asc_files(scanner, catalog, file_state, metrics)
+        results = imap_files(TimedCall(parse_asc_job), new_files, PARSE_WORKERS, prefetch=READ_AHEAD)
+        for (full_path, _), result, error in metrics.timed_iter('parse_wait', results):
+            rows = None
+            if not error:
+                rows, seconds = result
+                metrics.add('parse', seconds, f"asc_{ASC_PARSER}")
+            if error or not rows:
+                if error:
+                    print(f"Error processing {os.path.basename(full_path)}: {error}")
+                    metrics.count('parse_errors')
+                file_state.pop(full_path, None)
+                # Listed again next run, together with any copies held back for it
+                for p in [full_path, *catalog.release(full_path)]:
+                    scanner.retry_later(p)
+                continue
+            digest = catalog.digest(full_path)
+            batch.extend(row + (digest,) for row in rows)
+            batch_files.append(full_path)
+            files_parsed += 1
+
+            # Flush on file boundaries only, so a file is never half-written to the DB
+            if len(batch) >= BATCH_ROWS:
+                flush()
+                batch, batch_files = [], []
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] {files_parsed} files parsed, {rows_uploaded} rows uploaded...")
+
+        if batch:
+            flush()
+        # Folder state is only saved once every file found in it is committed
+        catalog.commit()
+        scanner.commit()
+    except DB_ERRORS as e:
         print(f"Database error: {e}")
+        print(f"{rows_uploaded} rows from earlier batches are already saved.")
+        sys.exit(1)
+    finally:
+        catalog.close()
+        scanner.close()
+        print(f"Scan: {scanner.summary()}")
+        metrics.update(scanner.totals())
+        metrics.update({'files_parsed': files_parsed, 'rows_written': rows_uploaded})
+        metrics.finish()
+
+    if not rows_uploaded:
+        print("No new data.")
+        return
+
+    print("Upload successful.")
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"Throughput: {files_parsed} files in {elapsed:.1f}s "
+          f"({files_parsed / elapsed:.1f} files/s, {rows_uploaded / elapsed:.0f} rows/s)")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,93 @@
+USE [QualityShareData]
+GO
+
+-- Converts the existing measurement tables to clustered columnstores in place (rows are kept)
+-- and adds the supporting rowstore indexes for the importers and the common report filters.
+-- Safe to re-run: every step checks what is already there.
+-- Needs SQL Server 2016 SP1 or later (Express included). Run in a quiet window: the conversion
+-- rebuilds each table once.
+
+-- 1. CMM_Measurements: the clustered primary key becomes nonclustered
+IF EXISTS (SELECT 1 FROM sys.indexes
+           WHERE object_id = OBJECT_ID('dbo.CMM_Measurements') AND name = 'PK_CMM_Measurements' AND type = 1)
+BEGIN
+    ALTER TABLE [dbo].[CMM_Measurements] DROP CONSTRAINT [PK_CMM_Measurements];
+    CREATE CLUSTERED COLUMNSTORE INDEX [CCI_CMM_Measurements] ON [dbo].[CMM_Measurements];
+    ALTER TABLE [dbo].[CMM_Measurements] ADD CONSTRAINT [PK_CMM_Measurements] PRIMARY KEY NONCLUSTERED ([ID] ASC);
+END
+GO
+
+-- 2. Surfcom tables (heaps): columnstore directly. A table that already has a clustered rowstore
+--    index, or NVARCHAR(MAX) columns before SQL Server 2017, is reported and left alone.
+DECLARE @table sysname, @sql nvarchar(max);
+DECLARE tables CURSOR LOCAL FAST_FORWARD FOR
+    SELECT name FROM (VALUES ('SurfcomMeasurements'), ('Surfcom_CamHousing_Assy')) AS t(name);
+OPEN tables;
+FETCH NEXT FROM tables INTO @table;
+WHILE @@FETCH_STATUS = 0
+BEGIN
+    IF OBJECT_ID('dbo.' + @table, 'U') IS NULL
+        PRINT @table + ': not found, run CreateSurfcomTables.sql';
+    ELSE IF EXISTS (SELECT 1 FROM sys.indexes WHERE object_id = OBJECT_ID('dbo.' + @table) AND type = 5)
+        PRINT @table + ': already a clustered columnstore';
+    ELSE IF EXISTS (SELECT 1 FROM sys.indexes WHERE object_id = OBJECT_ID('dbo.' + @table) AND type = 1)
+        PRINT @table + ': has a clustered rowstore index, drop it first';
+    ELSE IF CAST(SERVERPROPERTY('ProductMajorVersion') AS int) < 14
+        AND EXISTS (SELECT 1 FROM sys.columns WHERE object_id = OBJECT_ID('dbo.' + @table) AND max_length = -1)
+        -- Columnstores take (N)VARCHAR(MAX) columns only from SQL Server 2017
+        PRINT @table + ': has NVARCHAR(MAX) columns, ALTER them to NVARCHAR(400) (full_file_path) first';
+    ELSE
+    BEGIN
+        SET @sql = N'CREATE CLUSTERED COLUMNSTORE INDEX ' + QUOTENAME('CCI_' + @table)
+                 + N' ON dbo.' + QUOTENAME(@table) + N';';
+        EXEC sp_executesql @sql;
+        PRINT @table + ': converted';
+    END
+    FETCH NEXT FROM tables INTO @table;
+END
+CLOSE tables;
+DEALLOCATE tables;
+GO
+
+-- 3. Supporting rowstore indexes. Tables missing from step 2 are skipped (COL_LENGTH is NULL).
+--    A file path stored as NVARCHAR(MAX) cannot be an index key: ALTER it to NVARCHAR(400) first.
+-- Duplicate check / re-import delete by file path (lab_db.load_imported_paths, delete_file_rows)
+IF COL_LENGTH('dbo.CMM_Measurements', 'FilePath') = -1
+    PRINT 'CMM_Measurements: FilePath is NVARCHAR(MAX), run ALTER TABLE dbo.CMM_Measurements ALTER COLUMN FilePath NVARCHAR(400) NOT NULL, then re-run this script';
+ELSE IF COL_LENGTH('dbo.CMM_Measurements', 'FilePath') IS NOT NULL
+   AND NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_CMM_Measurements_FilePath')
+    CREATE NONCLUSTERED INDEX [IX_CMM_Measurements_FilePath] ON [dbo].[CMM_Measurements] ([FilePath] ASC);
+IF COL_LENGTH('dbo.SurfcomMeasurements', 'full_file_path') = -1
+    PRINT 'SurfcomMeasurements: full_file_path is NVARCHAR(MAX), run ALTER TABLE dbo.SurfcomMeasurements ALTER COLUMN full_file_path NVARCHAR(400) NOT NULL, then re-run this script';
+ELSE IF COL_LENGTH('dbo.SurfcomMeasurements', 'full_file_path') IS NOT NULL
+   AND NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_SurfcomMeasurements_FilePath')
+    CREATE NONCLUSTERED INDEX [IX_SurfcomMeasurements_FilePath] ON [dbo].[SurfcomMeasurements] ([full_file_path] ASC);
+IF COL_LENGTH('dbo.Surfcom_CamHousing_Assy', 'full_file_path') = -1
+    PRINT 'Surfcom_CamHousing_Assy: full_file_path is NVARCHAR(MAX), run ALTER TABLE dbo.Surfcom_CamHousing_Assy ALTER COLUMN full_file_path NVARCHAR(400) NOT NULL, then re-run this script';
+ELSE IF COL_LENGTH('dbo.Surfcom_CamHousing_Assy', 'full_file_path') IS NOT NULL
+   AND NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Surfcom_CamHousing_Assy_FilePath')
+    CREATE NONCLUSTERED INDEX [IX_Surfcom_CamHousing_Assy_FilePath] ON [dbo].[Surfcom_CamHousing_Assy] ([full_file_path] ASC);
+
+-- Report filters: model + date range (newest first), process + date
+IF OBJECT_ID('dbo.CMM_Measurements', 'U') IS NOT NULL
+   AND NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_CMM_Measurements_Model_Date')
+    CREATE NONCLUSTERED INDEX [IX_CMM_Measurements_Model_Date] ON [dbo].[CMM_Measurements] ([Model] ASC, [FileCreatedAt] DESC);
+IF OBJECT_ID('dbo.CMM_Measurements', 'U') IS NOT NULL
+   AND NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_CMM_Measurements_Process_Date')
+    CREATE NONCLUSTERED INDEX [IX_CMM_Measurements_Process_Date] ON [dbo].[CMM_Measurements] ([ProcessNo] ASC, [FileCreatedAt] DESC);
+IF OBJECT_ID('dbo.SurfcomMeasurements', 'U') IS NOT NULL
+   AND NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_SurfcomMeasurements_Model_Date')
+    CREATE NONCLUSTERED INDEX [IX_SurfcomMeasurements_Model_Date] ON [dbo].[SurfcomMeasurements] ([part_model] ASC, [file_date] DESC);
+IF OBJECT_ID('dbo.SurfcomMeasurements', 'U') IS NOT NULL
+   AND NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_SurfcomMeasurements_Process_Date')
+    CREATE NONCLUSTERED INDEX [IX_SurfcomMeasurements_Process_Date] ON [dbo].[SurfcomMeasurements] ([process_no] ASC, [file_date] DESC);
+IF OBJECT_ID('dbo.Surfcom_CamHousing_Assy', 'U') IS NOT NULL
+   AND NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Surfcom_CamHousing_Assy_Model_Date')
+    CREATE NONCLUSTERED INDEX [IX_Surfcom_CamHousing_Assy_Model_Date] ON [dbo].[Surfcom_CamHousing_Assy] ([part_model] ASC, [file_date] DESC);
+GO
+
+-- 4. Maintenance (optional, after large backfills): the PDF importers add a few hundred rows per
+--    commit, which collect in open delta rowgroups; this compresses them right away.
+-- ALTER INDEX [CCI_SurfcomMeasurements] ON [dbo].[SurfcomMeasurements] REORGANIZE WITH (COMPRESS_ALL_ROW_GROUPS = ON);
+-- ALTER INDEX [CCI_Surfcom_CamHousing_Assy] ON [dbo].[Surfcom_CamHousing_Assy] REORGANIZE WITH (COMPRESS_ALL_ROW_GROUPS = ON);
+-- ALTER INDEX [CCI_CMM_Measurements] ON [dbo].[CMM_Measurements] REORGANIZE WITH (COMPRESS_ALL_ROW_GROUPS = ON);
@@ -35,19 +35,50 @@ CREATE TABLE [dbo].[CMM_Measurements](
     [Bar] [nvarchar](100) NULL,              -- Visual bar representation from the file
     [UL] [float] NULL,                       -- Raw Upper Tolerance
     [LL] [float] NULL,                       -- Raw Lower Tolerance
+    [FileHash] [varchar](40) NULL,           -- Content hash of the .asc file (copies are imported once)
     
     [UploadTimestamp] [datetime] DEFAULT GETDATE(), -- Tracks when the script actually ran
     
-    CONSTRAINT [PK_CMM_Measurements] PRIMARY KEY CLUSTERED 
+    -- Nonclustered: the table itself is stored as a clustered columnstore (below)
+    CONSTRAINT [PK_CMM_Measurements] PRIMARY KEY NONCLUSTERED 
     (
         [ID] ASC
     )
 ) ON [PRIMARY]
 GO
 
+-- Columnstore storage: Power BI / Top1000-style scans read only the columns they use, compressed,
+-- and skip rowgroups outside the Model/date filter. Loads of >= 102,400 rows per statement
+-- (CMM_WalkV3Gemini BATCH_ROWS, staged load) go straight into compressed rowgroups.
+-- Needs SQL Server 2016 SP1 or later (Express included).
+CREATE CLUSTERED COLUMNSTORE INDEX [CCI_CMM_Measurements] ON [dbo].[CMM_Measurements]
+GO
+
 -- Create an index on FilePath to make the "Duplicate Check" fast
 CREATE NONCLUSTERED INDEX [IX_CMM_Measurements_FilePath] ON [dbo].[CMM_Measurements]
 (
     [FilePath] ASC
 )
-GO
\ No newline at end of file
+GO
+
+-- Content hash lookups (the same report copied to another folder)
+CREATE NONCLUSTERED INDEX [IX_CMM_Measurements_FileHash] ON [dbo].[CMM_Measurements]
+(
+    [FileHash] ASC
+)
+GO
+
+-- Common report filters: model + date range (newest first), process + date
+CREATE NONCLUSTERED INDEX [IX_CMM_Measurements_Model_Date] ON [dbo].[CMM_Measurements]
+(
+    [Model] ASC,
+    [FileCreatedAt] DESC
+)
+GO
+
+CREATE NONCLUSTERED INDEX [IX_CMM_Measurements_Process_Date] ON [dbo].[CMM_Measurements]
+(
+    [ProcessNo] ASC,
+    [FileCreatedAt] DESC
+)
+GO
@@ -0,0 +1,109 @@
+USE [QualityShareData]
+GO
+
+-- Normalized layout of CMM_Measurements: the file/path columns are stored once per .asc file in
+-- CMM_Files, each measurement row in CMM_Values only carries the FileID (4 bytes) instead of
+-- ~10 repeated path/metadata columns. UpperLimit/LowerLimit are computed (Nominal + UL/LL).
+-- vw_CMM_Measurements returns the original wide rows for Power BI and ad-hoc queries.
+-- Loader: set DB_LAYOUT = 'normalized' in CMM_WalkV3Gemini.py.
+
+-- 1. Drop the tables if they already exist so the script can be re-run
+DROP VIEW IF EXISTS [dbo].[vw_CMM_Measurements];
+DROP TABLE IF EXISTS [dbo].[CMM_Values];
+DROP TABLE IF EXISTS [dbo].[CMM_Files];
+GO
+SET ANSI_NULLS ON
+GO
+
+SET QUOTED_IDENTIFIER ON
+GO
+
+CREATE TABLE [dbo].[CMM_Files](
+    [FileID] [int] IDENTITY(1,1) NOT NULL,   -- Surrogate key referenced by every measurement
+    [PartType] [nvarchar](50) NULL,
+    [Model] [nvarchar](50) NULL,
+    [FilePath] [nvarchar](400) NOT NULL,     -- Unique: used to check for duplicates
+    [FileName] [nvarchar](255) NULL,
+    [FileCreatedAt] [datetime] NULL,
+    [Line#] [nvarchar](50) NULL,
+    [QShift] [nvarchar](20) NULL,
+    [Piece] [nvarchar](50) NULL,
+    [ProcessNo] [nvarchar](50) NULL,
+    [Cavity] [nvarchar](50) NULL,
+    [FileHash] [varchar](40) NULL,           -- Content hash of the .asc file (copies are imported once)
+    [UploadTimestamp] [datetime] DEFAULT GETDATE(),
+
+    CONSTRAINT [PK_CMM_Files] PRIMARY KEY CLUSTERED ([FileID] ASC),
+    CONSTRAINT [UQ_CMM_Files_FilePath] UNIQUE NONCLUSTERED ([FilePath] ASC)
+) ON [PRIMARY]
+GO
+
+CREATE TABLE [dbo].[CMM_Values](
+    [ID] [bigint] IDENTITY(1,1) NOT NULL,
+    [FileID] [int] NOT NULL,
+    [PosNo] [nvarchar](50) NULL,
+    [Item] [nvarchar](150) NULL,
+    [Element] [nvarchar](150) NULL,
+    [Nominal] [float] NULL,
+    [Actual] [float] NULL,
+    [Deviation] [float] NULL,
+    [Bar] [nvarchar](100) NULL,
+    [UL] [float] NULL,                       -- Raw Upper Tolerance
+    [LL] [float] NULL,                       -- Raw Lower Tolerance
+    [UpperLimit] AS ([Nominal] + [UL]),      -- Same as the loaders computed before (NULL if either is NULL)
+    [LowerLimit] AS ([Nominal] + [LL]),
+
+    CONSTRAINT [PK_CMM_Values] PRIMARY KEY NONCLUSTERED ([ID] ASC),
+    -- Re-importing a changed file only deletes its CMM_Files row
+    CONSTRAINT [FK_CMM_Values_CMM_Files] FOREIGN KEY ([FileID])
+        REFERENCES [dbo].[CMM_Files] ([FileID]) ON DELETE CASCADE
+) ON [PRIMARY]
+GO
+
+-- Measurements are stored (and read) file by file
+CREATE CLUSTERED INDEX [CX_CMM_Values_FileID] ON [dbo].[CMM_Values] ([FileID] ASC)
+GO
+
+CREATE NONCLUSTERED INDEX [IX_CMM_Files_FileHash] ON [dbo].[CMM_Files] ([FileHash] ASC)
+GO
+
+-- Power BI / ad-hoc filters on the file attributes
+CREATE NONCLUSTERED INDEX [IX_CMM_Files_Model_Date] ON [dbo].[CMM_Files] ([Model] ASC, [FileCreatedAt] DESC)
+GO
+
+-- 2. Compatibility view: same columns as the old CMM_Measurements table
+CREATE VIEW [dbo].[vw_CMM_Measurements] AS
+SELECT
+    v.[ID], f.[PartType], f.[Model], f.[FilePath], f.[FileName], f.[FileCreatedAt], f.[Line#],
+    f.[QShift], f.[Piece], f.[ProcessNo], f.[Cavity],
+    v.[PosNo], v.[Item], v.[Element], v.[Nominal], v.[UpperLimit], v.[LowerLimit], v.[Actual],
+    v.[Deviation], v.[Bar], v.[UL], v.[LL], f.[FileHash],
+    f.[UploadTimestamp]
+FROM [dbo].[CMM_Values] AS v
+JOIN [dbo].[CMM_Files] AS f ON f.[FileID] = v.[FileID]
+GO
+
+-- 3. Optional: copy the rows already in CMM_Measurements (run once, then point Power BI at the view).
+--    Needs its FileHash column (AddFileHash.sql).
+IF OBJECT_ID('dbo.CMM_Measurements', 'U') IS NOT NULL
+BEGIN
+    INSERT INTO [dbo].[CMM_Files] WITH (TABLOCK)
+        ([PartType], [Model], [FilePath], [FileName], [FileCreatedAt], [Line#], [QShift], [Piece],
+         [ProcessNo], [Cavity], [FileHash], [UploadTimestamp])
+    SELECT [PartType], [Model], [FilePath], [FileName], [FileCreatedAt], [Line#], [QShift], [Piece],
+           [ProcessNo], [Cavity], [FileHash], [UploadTimestamp]
+    FROM (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY [FilePath] ORDER BY [ID]) AS rn
+        FROM [dbo].[CMM_Measurements]
+    ) AS m
+    WHERE m.rn = 1;
+
+    INSERT INTO [dbo].[CMM_Values] WITH (TABLOCK)
+        ([FileID], [PosNo], [Item], [Element], [Nominal], [Actual], [Deviation], [Bar], [UL], [LL])
+    SELECT f.[FileID], m.[PosNo], m.[Item], m.[Element], m.[Nominal], m.[Actual], m.[Deviation],
+           m.[Bar], m.[UL], m.[LL]
+    FROM [dbo].[CMM_Measurements] AS m
+    JOIN [dbo].[CMM_Files] AS f ON f.[FilePath] = m.[FilePath]
+    ORDER BY m.[ID];
+END
+GO
@@ -0,0 +1,54 @@
+USE [QualityShareData]
+GO
+
+-- Creates the Surfcom tables (if missing) as clustered columnstores, like CMM_Measurements.
+-- Columns match DB_COLUMNS of extract_surfcomV2Gemini.py and the CMM_WalkCH* importers.
+-- Existing tables are converted by ConvertToColumnstore.sql instead (keeps their rows).
+SET ANSI_NULLS ON
+GO
+
+SET QUOTED_IDENTIFIER ON
+GO
+
+IF OBJECT_ID('dbo.SurfcomMeasurements', 'U') IS NULL
+BEGIN
+    CREATE TABLE [dbo].[SurfcomMeasurements](
+        [part_type] [nvarchar](50) NULL,
+        [part_model] [nvarchar](50) NULL,
+        [process_no] [nvarchar](50) NULL,
+        [item_no] [nvarchar](50) NULL,
+        [operator_initials] [nvarchar](10) NULL,
+        [file_date] [datetime] NULL,
+        [Measured Item] [nvarchar](20) NULL,
+        [Measured Value] [float] NULL,
+        [full_file_path] [nvarchar](400) NOT NULL,  -- Used to check for duplicates
+        [file_hash] [varchar](40) NULL,             -- Content hash of the PDF (copies are imported once)
+        [UploadTimestamp] [datetime] DEFAULT GETDATE()
+    ) ON [PRIMARY];
+
+    CREATE CLUSTERED COLUMNSTORE INDEX [CCI_SurfcomMeasurements] ON [dbo].[SurfcomMeasurements];
+END
+GO
+
+IF OBJECT_ID('dbo.Surfcom_CamHousing_Assy', 'U') IS NULL
+BEGIN
+    CREATE TABLE [dbo].[Surfcom_CamHousing_Assy](
+        [part_model] [nvarchar](50) NULL,
+        [sub_folder] [nvarchar](50) NULL,
+        [operator_initials] [nvarchar](10) NULL,
+        [file_date] [datetime] NULL,
+        [journal_no] [nvarchar](50) NULL,
+        [measured_item] [nvarchar](20) NULL,
+        [measured_value] [float] NULL,
+        [spec] [float] NULL,
+        [full_file_path] [nvarchar](400) NOT NULL,  -- Used to check for duplicates
+        [file_hash] [varchar](40) NULL,             -- Content hash of the PDF (copies are imported once)
+        [UploadTimestamp] [datetime] DEFAULT GETDATE()
+    ) ON [PRIMARY];
+
+    CREATE CLUSTERED COLUMNSTORE INDEX [CCI_Surfcom_CamHousing_Assy] ON [dbo].[Surfcom_CamHousing_Assy];
+END
+GO
+
+-- Supporting rowstore indexes (duplicate check / re-import delete, model + date filters, content hash)
+-- are created by ConvertToColumnstore.sql and AddFileHash.sql, so both paths end with the same layout.
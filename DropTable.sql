@@ -1,4 +1,7 @@
 Drop Table CMM_Measurements
 Drop Table CMM_A25CH_Measurements
 Drop Table SurfcomMeasurements
-Drop Table Surfcom_CamHousing_Assy
\ No newline at end of file
+Drop Table Surfcom_CamHousing_Assy
+Drop View vw_CMM_Measurements
+Drop Table CMM_Values
+Drop Table CMM_Files
@@ -0,0 +1,36 @@
+USE [QualityShareData]
+GO
+
+-- Prepares CMM_A25CH_Measurements (A25CHCreateMasterTable.sql) for the staged load of
+-- CMM_WalkV3Gemini (LOAD_MODE 'staged', DB_TABLE = 'CMM_A25CH_Measurements'), in place (rows are kept):
+--   FilePath NVARCHAR(MAX) NULL -> NVARCHAR(400) NOT NULL, as in CMM_Measurements. A MAX column
+--   cannot be indexed, so the staged load's "file already there" check would scan the table.
+--   FileHash column for the content hash the importer writes with every row (as AddFileHash.sql).
+--   FilePath and FileHash indexes.
+-- Safe to re-run: every step checks what is already there. Run it again after A25CHCreateMasterTable.sql.
+
+-- 1. FilePath: only narrowed when every row fits, otherwise reported and left alone
+IF OBJECT_ID('dbo.CMM_A25CH_Measurements', 'U') IS NULL
+    PRINT 'CMM_A25CH_Measurements: not found, run A25CHCreateMasterTable.sql';
+ELSE IF COL_LENGTH('dbo.CMM_A25CH_Measurements', 'FilePath') = -1
+BEGIN
+    IF EXISTS (SELECT 1 FROM [dbo].[CMM_A25CH_Measurements] WHERE [FilePath] IS NULL OR LEN([FilePath]) > 400)
+        PRINT 'CMM_A25CH_Measurements: rows with no FilePath or one over 400 characters, fix them first';
+    ELSE
+        ALTER TABLE [dbo].[CMM_A25CH_Measurements] ALTER COLUMN [FilePath] [nvarchar](400) NOT NULL;
+END
+GO
+
+-- 2. Content hash column
+IF OBJECT_ID('dbo.CMM_A25CH_Measurements', 'U') IS NOT NULL AND COL_LENGTH('dbo.CMM_A25CH_Measurements', 'FileHash') IS NULL
+    ALTER TABLE [dbo].[CMM_A25CH_Measurements] ADD [FileHash] [varchar](40) NULL;
+GO
+
+-- 3. Indexes (FilePath only once step 1 has narrowed it)
+IF COL_LENGTH('dbo.CMM_A25CH_Measurements', 'FilePath') = 800
+   AND NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_CMM_A25CH_Measurements_FilePath')
+    CREATE NONCLUSTERED INDEX [IX_CMM_A25CH_Measurements_FilePath] ON [dbo].[CMM_A25CH_Measurements] ([FilePath] ASC);
+IF COL_LENGTH('dbo.CMM_A25CH_Measurements', 'FileHash') IS NOT NULL
+   AND NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_CMM_A25CH_Measurements_FileHash')
+    CREATE NONCLUSTERED INDEX [IX_CMM_A25CH_Measurements_FileHash] ON [dbo].[CMM_A25CH_Measurements] ([FileHash] ASC);
+GO
@@ -0,0 +1,93 @@
+"""
+Benchmarks the lab_db.bulk_insert strategies and prints rows/s for each.
+
+By default it runs against a local SQLite stand-in DB so it works on any machine:
+    python bench_bulkload.py --rows 200000
+With --sqlserver it writes to a scratch table in QualityShareData (dropped afterwards).
+Note: SQLite has no fast_executemany, so on the stand-in that strategy equals executemany.
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import lab_db
+
+BENCH_TABLE = 'Bench_CMM_Measurements'
+COLUMNS = [
+    'PartType', 'Model', 'FilePath', 'FileName', 'FileCreatedAt', 'Line#', 'QShift', 'Piece',
+    'ProcessNo', 'Cavity', 'PosNo', 'Item', 'Element', 'Nominal',
+    'UpperLimit', 'LowerLimit', 'Actual', 'Deviation', 'Bar', 'UL', 'LL'
+]
+FLOAT_COLUMNS = {'Nominal', 'UpperLimit', 'LowerLimit', 'Actual', 'Deviation', 'UL', 'LL'}
+
+def synthetic_rows(count):
+    """Rows shaped like CMM_Measurements: ~200 measurements per .asc file."""
+    base = datetime(2025, 12, 1, 6, 0)
+    rows = []
+    for i in range(count):
+        file_no = i // 200
+        path = rf"C:\Lab_Data\Rear Cover\967K\Line 1\1ST\#30\{file_no:06d}_202512011{file_no % 60:02d}.asc"
+        nominal = 10.0 + (i % 50) * 0.5
+        rows.append((
+            'Rear Cover', '967K', path, os.path.basename(path), base + timedelta(minutes=file_no),
+            '1', '1', 'ATC', '#30', 'N/A', str(i % 200 + 1), f"Item {i % 200}", 'Circle',
+            nominal, nominal + 0.05, nominal - 0.05, nominal + 0.01, 0.01, '---|---', 0.05, -0.05
+        ))
+    return rows
+
+def create_table(cursor, sqlserver):
+    col_defs = []
+    for c in COLUMNS:
+        sql_type = 'FLOAT' if c in FLOAT_COLUMNS else ('DATETIME' if c == 'FileCreatedAt' else 'NVARCHAR(400)')
+        col_defs.append(f"{lab_db.quote_column(c)} {sql_type}")
+    if sqlserver:
+        cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+    cursor.execute(f"CREATE TABLE {BENCH_TABLE} ({', '.join(col_defs)})")
+
+def run(conn, rows, strategies, sqlserver):
+    cursor = conn.cursor()
+    create_table(cursor, sqlserver)
+    conn.commit()
+    results = {}
+    for strategy in strategies:
+        cursor.execute(f"DELETE FROM {BENCH_TABLE}")
+        conn.commit()
+        start = time.perf_counter()
+        lab_db.bulk_insert(cursor, BENCH_TABLE, COLUMNS, rows, strategy=strategy)
+        conn.commit()
+        elapsed = time.perf_counter() - start
+        results[strategy] = len(rows) / elapsed
+        print(f"{strategy:<18} {len(rows):>9} rows  {elapsed:8.2f}s  {results[strategy]:>12,.0f} rows/s")
+    cursor.execute(f"DROP TABLE {BENCH_TABLE}")
+    conn.commit()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--strategy', action='append', choices=lab_db.STRATEGIES,
+                        help="Strategy to run (repeatable). Default: all.")
+    parser.add_argument('--sqlserver', action='store_true', help="Use the real SQL Server instead of SQLite")
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows)
+    strategies = args.strategy or list(lab_db.STRATEGIES)
+
+    if args.sqlserver:
+        conn = lab_db.connect()
+        print(f"Target: SQL Server {lab_db.DB_CONFIG['server']}")
+        run(conn, rows, strategies, sqlserver=True)
+        conn.close()
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, 'bench.db'))
+        print("Target: SQLite stand-in")
+        run(conn, rows, strategies, sqlserver=False)
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""
+Generates a synthetic Lab_Data tree and benchmarks every importer stage on it.
+
+The corpus mirrors the real shares: Rear Cover .asc files named like Sample_Filenames.txt (and
+the older <Model>\\Line N\\<Shift>\\#<Process> folders), Surfcom PDFs, and Cam Housing ASSY
+(Ramax / Ra(n) rows with their spec) and LINE (Chain Case / Head) reports. The same --seed gives
+the same tree, so runs on different days or branches compare like for like:
+    python bench_ingest.py --asc-files 500 --pdf-files 100 --json before.json
+Per importer the stages run one after another, each in a fresh process so peak RSS is the
+stage's own (single-core numbers; parse_pool scaling is not part of this benchmark):
+    walk      lab_scanner walk of the importer's root with its descend and file rules
+    hash      content hash of every file (file_catalog, the dedup check)
+    metadata  path and file-name rules (path_metadata)
+    parse     the importer's own parse function
+    write     inserts into a local SQLite stand-in DB (lab_db.bulk_insert / write_rows)
+The staged T-SQL loads of CMM_WalkV3Gemini need SQL Server, so the CMM write stage uses the
+direct bulk insert. --asc-parser and --pdfplumber compare the parse engines on the same tree.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import lab_db
+import path_metadata
+import pdf_fasttext
+from file_catalog import NEW, file_hash
+from import_lab_data import IMPORTERS, importer, parse_job
+from lab_scanner import DirScanner, descend_within
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS comes from psutil when it is installed
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# --- CONFIGURATION ---
+STAGES = ('walk', 'hash', 'metadata', 'parse', 'write')
+ASC_PARSERS = ('bytes', 'columnar', 'rowwise')
+# Importer -> its root below the generated Lab_Data folder
+IMPORTER_ROOTS = {
+    'cmm': 'Rear Cover',
+    'ch_assy': 'Cam Housing',
+    'ch_line': 'Cam Housing',
+    'surfcom': '',  # SURFCOM_SEARCH_DEPTH counts from Lab_Data
+}
+BASE_DATE = datetime(2025, 6, 24, 6, 0)
+
+# --- Synthetic corpus ---
+CMM_MODELS = ['T324', '967K', '031C']
+CMM_PROCESSES = ['#10', '#10 - ECI', '#80LL', 'MQC', '#30', '#120']
+CMM_ELEMENTS = ['Circle', 'Plane', 'Cylinder', 'Point', 'Line', 'Distance']
+SURFCOM_PARAMS = ['Ra', 'Rz', 'Rt', 'Pa', 'Pt', 'Ramax', 'Rzmax', 'Ra1max', 'Rz1max']
+CH_ASSY_LABELS = ['Ramax', 'Ra(1)', 'Ra(2)', 'Ra(3)', 'Ra(4)', 'Ra(5)']
+CH_LINE_ITEMS = ["Pt", "Ra", "Ramax", "Ramin", "Rasd", "Ra(1)", "Ra(2)", "Ra(3)", "Rz(1)", "Rz(2)", "Rz(3)"]
+CH_LINE_REPORTS = ["CHAIN CASE EX", "CHAIN CASE IN", "HEAD EX", "HEAD IN"]
+INITIALS = ['AB', 'LG', 'JPN', 'MK', 'TR']
+
+def write_pdf(path, lines):
+    """
+    Minimal single-page PDF with a text layer; lines are (x, y, text) in points from the bottom left,
+    or (x, y, text, (a, b, c, d)) with the text matrix of a rotated/scaled line.
+    """
+    def escape(text):
+        return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    def show(x, y, text, matrix=(1, 0, 0, 1)):
+        return f"{' '.join(map(str, matrix))} {x} {y} Tm ({escape(text)}) Tj\n"
+    content = "BT /F1 10 Tf\n" + "".join(show(*line) for line in lines) + "ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        "/Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(content)} >>\nstream\n{content}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF".encode()
+    with open(path, 'wb') as f:
+        f.write(out)
+
+def write_text(path, text):
+    with open(path, 'w', newline='') as f:  # CRLF line ends like the CMM exports
+        f.write(text)
+
+def report_header(rng, stamp):
+    """Header lines of a Surfcom report (not parsed, but on the page like on the real ones)."""
+    return [(40, 770, "SURFCOM Measurement Report"), (400, 770, f"Date {stamp:%Y/%m/%d}"),
+            (40, 755, f"Program PRG{rng.randint(1, 40):02d}  Cutoff 0.8mm  Speed 0.3mm/s")]
+
+def asc_lines(rng, count):
+    """One CMM .asc export: the '1;;' header artifact, then count semicolon measurement rows."""
+    lines = ["1;;;;;;;;"]
+    for pos in range(1, count + 1):
+        nominal = round(rng.uniform(2, 150), 3)
+        ul = rng.choice([0.01, 0.02, 0.05, 0.1])
+        ll = '' if rng.random() < 0.05 else f"{-ul}"  # Missing LL is stored as 0.0
+        deviation = round(rng.gauss(0, ul / 3), 4)
+        bar = '---|+--' if deviation > 0 else '--+|---'
+        lines.append(f"{pos};Item {pos};{rng.choice(CMM_ELEMENTS)} {pos % 17};{nominal};{ul};{ll};"
+                     f"{nominal + deviation:.4f};{deviation};{bar}")
+    return lines
+
+def cmm_path(lab_data, rng, i):
+    """Rear Cover .asc path: the Sample_Filenames.txt scheme, or the older folder-per-attribute one."""
+    model = rng.choice(CMM_MODELS)
+    stamp = BASE_DATE + timedelta(minutes=37 * i)
+    process = rng.choice(CMM_PROCESSES)
+    if i % 2:
+        line = f"Line-{rng.randint(1, 3)}{rng.choice(['', ' A'])}"
+        name = (f"{line}_{stamp:%Y-%m-%d_%H%M}_{rng.choice(['1', '3'])}-SR_{rng.choice(['JPNSV', 'PE'])}"
+                f"-Initials_{model}_LineMod_{process}_Cavity-{rng.randint(1, 12)}{rng.choice(['', 'A', 'B'])}"
+                f"_{rng.choice(['QC', 'PE'])}.asc")
+        return os.path.join(lab_data, 'Rear Cover', model, str(stamp.year), name)
+    shift = rng.choice(['1ST', '3RD'])
+    piece = f"{shift[0]}{rng.choice(['ATC', 'BTC', 'F', 'M', 'L'])}"
+    # 10-12 digit stamp in the file name (path_metadata.filename_datetime)
+    name = f"{piece} {model} {i:05d}_{stamp.year}{stamp.month}{stamp.day:02d}{stamp.hour:02d}{stamp.minute:02d}.asc"
+    return os.path.join(lab_data, 'Rear Cover', model, f"Line {rng.randint(1, 3)}", shift,
+                        process.split()[0], name)
+
+def surfcom_lines(rng, stamp):
+    """Surfcom report: parameter table in the top-left quarter of page 1."""
+    lines = report_header(rng, stamp)
+    for row, param in enumerate(rng.sample(SURFCOM_PARAMS, rng.randint(4, len(SURFCOM_PARAMS)))):
+        lines.append((40, 720 - 16 * row, param))
+        lines.append((110, 720 - 16 * row, f"{rng.uniform(0.05, 4):.3f}um"))
+    lines.append((40, 200, "Evaluation length 4.0mm"))
+    return lines
+
+def ch_assy_lines(rng, stamp, exhaust):
+    """ASSY journal report: Ramax, Ra(1)..Ra(5) blocks per journal, value then spec right of the label."""
+    lines = report_header(rng, stamp)
+    y = 730
+    for journal in range(6 if exhaust else 5, 0, -1):
+        for label in CH_ASSY_LABELS:
+            lines += [(50, y, label), (130, y, f"{rng.uniform(0.1, 0.6):.3f}"), (210, y, "0.63")]
+            y -= 12
+    return lines
+
+def ch_line_lines(rng, stamp):
+    """Chain Case / Head line report: one item per line, its value right of it."""
+    lines = report_header(rng, stamp)
+    for row, item in enumerate(CH_LINE_ITEMS):
+        lines += [(50, 720 - 14 * row, item), (130, 720 - 14 * row, f"{rng.uniform(0.1, 3):.3f}")]
+    return lines
+
+def generate_corpus(lab_data, seed=0, asc_files=200, asc_rows=200, pdf_files=50):
+    """
+    Writes the synthetic tree below lab_data (same seed, same files) and
+    returns {kind: files written}. Modification times are fixed too (Surfcom date fallback).
+    """
+    rng = random.Random(seed)
+    counts = {'asc': 0, 'surfcom': 0, 'ch_assy': 0, 'ch_line': 0}
+
+    def save(path, kind, stamp, writer):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        writer(path)
+        os.utime(path, (stamp.timestamp(), stamp.timestamp()))
+        counts[kind] += 1
+
+    for i in range(asc_files):
+        path = cmm_path(lab_data, rng, i)
+        text = "\r\n".join(asc_lines(rng, asc_rows)) + "\r\n"
+        save(path, 'asc', BASE_DATE, lambda p: write_text(p, text))
+
+    surfcom = os.path.join(lab_data, 'Cam Housing', '2.4L CH', 'Surfcom', '12-Dec')
+    for i in range(pdf_files):
+        stamp = BASE_DATE + timedelta(hours=5 * i)
+        day = os.path.join(surfcom, f"{stamp.day:02d}")
+        initials = rng.choice(INITIALS)
+        # Surfcom part reports: 'P<process> <item> <initials>.pdf' (path_metadata.classify_surfcom)
+        lines = surfcom_lines(rng, stamp)
+        save(os.path.join(day, f"P{rng.choice([10, 20, 30, 80])} {i} {initials}.pdf"), 'surfcom', stamp,
+             lambda p: write_pdf(p, lines))
+        # ASSY journal reports: 'ASSY 2 [FR]\1F\1F EX LG.pdf'
+        piece = f"{rng.randint(1, 4)}{rng.choice(['F', 'R'])}"
+        for side in ('EX', 'IN'):
+            lines = ch_assy_lines(rng, stamp, side == 'EX')
+            save(os.path.join(day, f"ASSY {rng.randint(1, 3)} [FR]", piece, f"{piece} {side} {i} {initials}.pdf"),
+                 'ch_assy', stamp, lambda p: write_pdf(p, lines))
+        lines = ch_line_lines(rng, stamp)
+        save(os.path.join(day, f"LINE {rng.randint(1, 5)}", f"{rng.choice(CH_LINE_REPORTS)} {i} {initials}.pdf"),
+             'ch_line', stamp, lambda p: write_pdf(p, lines))
+    return counts
+
+# --- Stages (each runs in a fresh process) ---
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None when it cannot be read."""
+    try:
+        # Linux: VmHWM starts over in a new process (ru_maxrss keeps the parent's peak across exec)
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)  # bytes on macOS, KB on Linux
+    if psutil is not None:
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    return None
+
+def walk_files(name, lab_data, catalog_path):
+    """(path, stat) of every file the importer takes, walked with its own descend and file rules."""
+    module = importer(name)
+    if name == 'cmm':
+        descend, matches = None, lambda path: path.lower().endswith('.asc')
+    else:
+        depth = module.SURFCOM_SEARCH_DEPTH if name == 'surfcom' else module.FOLDER_SEARCH_DEPTH
+        descend, matches = descend_within(module.FOLDER_PATTERN, depth), module.is_target_file
+    scanner = DirScanner(f"bench_{name}", descend=descend, skip_unchanged=False, catalog_path=catalog_path)
+    files = []
+    for folder, entries in scanner.walk(os.path.join(lab_data, IMPORTER_ROOTS[name])):
+        files.extend((entry.path, entry.stat()) for entry in entries if matches(entry.path))
+    scanner.close()
+    return files
+
+def file_metadata(name, path, st):
+    module = importer(name)
+    if name == 'cmm':
+        return module.extract_metadata_from_path(path, st)
+    if name == 'surfcom':
+        return path_metadata.classify_surfcom(path), module.extract_date_from_filename(path, st)
+    return module.get_metadata_from_path(path)
+
+def connect_standin(db_path, name):
+    """SQLite stand-in DB with the importer's table (same columns as on SQL Server, untyped)."""
+    module = importer(name)
+    conn = sqlite3.connect(db_path)
+    if name == 'cmm':
+        table, columns = module.DB_TABLE, module.UPLOAD_COLS
+        sqlite3.register_adapter(module.pd.Timestamp, str)  # FileCreatedAt
+    else:
+        table, columns = module.DB_TABLE, module.DB_COLUMNS + [module.HASH_COLUMN]
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(map(lab_db.quote_column, columns))})")
+    conn.commit()
+    return conn
+
+def write_files(name, conn, parsed, digests):
+    """Writes the parsed files like the importers do: CMM in BATCH_ROWS batches, PDFs file by file."""
+    module = importer(name)
+    cursor = conn.cursor()
+    written = 0
+    if name == 'cmm':
+        batch = []
+        for (path, rows), digest in zip(parsed, digests):
+            batch.extend(row + (digest,) for row in rows)
+            if len(batch) >= module.BATCH_ROWS:
+                written += lab_db.bulk_insert(cursor, module.DB_TABLE, module.UPLOAD_COLS, batch)
+                conn.commit()
+                batch = []
+        written += lab_db.bulk_insert(cursor, module.DB_TABLE, module.UPLOAD_COLS, batch)
+    else:
+        files_per_commit = getattr(module, 'FILES_PER_COMMIT', lab_db.FILES_PER_COMMIT) or 1
+        for i, ((path, rows), digest) in enumerate(zip(parsed, digests), 1):
+            if rows:
+                written += module.write_rows(cursor, path, NEW, rows, digest)
+            if i % files_per_commit == 0:
+                conn.commit()
+    conn.commit()
+    return written
+
+def run_stage(stage, name, work_dir, inputs, settings):
+    """
+    Runs one stage of one importer and returns (files, rows, seconds, peak RSS in MB, output).
+    The output feeds the next stages: walk -> files, hash -> digests, parse -> (path, rows) per file.
+    """
+    module = importer(name)
+    if name == 'cmm':
+        module.ASC_PARSER = settings['asc_parser']
+    pdf_fasttext.FAST_TEXT = settings['fast_text']
+    files = inputs.get('files', [])
+    lab_data = os.path.join(work_dir, 'Lab_Data')
+
+    conn = None
+    if stage == 'write':
+        conn = connect_standin(os.path.join(work_dir, 'standin.db'), name)
+
+    start = time.perf_counter()
+    rows, output = 0, None
+    if stage == 'walk':
+        output = walk_files(name, lab_data, os.path.join(work_dir, 'bench_catalog.db'))
+        files = output
+    elif stage == 'hash':
+        output = [file_hash(path) for path, st in files]
+    elif stage == 'metadata':
+        for path, st in files:
+            file_metadata(name, path, st)
+    elif stage == 'parse':
+        output = []
+        for path, st in files:
+            result = parse_job((name, path, st))
+            file_rows = result if name == 'cmm' else result[0]
+            rows += len(file_rows or ())
+            output.append((path, file_rows))
+    elif stage == 'write':
+        rows = write_files(name, conn, inputs['parsed'], inputs['digests'])
+    elapsed = time.perf_counter() - start
+
+    if conn is not None:
+        conn.close()
+    return len(files), rows, elapsed, peak_rss_mb(), output
+
+def in_fresh_process(*args):
+    # spawn on every platform: a forked child would start with the parent's peak RSS
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(run_stage, *args).result()
+
+def run(work_dir, names, settings):
+    """Runs every stage of every importer; returns one result dict per (importer, stage)."""
+    results = []
+    for name in names:
+        inputs = {}
+        for stage in STAGES:
+            files, rows, elapsed, rss, output = in_fresh_process(stage, name, work_dir, inputs, settings)
+            if stage == 'walk':
+                inputs['files'] = output
+            elif stage == 'hash':
+                inputs['digests'] = output
+            elif stage == 'parse':
+                inputs['parsed'] = output
+            seconds = max(elapsed, 1e-9)
+            result = {
+                'importer': name, 'stage': stage, 'files': files, 'rows': rows, 'seconds': round(elapsed, 4),
+                'files_per_s': round(files / seconds, 1), 'rows_per_s': round(rows / seconds, 1) if rows else None,
+                'peak_rss_mb': round(rss, 1) if rss is not None else None,
+            }
+            results.append(result)
+            print(f"{name:<8} {stage:<9} {files:>7} {rows:>9} {elapsed:9.3f}s {result['files_per_s']:>11,.1f}"
+                  f" {result['rows_per_s'] or 0:>12,.0f} {rss if rss is not None else float('nan'):>9.1f}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', type=int, default=0, help="Corpus seed (same seed, same tree)")
+    parser.add_argument('--asc-files', type=int, default=200)
+    parser.add_argument('--asc-rows', type=int, default=200, help="Measurement rows per .asc file")
+    parser.add_argument('--pdf-files', type=int, default=50,
+                        help="Reports per kind (Surfcom, LINE; ASSY gets an EX and an IN report each)")
+    parser.add_argument('--importer', action='append', choices=sorted(IMPORTERS),
+                        help="Importer to run (repeatable). Default: all.")
+    parser.add_argument('--asc-parser', choices=ASC_PARSERS, default=ASC_PARSERS[0])
+    parser.add_argument('--pdfplumber', action='store_true', help="Parse PDFs without the raw-text fast path")
+    parser.add_argument('--corpus', help="Folder to generate the corpus (and stand-in DB) in and keep. "
+                                         "Default: a temporary folder")
+    parser.add_argument('--json', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    settings = {'asc_parser': args.asc_parser, 'fast_text': not args.pdfplumber}
+    names = args.importer or list(IMPORTERS)
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = args.corpus or tmp
+        start = time.perf_counter()
+        counts = generate_corpus(os.path.join(work_dir, 'Lab_Data'), args.seed, args.asc_files,
+                                 args.asc_rows, args.pdf_files)
+        print(f"Corpus: {', '.join(f'{n} {kind}' for kind, n in counts.items())} files "
+              f"(seed {args.seed}) in {time.perf_counter() - start:.1f}s")
+        print(f"Settings: ASC parser {args.asc_parser}, PDF text {'pdfplumber' if args.pdfplumber else 'fast path'}")
+        print(f"{'importer':<8} {'stage':<9} {'files':>7} {'rows':>9} {'time':>10} {'files/s':>11}"
+              f" {'rows/s':>12} {'peak MB':>9}")
+        standin = os.path.join(work_dir, 'standin.db')
+        if os.path.exists(standin):
+            os.remove(standin)  # A kept corpus is written to an empty stand-in DB again
+        results = run(work_dir, names, settings)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'run_at': datetime.now().isoformat(timespec='seconds'), 'seed': args.seed,
+                       'corpus': counts, 'settings': settings, 'results': results}, f, indent=2)
+        print(f"Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmarks the report templates (pdf_templates) against a full-page parse of the same PDFs.
+
+For every PDF the importer parser runs twice: with the template (its regions, and the raw-text
+fast path when pdf_fasttext.FAST_TEXT is on) and with every page parsed in full by pdfplumber.
+It prints the time per PDF for both, how many PDFs gave the same rows and the fast path hit
+rate, so a tightened region can be checked on real reports before it is used:
+    python bench_pdf_templates.py "C:\\...\\Lab_Data\\Cam Housing\\2.4L CH\\Surfcom\\12-Dec" --repeat 3
+PDFs are matched to a template like the importers do (is_target_file), or forced with --template.
+Only templates with at least one region smaller than the page are benchmarked.
+"""
+import argparse
+import os
+import time
+
+from pdf_fasttext import FAST
+from pdf_templates import FULL_PAGE, TEMPLATES
+from watch_lab_data import load_script
+
+def template_parsers():
+    """template name -> (is_target_file, parse(path, template))"""
+    surfcom = load_script('extract_surfcomV2Gemini.py')
+    ch_assy = load_script('CMM_WalkCHGemini.py')
+    ch_line = load_script('CMM_WalkCHGemini CHAINCASE HEAD.py')
+    return {
+        'surfcom': (surfcom.is_target_file, surfcom.parse_measurements),
+        'ch_assy': (ch_assy.is_target_file, ch_assy.extract_pdf_data),
+        'ch_line': (ch_line.is_target_file, ch_line.extract_line_pdf_data),
+    }
+
+def cropped_templates():
+    """Names of the templates with a region smaller than the page (the others have nothing to compare)."""
+    return [name for name, t in TEMPLATES.items() if any(r != FULL_PAGE for r in t.regions.values())]
+
+def find_pdfs(paths):
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            for name in files:
+                if name.lower().endswith('.pdf'):
+                    yield os.path.join(root, name)
+
+def timed(parse, path, template, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = parse(path, template)
+    return result, (time.perf_counter() - start) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help="PDF files or folders (searched recursively)")
+    parser.add_argument('--template', choices=sorted(cropped_templates()), help="Parse every PDF with this template")
+    parser.add_argument('--repeat', type=int, default=1, help="Parses per PDF and mode (time is averaged)")
+    parser.add_argument('--limit', type=int, default=0, help="Stop after this many PDFs (0 = all)")
+    args = parser.parse_args()
+
+    parsers = {name: p for name, p in template_parsers().items() if name in cropped_templates()}
+    stats = {name: {'pdfs': 0, 'same': 0, 'fast': 0, 'full': 0.0, 'roi': 0.0} for name in parsers}
+    for count, path in enumerate(find_pdfs(args.paths), 1):
+        if args.limit and count > args.limit:
+            break
+        names = [args.template] if args.template else [n for n, (matches, _) in parsers.items() if matches(path)]
+        for name in names:
+            parse = parsers[name][1]
+            template = TEMPLATES[name]
+            # Parsers return (..., extractor); only the parsed data is compared
+            full_result, full_time = timed(parse, path, template.full_page(), args.repeat)
+            roi_result, roi_time = timed(parse, path, template, args.repeat)
+            full_rows, roi_rows = full_result[:-1], roi_result[:-1]
+            s = stats[name]
+            s['pdfs'] += 1
+            s['same'] += (full_rows == roi_rows)
+            s['fast'] += (roi_result[-1] == FAST)
+            s['full'] += full_time
+            s['roi'] += roi_time
+            if full_rows != roi_rows:
+                print(f"{name}: rows differ for {path}")
+
+    print(f"{'template':<10} {'PDFs':>6} {'full ms/PDF':>12} {'template ms/PDF':>16} {'saved':>7} {'same rows':>10} {'fast path':>10}")
+    for name, s in stats.items():
+        if not s['pdfs']:
+            continue
+        full_ms = s['full'] / s['pdfs'] * 1000
+        roi_ms = s['roi'] / s['pdfs'] * 1000
+        saved = (1 - roi_ms / full_ms) * 100 if full_ms else 0.0
+        print(f"{name:<10} {s['pdfs']:>6} {full_ms:>12.1f} {roi_ms:>16.1f} {saved:>6.0f}% {s['same']:>5}/{s['pdfs']} {s['fast']:>5}/{s['pdfs']}")
+
+if __name__ == "__main__":
+    main()
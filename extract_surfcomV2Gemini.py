@@ -1,142 +1,229 @@
-import pdfplumber
-import pyodbc
 import os
 import re
 from datetime import datetime
 
+import lab_db
+import path_metadata
+from file_catalog import CHANGED, SKIP, file_hash, open_catalog
+from lab_scanner import DirScanner, descend_within
+from parse_pool import DEFAULT_WORKERS, imap_files
+from pdf_fasttext import HitCounter, open_report
+from pdf_templates import get_template
+from run_metrics import RunMetrics, TimedCall
+
 # --- CONFIGURATION ---
 ROOT_PATH = r"C:\Users\User\OneDrive - oticsusa.com\Lab_Data\Cam Housing\2.4L CH\Surfcom\12-Dec"
-DB_CONFIG = {
-    'server': r'(local)\SQLEXPRESS',
-    'database': 'QualityShareData'
-}
-
-def extract_date_from_filename(file_path):
-    """Parses date from filename (YYYYMMDD...) or falls back to OS modification date."""
-    filename = os.path.basename(file_path)
-    match = re.search(r'(\d{10,12})', filename)
-    if not match:
-        return datetime.fromtimestamp(os.path.getmtime(file_path))
-    
-    ds = match.group(1)
-    try:
-        year, minute = int(ds[:4]), int(ds[-2:])
-        mid = ds[4:-2]
-        if len(mid) == 4: month, day, hour = int(mid[0]), int(mid[1:3]), int(mid[3])
-        elif len(mid) == 5: month, day, hour = int(mid[0]), int(mid[1:3]), int(mid[3:5])
-        elif len(mid) == 6: month, day, hour = int(mid[0:2]), int(mid[2:4]), int(mid[4:6])
-        return datetime(year=year, month=month, day=day, hour=hour, minute=minute)
-    except:
-        return datetime.fromtimestamp(os.path.getmtime(file_path))
+DB_TABLE = 'SurfcomMeasurements'
+CATALOG_NAME = 'surfcom'  # Key of this importer in the local file catalog
+PARSE_WORKERS = DEFAULT_WORKERS  # Worker processes for PDF parsing (1 = single-core, original behaviour)
+PARSE_TIMEOUT = 120              # Seconds one PDF may take before it is skipped (and retried next run)
+READ_AHEAD = True                # Read the next PDFs into memory on threads while the workers parse (parse_pool)
+FILES_PER_COMMIT = 50            # Files per DB transaction (1 = per file, 0 = autocommit)
+REPORT_TEMPLATE = 'surfcom'      # Page regions parsed (pdf_templates)
+# Folders deeper than this below ROOT_PATH are only entered when their path contains 'Surfcom'
+# (Lab_Data\<Part>\<Model>\Surfcom -> depth 2 when ROOT_PATH is Lab_Data)
+SURFCOM_SEARCH_DEPTH = 2
+FOLDER_PATTERN = r"surfcom"  # Folder rule (regex, case-insensitive) of the Surfcom report folders
+DB_COLUMNS = ['part_type', 'part_model', 'process_no', 'item_no', 'operator_initials', 'file_date',
+              'Measured Item', 'Measured Value', 'full_file_path']
+HASH_COLUMN = 'file_hash'  # Content hash of the source file, stored with every row (AddFileHash.sql)
+
+params_list = ['Ra1max', 'Ra8max', 'Ramax', 'Rz1max', 'Rz8max', 'Rzmax', 'Ra1', 'Ra8', 'Rz1', 'Rz8', 'Ra', 'Rz', 'Rt', 'Pa', 'Pt']
+pdf_pattern = re.compile(r"(" + "|".join(params_list) + r")\s+([\d\.]+)um")
+
+def extract_date_from_filename(file_path, st=None):
+    """
+    Parses date from filename (YYYYMMDD..., memoized per filename) or falls back to the
+    OS modification date, taken from st when the walk already stat'ed the file.
+    """
+    stamp = path_metadata.filename_datetime(os.path.basename(file_path))
+    if stamp is not None:
+        return stamp
+    if st is None:
+        st = os.stat(file_path)
+    return datetime.fromtimestamp(st.st_mtime)
+
+def is_target_file(full_path):
+    """True for PDFs inside a Surfcom folder."""
+    return full_path.lower().endswith(".pdf") and 'surfcom' in os.path.dirname(full_path).lower()
+
+def parse_measurements(full_path, template=None, data=None):
+    """
+    ((parameter, value) pairs or None when the PDF has no text layer, extractor used).
+    Only the template's regions are scanned (top-left area where measurements usually live),
+    from the raw-text fast path when it finds the template's labels (pdf_fasttext).
+    """
+    template = template or get_template(REPORT_TEMPLATE)
+    texts = []
+    with open_report(full_path, template, data=data) as (pages, extractor):
+        for page in template.select(pages):
+            texts.append(template.text(page, 'values'))
+    text = "\n".join(t for t in texts if t)
+    if not text:
+        return None, extractor
+    return pdf_pattern.findall(text), extractor
+
+def parse_file(full_path, st=None, data=None):
+    """
+    Parses one Surfcom PDF into (DB rows as tuples in DB_COLUMNS order or None when the PDF
+    has no text layer, extractor used). st is the file's stat result from the walk, if any
+    (saves a stat for the date fallback), data the PDF's content when it was read ahead.
+    Runs in the parse workers.
+    """
+    # Model definitions and filename rules live in path_metadata (folder part cached per folder)
+    part_type, found_model, proc, item, init = path_metadata.classify_surfcom(full_path)
+    file_date = extract_date_from_filename(full_path, st)
+
+    matches, extractor = parse_measurements(full_path, data=data)
+    if matches is None:
+        return None, extractor
+    return [
+        (part_type, found_model, proc, item, init, file_date, param, float(value), full_path)
+        for param, value in matches
+    ], extractor
+
+def parse_file_job(job, data=None):
+    """Worker entry point for a (full_path, stat) job from iter_new_files (data: read-ahead bytes)."""
+    return parse_file(*job, data=data)
+
+def write_rows(cursor, full_path, status, rows, digest=None):
+    """
+    Inserts the parsed rows of one file with its content hash (digest, hashed here when None),
+    replacing the old rows of a CHANGED file.
+    Returns the number of rows written. The caller owns the transaction and the catalog.
+    """
+    if status == CHANGED:
+        lab_db.delete_file_rows(cursor, DB_TABLE, [full_path])
+    digest = digest or file_hash(full_path)
+    return lab_db.bulk_insert(cursor, DB_TABLE, DB_COLUMNS + [HASH_COLUMN], [row + (digest,) for row in rows])
+
+def import_file(cursor, full_path, status, st=None, digest=None):
+    """
+    Parses one Surfcom PDF and inserts its rows (used by the watch-folder service), digest: its
+    content hash when the caller has it already.
+    Returns the number of rows written, or None when the PDF has no text layer.
+    """
+    rows, extractor = parse_file(full_path, st)
+    if rows is None:
+        return None
+    return write_rows(cursor, full_path, status, rows, digest)
+
+def iter_new_files(scanner, catalog, file_state, metrics):
+    """
+    Yields (path, stat) of the Surfcom PDFs under ROOT_PATH that are new or changed since they were imported.
+    The stat result and catalog status of each yielded path are stored in file_state.
+    """
+    for root, entries in metrics.timed_iter('walk', scanner.walk(ROOT_PATH)):
+        if 'surfcom' not in root.lower():
+            continue
+
+        for entry in entries:
+            if entry.name.lower().endswith(".pdf"):
+                # DUPLICATE CHECK: Skip files imported before and not modified since,
+                # and copies of already imported content
+                with metrics.timer('stat'):
+                    st = entry.stat()
+                with metrics.timer('dedup_check'):
+                    status = catalog.check(entry.path, st)
+                metrics.count(status)
+                if status in SKIP:
+                    continue
+                file_state[entry.path] = (st, status)
+                yield entry.path, st
 
 def process_surfcom():
-    conn_str = (
-        f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-        f"SERVER={DB_CONFIG['server']};"
-        f"DATABASE={DB_CONFIG['database']};"
-        f"Trusted_Connection=yes;"
-    )
-    
+    # Stage timers and counters of this run, saved as a run report at the end (run_metrics)
+    metrics = RunMetrics(CATALOG_NAME)
     try:
-        conn = pyodbc.connect(conn_str)
+        conn = metrics.connection(lab_db.connect(autocommit=(FILES_PER_COMMIT == 0)))
         cursor = conn.cursor()
         
-        # SPEED OPTIMIZATION: Load existing paths into a SET for instant lookup
-        print("Loading existing records from database for duplicate checking...")
-        cursor.execute("SELECT full_file_path FROM SurfcomMeasurements")
-        existing_paths = {row[0] for row in cursor.fetchall() if row[0]}
-        print(f"Database ready. Skipping {len(existing_paths)} already imported files.")
+        # SPEED OPTIMIZATION: Local file catalog; the DB path list is only loaded to seed it on the first run
+        with metrics.timer('catalog_open'):
+            catalog = open_catalog(CATALOG_NAME, lambda: lab_db.load_imported_paths(cursor, DB_TABLE, hash_column=HASH_COLUMN))
     except Exception as e:
         print(f"Connection failed: {e}")
         return
 
     # Tracking variables
     new_files_count = 0
-    batch_size = 50 # CHANGE THIS: Report and Commit to DB every 50 files
-    
-    # Model Definitions
-    REAR_COVER_MODELS = ['031C', '967K', 'T324']
-    CAM_HOUSING_MODELS = ['2.4L CH', 'A25 CH', '2GR KAI CH', 'M20 CH', 'V6T CH']
-    
-    params_list = ['Ra1max', 'Ra8max', 'Ramax', 'Rz1max', 'Rz8max', 'Rzmax', 'Ra1', 'Ra8', 'Rz1', 'Rz8', 'Ra', 'Rz', 'Rt', 'Pa', 'Pt']
-    pdf_pattern = re.compile(r"(" + "|".join(params_list) + r")\s+([\d\.]+)um")
+    batch_size = 50 # CHANGE THIS: Report progress every 50 files
     
     print(f"Scanning Root: {ROOT_PATH}")
     
-    # Walk through the entire Lab_Data directory
-    for root, dirs, files in os.walk(ROOT_PATH):
-        # SPEED CHANGE: Only enter folders that contain 'surfcom'
-        if 'surfcom' not in root.lower():
+    # SPEED CHANGE: Non-Surfcom subtrees are pruned before they are listed,
+    # folders unchanged since the last run are not listed again
+    scanner = DirScanner(CATALOG_NAME, descend=descend_within(FOLDER_PATTERN, SURFCOM_SEARCH_DEPTH))
+    file_state = {}
+    hits = HitCounter()
+    # SPEED CHANGE: PDFs are parsed in worker processes (PARSE_WORKERS), this process is the
+    # single DB writer. Results arrive in scan order, a PDF that hangs is dropped after PARSE_TIMEOUT.
+
+    def committed(files):
+        # Only record files in the catalog once their rows are committed
+        for path, st in files:
+            catalog.mark(path, st)
+        catalog.commit()
+
+    def retry(path):
+        # Not imported: listed again next run, together with any copies held back for it
+        for p in [path, *catalog.release(path)]:
+            scanner.retry_later(p)
+
+    def rolled_back(files):
+        for path, st in files:
+            retry(path)
+
+    # A failed file is rolled back on its own (savepoint), files are committed FILES_PER_COMMIT at a time
+    unit = lab_db.UnitOfWork(conn, FILES_PER_COMMIT, on_commit=committed, on_rollback=rolled_back)
+
+    new_files = iter_new_files(scanner, catalog, file_state, metrics)
+    results = imap_files(TimedCall(parse_file_job), new_files, PARSE_WORKERS, timeout=PARSE_TIMEOUT, prefetch=READ_AHEAD)
+    for (full_path, _), result, error in metrics.timed_iter('parse_wait', results):
+        st, status = file_state.pop(full_path)
+        file = os.path.basename(full_path)
+        if error:
+            print(f"Error parsing {file}: {error}")
+            metrics.count('parse_errors')
+            retry(full_path)
             continue
-            
-        path_upper = root.upper()
-        
-        # Determine Part Type
-        part_type = "Unknown"
-        model_list = []
-        if "REAR COVER" in path_upper:
-            part_type = "Rear Cover"
-            model_list = REAR_COVER_MODELS
-        elif "CAM HOUSING" in path_upper:
-            part_type = "Cam Housing"
-            model_list = CAM_HOUSING_MODELS
-
-        for file in files:
-            if file.lower().endswith(".pdf"):
-                full_path = os.path.join(root, file)
-                
-                # DUPLICATE CHECK: Skip files already in DB
-                if full_path in existing_paths:
-                    continue
-                
-                try:
-                    # Identify Model
-                    found_model = "Unknown"
-                    for m in model_list:
-                        if m.upper() in path_upper or m.upper() in file.upper():
-                            found_model = m
-                            break
-
-                    file_date = extract_date_from_filename(full_path)
-
-                    # Extract metadata from filename (Process, Item, Initials)
-                    tokens = re.findall(r'[a-zA-Z0-9]+', file)
-                    if len(tokens) >= 3:
-                        proc = tokens[0].upper().replace('P', '').strip()
-                        item = tokens[1].strip()
-                        init_match = re.search(r'([a-zA-Z]+)', tokens[2])
-                        init = init_match.group(0).upper() if init_match else "??"
-                    else:
-                        proc, item, init = "Unknown", "Unknown", "Unknown"
-
-                    # PDF Extraction
-                    with pdfplumber.open(full_path) as pdf:
-                        # Only scan top-left area where measurements usually live
-                        page = pdf.pages[0]
-                        text = page.within_bbox((0, 0, page.width * 0.75, page.height * 0.5)).extract_text()
-                        
-                        if text:
-                            matches = pdf_pattern.findall(text)
-                            for param, value in matches:
-                                cursor.execute('''
-                                    INSERT INTO SurfcomMeasurements 
-                                    (part_type, part_model, process_no, item_no, operator_initials, file_date, [Measured Item], [Measured Value], full_file_path)
-                                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                                ''', (part_type, found_model, proc, item, init, file_date, param, float(value), full_path))
-                            
-                            new_files_count += 1
-                            
-                            # SPEED & REPORTING CHANGE: Commit and print every 'batch_size'
-                            if new_files_count % batch_size == 0:
-                                conn.commit()
-                                print(f"[{datetime.now().strftime('%H:%M:%S')}] Processed {new_files_count} new files...")
-
-                except Exception as e:
-                    print(f"Error parsing {file}: {e}")
+        (rows, extractor), seconds = result
+        metrics.add('parse', seconds, f"{REPORT_TEMPLATE}/{extractor}")
+        hits.record(REPORT_TEMPLATE, extractor)
+
+        if rows is None:
+            retry(full_path)  # No text layer
+            continue
+        try:
+            written = unit.write((full_path, st), lambda cur: write_rows(cur, full_path, status, rows, catalog.digest(full_path)))
+        except Exception as e:
+            print(f"Error writing {file}: {e}")
+            metrics.count('write_errors')
+            retry(full_path)
+            continue
+        if not written:
+            retry(full_path)
+            continue
+        new_files_count += 1
+
+        # REPORTING CHANGE: print every 'batch_size'
+        if new_files_count % batch_size == 0:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Processed {new_files_count} new files...")
 
     # Final commit for the last batch
-    conn.commit()
+    unit.commit()
     conn.close()
+    catalog.close()
+    scanner.commit()
+    scanner.close()
+    print(f"Scan: {scanner.summary()}")
+    scanner.log_pruned()
+    print(f"Fast text path: {hits.summary()}")
+    print(f"DB writes: {unit.summary()}")
+    metrics.update(scanner.totals())
+    metrics.update(hits.totals())
+    metrics.update({'files_imported': unit.files, 'rows_written': unit.rows})
+    metrics.finish()
     print(f"\n--- SUCCESS --- Total New Imports: {new_files_count}")
 
 if __name__ == "__main__":
@@ -0,0 +1,230 @@
+"""
+Persistent local catalog of files the importers have already seen.
+
+Stored as an SQLite file next to the scripts. For every (importer, path) it keeps the size,
+mtime and content hash recorded at import time, so a run only has to stat each file:
+    NEW       - never imported by this importer
+    CHANGED   - size/mtime moved and the content hash differs (e.g. a re-measured part)
+    UNCHANGED - same size/mtime, or only the timestamps moved (OneDrive re-sync)
+    DUPLICATE - new path, but the same content was already imported by this importer
+                (a copy on another share, a moved folder); recorded without a parse or insert
+
+A copy of content that is only being imported in this run is recorded together with that
+import (mark); if the import fails, release() drops the claim and the copy is checked again.
+"""
+import hashlib
+import os
+import sqlite3
+from datetime import datetime
+
+try:
+    import xxhash
+except ImportError:  # Optional: content hashes fall back to blake2b
+    xxhash = None
+
+# --- CONFIGURATION ---
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lab_file_catalog.db')
+HASH_BLOCK_SIZE = 1024 * 1024
+DEDUP_BY_CONTENT = True  # False = a new path is always imported (original behaviour)
+
+NEW, CHANGED, UNCHANGED, DUPLICATE = 'new', 'changed', 'unchanged', 'duplicate'
+# Statuses the importers skip
+SKIP = (UNCHANGED, DUPLICATE)
+
+XXH_PREFIX = 'xxh3:'  # blake2b digests carry no prefix (catalogs written before xxhash was used)
+
+def file_hash(path, like=None):
+    """
+    Streaming content hash, the file is never held in memory as a whole. xxh3-128 when the
+    xxhash package is installed, blake2b otherwise; like=<stored digest> hashes with the
+    algorithm of that digest so it can be compared.
+    """
+    use_xxh = xxhash is not None and (like is None or like.startswith(XXH_PREFIX))
+    h = xxhash.xxh3_128() if use_xxh else hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            h.update(block)
+    return (XXH_PREFIX if use_xxh else '') + h.hexdigest()
+
+_connections = {}  # catalog file -> [sqlite3 connection, open users]
+
+def open_connection(path=CATALOG_PATH):
+    """
+    Connection to a catalog file, shared by every FileCatalog and DirScanner of the process.
+    SQLite allows one writer per file: with a connection each, a catalog holding an uncommitted
+    write (a seeded or touched file, see check) would lock the others out ('database is locked').
+    """
+    entry = _connections.setdefault(os.path.abspath(path), [None, 0])
+    if entry[0] is None:
+        entry[0] = sqlite3.connect(path)
+    entry[1] += 1
+    return entry[0]
+
+def close_connection(conn):
+    """Commits; the shared connection itself is closed by its last user."""
+    conn.commit()
+    for key, entry in _connections.items():
+        if entry[0] is conn:
+            entry[1] -= 1
+            if not entry[1]:
+                del _connections[key]
+                conn.close()
+            return
+
+class FileCatalog:
+    def __init__(self, importer, path=CATALOG_PATH):
+        self.importer = importer
+        self.conn = open_connection(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                importer     TEXT NOT NULL,
+                path         TEXT NOT NULL,
+                size         INTEGER,
+                mtime        REAL,
+                content_hash TEXT,
+                imported_at  TEXT,
+                PRIMARY KEY (importer, path)
+            )
+        """)
+        self.conn.commit()
+        # The whole catalog for one importer fits comfortably in memory; lookups stay local
+        self.entries = {
+            path: (size, mtime, digest)
+            for path, size, mtime, digest in self.conn.execute(
+                "SELECT path, size, mtime, content_hash FROM files WHERE importer = ?", (importer,))
+        }
+        # content hash -> a path imported with that content, for DUPLICATE
+        self.hashes = {digest: path for path, (_, _, digest) in self.entries.items() if digest}
+        self.digests = {}  # path -> hash computed this run, reused by digest()/mark()
+        self.claims = {}   # NEW path -> its hash, until the import is marked or released
+        self.copies = {}   # claiming path -> {copy path: (stat, hash)}, recorded by its mark()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, path):
+        return path in self.entries
+
+    def seed(self, paths):
+        """
+        One-time bootstrap from the paths already in SQL Server, either a set of paths or a
+        {path: content hash} dict. Size/mtime (and a missing hash) are filled in from disk the
+        first time each file is seen again (see check).
+        """
+        hashes = paths if isinstance(paths, dict) else {}
+        new_paths = [p for p in paths if p not in self.entries]
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO files (importer, path, content_hash) VALUES (?, ?, ?)",
+            [(self.importer, p, hashes.get(p)) for p in new_paths])
+        self.conn.commit()
+        for p in new_paths:
+            self.entries[p] = (None, None, hashes.get(p))
+            if hashes.get(p):
+                self.hashes[hashes[p]] = p
+        return len(new_paths)
+
+    def digest(self, path):
+        """Content hash of a file, computed at most once per run."""
+        if path not in self.digests:
+            self.digests[path] = file_hash(path)
+        return self.digests[path]
+
+    def check(self, path, st, record=True):
+        """
+        Classifies a file as NEW, CHANGED, UNCHANGED or DUPLICATE from its os.stat() result.
+        A DUPLICATE is recorded as imported right away (saved with the next commit), or with
+        the import of its owner when that is still in progress.
+        record=False only looks: nothing is stored, claimed or cached (e.g. to decide whether
+        a file still being written is worth watching).
+        """
+        entry = self.entries.get(path)
+        if entry is None:
+            # New path: one streaming hash decides whether the content is already in the DB
+            if DEDUP_BY_CONTENT and st.st_size:
+                digest = self.digest(path) if record else file_hash(path)
+                owner = self.hashes.get(digest)
+                if owner is not None and owner != path:
+                    if record:
+                        digest = self.digests.pop(path)
+                        if owner in self.claims:
+                            # The owner's rows are not committed yet: recorded by its mark()
+                            self.copies.setdefault(owner, {})[path] = (st, digest)
+                        else:
+                            self._store(path, st, digest)
+                    return DUPLICATE
+                if record:
+                    # Claimed right away, so a second copy found in the same run is a DUPLICATE too.
+                    # Checking the claiming path again (e.g. before a retry) still gives NEW.
+                    self.hashes[digest] = path
+                    self.claims[path] = digest
+            return NEW
+        size, mtime, digest = entry
+        seeded = size is None  # Seeded from the DB: today's stat becomes the baseline, without re-importing
+        if seeded or (size == st.st_size and mtime == st.st_mtime):
+            if record and digest is None and DEDUP_BY_CONTENT and st.st_size:
+                # Seeded or recorded without a hash: hashed once, so later copies of it are DUPLICATEs
+                self._store(path, st, file_hash(path))
+            elif record and seeded:
+                self._store(path, st, digest)
+            return UNCHANGED
+        if digest is not None:
+            current = file_hash(path, like=digest)
+            if current == digest:
+                if record:
+                    self._store(path, st, digest)
+                return UNCHANGED
+            if record:
+                self.digests[path] = current
+        return CHANGED
+
+    def mark(self, path, st, digest=None):
+        """Records a successful import. Call after the DB transaction holding its rows is committed."""
+        digest = digest or self.digests.pop(path, None) or file_hash(path)
+        self.claims.pop(path, None)
+        self._store(path, st, digest)
+        for copy, (copy_st, copy_digest) in self.copies.pop(path, {}).items():
+            if copy_digest == digest:
+                self._store(copy, copy_st, copy_digest)
+
+    def release(self, path):
+        """
+        A NEW path whose import failed or was rolled back: its content claim is dropped, so
+        neither it nor its copies count as imported. Returns the copies held back for it,
+        which the caller retries like the path itself.
+        """
+        digest = self.claims.pop(path, None)
+        if digest and self.hashes.get(digest) == path:
+            del self.hashes[digest]
+        self.digests.pop(path, None)
+        return list(self.copies.pop(path, {}))
+
+    def _store(self, path, st, digest):
+        old = self.entries.get(path)
+        if old and old[2] != digest and self.hashes.get(old[2]) == path:
+            del self.hashes[old[2]]  # That content is no longer in the DB under this path
+        self.entries[path] = (st.st_size, st.st_mtime, digest)
+        if digest:
+            self.hashes.setdefault(digest, path)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files (importer, path, size, mtime, content_hash, imported_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (self.importer, path, st.st_size, st.st_mtime, digest, datetime.now().isoformat(timespec='seconds')))
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        close_connection(self.conn)
+
+def open_catalog(importer, load_db_paths):
+    """
+    Opens the catalog for an importer. Only when it is still empty is load_db_paths()
+    called to seed it from SQL Server, so later runs skip the big startup query.
+    """
+    catalog = FileCatalog(importer)
+    if not len(catalog):
+        seeded = catalog.seed(load_db_paths())
+        print(f"File catalog seeded with {seeded} paths from the database.")
+    else:
+        print(f"File catalog loaded: {len(catalog)} known files.")
+    return catalog
@@ -0,0 +1,261 @@
+"""
+One-pass import of Lab_Data: replaces running the batch importers one after another.
+
+Each root is walked once (lab_scanner; a root inside another root is walked as part of it) and
+every file is routed by extension and path rules to each importer that takes it:
+    .asc under the Rear Cover root        -> CMM_WalkV3Gemini
+    EX/IN PDFs in ASSY folders            -> CMM_WalkCHGemini
+    Chain Case / Head PDFs in LINE folders -> CMM_WalkCHGemini CHAINCASE HEAD
+    PDFs in Surfcom folders                -> extract_surfcomV2Gemini
+The files are parsed in one worker pool (parse_pool) by the importers' own parse functions and
+written by this process over one DB connection (lab_db.UnitOfWork). Every importer keeps its
+own catalog entries, so the batch scripts and the watch-folder service still work alongside.
+
+CMM_WalkCHGemini ASSY.py is a copy of CMM_WalkCHGemini.py (same catalog), and
+CMM_WalkCHPerplexity.py loads the same ASSY reports into the same table, so neither gets a route.
+"""
+import os
+import time
+from datetime import datetime
+from operator import itemgetter
+
+import lab_db
+from file_catalog import CHANGED, SKIP, open_catalog
+from lab_scanner import DirScanner, descend_within
+from parse_pool import DEFAULT_WORKERS, imap_files
+from pdf_fasttext import HitCounter
+from run_metrics import RunMetrics, TimedCall
+from watch_lab_data import load_script, within
+
+# --- CONFIGURATION ---
+# Route -> importer script. A file taken by several importers is parsed and written once for each.
+IMPORTERS = {
+    'cmm': 'CMM_WalkV3Gemini.py',
+    'ch_assy': 'CMM_WalkCHGemini.py',
+    'ch_line': 'CMM_WalkCHGemini CHAINCASE HEAD.py',
+    'surfcom': 'extract_surfcomV2Gemini.py',
+}
+SCANNER_NAME = 'import_lab_data'  # Key of the shared walk's folder state in the local file catalog
+PARSE_WORKERS = DEFAULT_WORKERS   # Worker processes shared by all importers (1 = single-core)
+# Seconds one file may take before it is skipped (and retried next run). With a timeout every file
+# is its own pool task; 0 hands the workers chunks of files (faster for many small .asc files).
+PARSE_TIMEOUT = 120
+READ_AHEAD = True      # Read the next files into memory on threads while the workers parse (parse_pool)
+FILES_PER_COMMIT = 50  # Files per DB transaction (a CMM batch of BATCH_ROWS counts as one), 0 = autocommit
+
+_modules = {}
+
+def importer(name):
+    """The importer script of a route, loaded once per process (each worker loads its own copy)."""
+    if name not in _modules:
+        _modules[name] = load_script(IMPORTERS[name])
+    return _modules[name]
+
+def parse_job(job, data=None):
+    """Worker entry point for a (route, full_path, stat) job: runs that importer's parser (data: read-ahead bytes)."""
+    name, full_path, st = job
+    module = importer(name)
+    if name == 'cmm':
+        return module.parse_asc_file(full_path, st, data)
+    if name == 'surfcom':
+        return module.parse_file(full_path, st, data)
+    return module.parse_file(full_path, data)
+
+def depth_below(path, root):
+    return path.rstrip(os.sep).count(os.sep) - root.rstrip(os.sep).count(os.sep)
+
+class Route:
+    """One importer in the shared walk: its root, descend rule, file rule and catalog."""
+    def __init__(self, name, root, descend, matches, catalog):
+        self.name = name
+        self.module = importer(name)
+        self.root = root
+        self.descend = descend
+        self.matches = matches
+        self.catalog = catalog
+        self.files = 0
+
+    def takes(self, path):
+        return within(path, self.root) and self.matches(path)
+
+def build_routes(cursor):
+    cmm = importer('cmm')
+    routes = [Route('cmm', cmm.ROOT_DIRECTORY, lambda path, depth: True,
+                    lambda path: path.lower().endswith('.asc'),
+                    open_catalog(cmm.CATALOG_NAME, cmm.load_db_paths))]
+    for name in ('ch_assy', 'ch_line', 'surfcom'):
+        module = importer(name)
+        depth = module.SURFCOM_SEARCH_DEPTH if name == 'surfcom' else module.FOLDER_SEARCH_DEPTH
+        seed = lambda module=module: lab_db.load_imported_paths(cursor, module.DB_TABLE, hash_column=module.HASH_COLUMN)
+        routes.append(Route(name, module.ROOT_PATH, descend_within(module.FOLDER_PATTERN, depth),
+                            module.is_target_file, open_catalog(module.CATALOG_NAME, seed)))
+    return routes
+
+def walk_roots(routes):
+    """The route roots that are not inside another route's root, each walked once."""
+    roots = []
+    for root in sorted({r.root for r in routes}, key=len):
+        if not any(within(root, other) for other in roots):
+            roots.append(root)
+    return roots
+
+def shared_descend(routes):
+    """Descend rule of the shared walk: enter a folder when any importer below or above it wants it."""
+    def rule(path, depth):
+        for route in routes:
+            if within(path, route.root):
+                if route.descend(path, depth_below(path, route.root)):
+                    return True
+            elif within(route.root, path):
+                return True  # On the way down to a nested root
+        return False
+    return rule
+
+def iter_jobs(scanner, routes, file_state, metrics):
+    """
+    Yields a (route, path, stat) job for every file an importer takes that is new or changed
+    since that importer imported it. The catalog status of each job is stored in file_state.
+    """
+    for root in walk_roots(routes):
+        for folder, entries in metrics.timed_iter('walk', scanner.walk(root)):
+            for entry in entries:
+                st = None
+                for route in routes:
+                    if not route.takes(entry.path):
+                        continue
+                    if st is None:
+                        with metrics.timer('stat'):
+                            st = entry.stat()
+                    with metrics.timer('dedup_check', route.name):
+                        status = route.catalog.check(entry.path, st)
+                    metrics.count(f"{route.name}_{status}")
+                    if status in SKIP: continue  # Imported and unmodified, or a copy of imported content
+                    file_state[(route.name, entry.path)] = status
+                    yield route.name, entry.path, st
+
+def main():
+    # Stage timers and counters of this run, saved as a run report at the end (run_metrics)
+    metrics = RunMetrics(SCANNER_NAME)
+    conn = metrics.connection(lab_db.connect(autocommit=(FILES_PER_COMMIT == 0)))
+    with metrics.timer('catalog_open'):
+        routes = build_routes(conn.cursor())
+    by_name = {r.name: r for r in routes}
+    cmm = by_name['cmm'].module
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Scanning {', '.join(walk_roots(routes))} "
+          f"with {PARSE_WORKERS} worker(s)...")
+    start = time.perf_counter()
+
+    scanner = DirScanner(SCANNER_NAME, descend=shared_descend(routes))
+    file_state = {}
+    hits = HitCounter()
+    cmm_batch, cmm_files, cmm_replace = [], [], []
+
+    def committed(keys):
+        # Only record files in the catalogs once their rows are committed
+        for name, files in keys:
+            for path, st in files:
+                by_name[name].catalog.mark(path, st)
+        # The catalogs share one SQLite connection (file_catalog.open_connection): one commit saves all
+        routes[0].catalog.commit()
+
+    def retry(name, path):
+        # Not imported: listed again next run, together with any copies held back for it
+        for p in [path, *by_name[name].catalog.release(path)]:
+            scanner.retry_later(p)
+
+    def rolled_back(keys):
+        for name, files in keys:
+            for path, st in files:
+                retry(name, path)
+
+    # The single writer: a failed file (or CMM batch) is rolled back on its own,
+    # FILES_PER_COMMIT of them share a transaction
+    unit = lab_db.UnitOfWork(conn, FILES_PER_COMMIT, on_commit=committed, on_rollback=rolled_back)
+
+    def write(name, files, func):
+        try:
+            written = unit.write((name, files), func)
+        except Exception as e:
+            print(f"{name}: error writing {os.path.basename(files[0][0])}"
+                  f"{f' (+{len(files) - 1} files)' if len(files) > 1 else ''}: {e}")
+            metrics.count(f"{name}_write_errors")
+            written = 0
+        if not written:
+            for path, st in files:
+                retry(name, path)
+            return
+        by_name[name].files += len(files)
+
+    def flush_cmm():
+        batch, files, replace = cmm_batch[:], cmm_files[:], cmm_replace[:]
+        del cmm_batch[:], cmm_files[:], cmm_replace[:]
+        def write_batch(cursor):
+            cmm.write_batch(cursor, batch, replace)
+            # A file the staged load skipped is already in the DB, so it counts as imported too
+            return len(batch)
+        write('cmm', files, write_batch)
+        # The staged INSERT ... WITH (TABLOCK) holds the table lock until the commit: release it now
+        unit.commit()
+
+    jobs = iter_jobs(scanner, routes, file_state, metrics)
+    results = imap_files(TimedCall(parse_job), jobs, PARSE_WORKERS, timeout=PARSE_TIMEOUT, prefetch=READ_AHEAD,
+                         path_of=itemgetter(1))
+    for (name, full_path, st), result, error in metrics.timed_iter('parse_wait', results):
+        status = file_state.pop((name, full_path))
+        route = by_name[name]
+        if error:
+            print(f"{name}: error in {os.path.basename(full_path)}: {error}")
+            metrics.count(f"{name}_parse_errors")
+            retry(name, full_path)
+            continue
+        result, seconds = result
+
+        if name == 'cmm':
+            metrics.add('parse', seconds, f"asc_{route.module.ASC_PARSER}")
+            if not result:
+                retry(name, full_path)
+                continue
+            # .asc rows are buffered and written BATCH_ROWS at a time, on file boundaries
+            digest = route.catalog.digest(full_path)
+            cmm_batch.extend(row + (digest,) for row in result)
+            cmm_files.append((full_path, st))
+            if status == CHANGED:
+                cmm_replace.append(full_path)
+            if len(cmm_batch) >= cmm.BATCH_ROWS:
+                flush_cmm()
+            continue
+
+        rows, extractor = result
+        metrics.add('parse', seconds, f"{route.module.REPORT_TEMPLATE}/{extractor}")
+        hits.record(route.module.REPORT_TEMPLATE, extractor)
+        if rows is None:
+            retry(name, full_path)  # Surfcom PDF without a text layer
+            continue
+        write(name, [(full_path, st)],
+              lambda cur: route.module.write_rows(cur, full_path, status, rows, route.catalog.digest(full_path)))
+
+    if cmm_files:
+        flush_cmm()
+    unit.commit()
+    conn.close()
+    for route in routes:
+        route.catalog.close()
+    # Folder state is only saved once every file found in it is committed
+    scanner.commit()
+    scanner.close()
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"Scan: {scanner.summary()}")
+    scanner.log_pruned()
+    print(f"Fast text path: {hits.summary()}")
+    print(f"DB writes: {unit.summary()}")
+    print(f"Imported: {', '.join(f'{r.name} {r.files}' for r in routes)} files")
+    metrics.update(scanner.totals())
+    metrics.update(hits.totals())
+    metrics.update({f"{r.name}_files_imported": r.files for r in routes})
+    metrics.update({'files_imported': sum(r.files for r in routes), 'rows_written': unit.rows})
+    metrics.finish()
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Finished in {elapsed:.1f}s")
+
+if __name__ == "__main__":
+    main()
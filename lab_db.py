@@ -0,0 +1,300 @@
+"""
+Shared SQL Server access for the Lab_Data importers.
+
+All importers write through bulk_insert() so the insert strategy is picked in one place:
+    'fast_executemany' - pyodbc sends each chunk as one parameter array (fastest on SQL Server)
+    'multi_values'     - one INSERT ... VALUES (...), (...), ... per group of rows
+    'executemany'      - plain executemany, one round trip per row (original behaviour)
+
+staged_insert() loads a batch into a #temp heap first and moves it into the target table with
+one set-based INSERT ... SELECT that skips files already in the table (dedup in SQL).
+staged_insert_normalized() does the same for the file + values tables (CreateNormalizedTables.sql).
+
+UnitOfWork groups the writes of several files into one transaction (see FILES_PER_COMMIT).
+"""
+import time
+
+try:
+    import pyodbc
+except ImportError:  # Benchmarks run against a local stand-in DB without pyodbc
+    pyodbc = None
+
+# --- CONFIGURATION ---
+DB_CONFIG = {
+    'server': r'(local)\SQLEXPRESS',
+    'database': 'QualityShareData'
+}
+ODBC_DRIVER = 'ODBC Driver 17 for SQL Server'
+
+BULK_STRATEGY = 'fast_executemany'
+BULK_CHUNK_ROWS = 10000
+# SQL Server allows at most 2100 parameters and 1000 row constructors per statement
+MAX_STATEMENT_PARAMS = 2000
+MAX_VALUES_ROWS = 1000
+
+STRATEGIES = ('fast_executemany', 'multi_values', 'executemany')
+
+# Table hint of the staging INSERT ... SELECT: TABLOCK allows a minimally logged insert and takes
+# one table lock for the (short) statement instead of row locks competing with report queries
+STAGED_INSERT_HINT = "WITH (TABLOCK)"
+
+# Files written per transaction by UnitOfWork: 1 = one transaction per file,
+# 0 = autocommit, every statement is its own transaction (original behaviour)
+FILES_PER_COMMIT = 50
+SAVEPOINT_SQL = "SAVE TRANSACTION {name}"
+ROLLBACK_TO_SAVEPOINT_SQL = "ROLLBACK TRANSACTION {name}"
+
+def connection_string(driver=ODBC_DRIVER, extra=""):
+    return (
+        f"DRIVER={{{driver}}};"
+        f"SERVER={DB_CONFIG['server']};"
+        f"DATABASE={DB_CONFIG['database']};"
+        f"Trusted_Connection=yes;"
+        f"{extra}"
+    )
+
+def connect(autocommit=False, driver=ODBC_DRIVER, extra=""):
+    if pyodbc is None:
+        raise RuntimeError("pyodbc is not installed")
+    return pyodbc.connect(connection_string(driver, extra), autocommit=autocommit)
+
+def quote_column(name):
+    """Brackets a column name so 'Line#' and 'Measured Item' are valid identifiers."""
+    return name if name.startswith('[') else f"[{name}]"
+
+def insert_sql(table, columns, row_count=1):
+    col_list = ", ".join(quote_column(c) for c in columns)
+    placeholders = "(" + ", ".join("?" * len(columns)) + ")"
+    return f"INSERT INTO {table} ({col_list}) VALUES " + ", ".join([placeholders] * row_count)
+
+def _chunks(rows, size):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+def bulk_insert(cursor, table, columns, rows, strategy=None, chunk_rows=BULK_CHUNK_ROWS):
+    """
+    Inserts rows (sequence of tuples in `columns` order) into table using the configured strategy.
+    Does not commit; the caller owns the transaction. Returns the number of rows sent.
+    """
+    strategy = strategy or BULK_STRATEGY
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown bulk strategy '{strategy}', expected one of {STRATEGIES}")
+    rows = list(rows)
+    if not rows:
+        return 0
+
+    if strategy == 'multi_values':
+        per_statement = max(1, min(MAX_VALUES_ROWS, MAX_STATEMENT_PARAMS // len(columns)))
+        full_sql = insert_sql(table, columns, per_statement)
+        for chunk in _chunks(rows, per_statement):
+            sql = full_sql if len(chunk) == per_statement else insert_sql(table, columns, len(chunk))
+            cursor.execute(sql, [v for row in chunk for v in row])
+        return len(rows)
+
+    # fast_executemany only exists on pyodbc cursors; other DB-API drivers fall back to plain executemany
+    if hasattr(cursor, 'fast_executemany'):
+        cursor.fast_executemany = (strategy == 'fast_executemany')
+    sql = insert_sql(table, columns)
+    for chunk in _chunks(rows, chunk_rows):
+        cursor.executemany(sql, chunk)
+    return len(rows)
+
+def stage_table(table, prefix="#stage_"):
+    """Session-local staging table (#temp) of a target table."""
+    return prefix + table.replace('[', '').replace(']', '').split('.')[-1]
+
+def _column_list(columns, alias=None):
+    return ", ".join((f"{alias}." if alias else "") + quote_column(c) for c in columns)
+
+def _prepare_stage(cursor, stage, select_list, table):
+    """
+    Creates the #temp table stage as SELECT TOP 0 select_list FROM table (so it has the target's
+    own column types) the first time on a connection, empties it on every later call.
+    """
+    cursor.execute(
+        f"IF OBJECT_ID('tempdb..{stage}') IS NULL "
+        f"BEGIN SELECT TOP 0 {select_list} INTO {stage} FROM {table} END "
+        f"ELSE TRUNCATE TABLE {stage};")
+
+def staged_insert(cursor, table, columns, rows, key_column='FilePath', replace_paths=(), strategy=None):
+    """
+    Bulk-inserts rows into a heap staging table (#stage_<table>, same column types as table) and
+    copies them into table with one INSERT ... SELECT. Rows whose key_column value (file path)
+    already exists in table are skipped; rows of replace_paths are deleted from table first.
+    Does not commit. Returns the number of rows inserted into table.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    stage = stage_table(table)
+    col_list = _column_list(columns)
+    key = quote_column(key_column)
+    _prepare_stage(cursor, stage, col_list, table)
+    bulk_insert(cursor, stage, columns, rows, strategy)
+
+    delete_file_rows(cursor, table, replace_paths, column=key_column)
+    cursor.execute(
+        f"INSERT INTO {table} {STAGED_INSERT_HINT} ({col_list}) "
+        f"SELECT {col_list} FROM {stage} AS s "
+        f"WHERE NOT EXISTS (SELECT 1 FROM {table} AS t WHERE t.{key} = s.{key});")
+    inserted = cursor.rowcount
+    cursor.execute(f"TRUNCATE TABLE {stage};")
+    return inserted
+
+def staged_insert_normalized(cursor, files_table, values_table, columns, file_columns, value_columns, rows,
+                             key_column='FilePath', id_column='FileID', replace_paths=(), strategy=None):
+    """
+    staged_insert for a file table (one row per file, surrogate key id_column) plus a narrow
+    values table referencing it. rows are tuples in `columns` order, as for the flat table;
+    the file_columns part is sent once per file, the value_columns part once per row with a
+    batch-local file number. Files whose key_column value already exists in files_table are
+    skipped; replace_paths are deleted from files_table first (their values go with them,
+    ON DELETE CASCADE). Does not commit. Returns the number of value rows inserted.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    file_idx = [columns.index(c) for c in file_columns]
+    value_idx = [columns.index(c) for c in value_columns]
+    key_pos = columns.index(key_column)
+    files = {}   # key -> (batch file number, file tuple)
+    values = []  # (batch file number, value tuple...)
+    for row in rows:
+        entry = files.get(row[key_pos])
+        if entry is None:
+            entry = files[row[key_pos]] = (len(files), tuple(row[i] for i in file_idx))
+        values.append((entry[0],) + tuple(row[i] for i in value_idx))
+
+    stage_files, stage_values = stage_table(files_table), stage_table(values_table)
+    new_files = stage_table(files_table, "#new_")
+    file_list, value_list = _column_list(file_columns), _column_list(value_columns)
+    key, file_id = quote_column(key_column), quote_column(id_column)
+    _prepare_stage(cursor, stage_files, f"CAST(0 AS INT) AS [BatchFile], {file_list}", files_table)
+    _prepare_stage(cursor, stage_values, f"CAST(0 AS INT) AS [BatchFile], {value_list}", values_table)
+    # CAST drops the IDENTITY property SELECT INTO would copy, so OUTPUT can fill the table
+    _prepare_stage(cursor, new_files, f"CAST({file_id} AS INT) AS {file_id}, {key}", files_table)
+    bulk_insert(cursor, stage_files, ['BatchFile'] + list(file_columns),
+                [(no,) + f for no, f in files.values()], strategy)
+    bulk_insert(cursor, stage_values, ['BatchFile'] + list(value_columns), values, strategy)
+
+    delete_file_rows(cursor, files_table, replace_paths, column=key_column)
+    cursor.execute(
+        f"INSERT INTO {files_table} {STAGED_INSERT_HINT} ({file_list}) "
+        f"OUTPUT inserted.{file_id}, inserted.{key} INTO {new_files} ({file_id}, {key}) "
+        f"SELECT {file_list} FROM {stage_files} AS s "
+        f"WHERE NOT EXISTS (SELECT 1 FROM {files_table} AS t WHERE t.{key} = s.{key});")
+    cursor.execute(
+        f"INSERT INTO {values_table} {STAGED_INSERT_HINT} ({file_id}, {value_list}) "
+        f"SELECT n.{file_id}, {_column_list(value_columns, 'v')} FROM {stage_values} AS v "
+        f"JOIN {stage_files} AS s ON s.[BatchFile] = v.[BatchFile] "
+        f"JOIN {new_files} AS n ON n.{key} = s.{key};")
+    inserted = cursor.rowcount
+    cursor.execute(f"TRUNCATE TABLE {stage_files}; TRUNCATE TABLE {stage_values}; TRUNCATE TABLE {new_files};")
+    return inserted
+
+def load_imported_paths(cursor, table, column='full_file_path', hash_column=None):
+    """
+    Loads the already-imported file paths once per run, so the per-file duplicate
+    check is a set lookup instead of a SELECT COUNT(*) round trip.
+    With hash_column: a {path: content hash} dict (file_catalog.FileCatalog.seed).
+    """
+    if hash_column:
+        cursor.execute(f"SELECT {quote_column(column)}, MAX({quote_column(hash_column)}) "
+                       f"FROM {table} GROUP BY {quote_column(column)}")
+        return {row[0]: row[1] for row in cursor.fetchall() if row[0]}
+    cursor.execute(f"SELECT DISTINCT {quote_column(column)} FROM {table}")
+    return {row[0] for row in cursor.fetchall() if row[0]}
+
+def delete_file_rows(cursor, table, paths, column='full_file_path'):
+    """Removes the rows of files that are about to be re-imported (changed on disk)."""
+    paths = list(paths)
+    if paths:
+        cursor.executemany(f"DELETE FROM {table} WHERE {quote_column(column)} = ?", [(p,) for p in paths])
+    return len(paths)
+
+class UnitOfWork:
+    """
+    Writes files into the DB in transactions of files_per_commit files.
+
+    Each file is written inside a savepoint, so a file that fails is rolled back on its own
+    (no partial journals) while the files before it in the same transaction are kept.
+    on_commit(keys) / on_rollback(keys) receive the keys of the files that were committed /
+    lost with a rolled back transaction, e.g. to update the local file catalog.
+    The connection must be opened with autocommit=(files_per_commit == 0).
+    """
+    def __init__(self, conn, files_per_commit=FILES_PER_COMMIT, on_commit=None, on_rollback=None):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.files_per_commit = files_per_commit
+        self.on_commit = on_commit
+        self.on_rollback = on_rollback
+        self.pending = []     # keys of the files written since the last commit
+        self.dirty = False    # statements sent since the last commit (a transaction is open)
+        self.rows = 0
+        self.files = 0
+        self.commits = 0
+        self.seconds = 0.0    # time spent in DB writes and commits
+
+    def write(self, key, func):
+        """
+        Runs func(cursor) -> rows written for one file. Files that wrote rows are handed to
+        on_commit with their transaction (every files_per_commit files). Errors are re-raised
+        after the file's statements are rolled back. Returns the number of rows written.
+        """
+        start = time.perf_counter()
+        try:
+            if not self.files_per_commit:
+                rows = func(self.cursor)
+            else:
+                # A savepoint needs an open transaction; before the first statement a failed
+                # file is undone by rolling back the (otherwise empty) transaction instead
+                savepoint = self.dirty
+                if savepoint:
+                    self.cursor.execute(SAVEPOINT_SQL.format(name='lab_file'))
+                try:
+                    rows = func(self.cursor)
+                except Exception:
+                    self._undo(savepoint)
+                    raise
+                self.dirty = True
+            if rows:
+                self.rows += rows
+                self.files += 1
+                self.pending.append(key)
+        finally:
+            self.seconds += time.perf_counter() - start
+        if len(self.pending) >= max(1, self.files_per_commit):
+            self.commit()
+        return rows
+
+    def _undo(self, savepoint):
+        if savepoint:
+            try:
+                self.cursor.execute(ROLLBACK_TO_SAVEPOINT_SQL.format(name='lab_file'))
+                return
+            except Exception:
+                pass  # Transaction doomed by the error: the whole batch is lost
+        self.rollback()
+
+    def commit(self):
+        start = time.perf_counter()
+        if self.files_per_commit and self.dirty:
+            self.conn.commit()
+            self.commits += 1
+        self.seconds += time.perf_counter() - start
+        self.dirty = False
+        keys, self.pending = self.pending, []
+        if keys and self.on_commit:
+            self.on_commit(keys)
+
+    def rollback(self):
+        self.conn.rollback()
+        self.dirty = False
+        keys, self.pending = self.pending, []
+        if keys and self.on_rollback:
+            self.on_rollback(keys)
+
+    def summary(self):
+        rate = self.rows / self.seconds if self.seconds else 0.0
+        mode = f"{self.files_per_commit} files/commit" if self.files_per_commit else "autocommit"
+        return f"{self.rows} rows from {self.files} files, {self.commits} commits ({mode}), {rate:.0f} inserts/s"
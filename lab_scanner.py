@@ -0,0 +1,175 @@
+"""
+Directory scanner shared by the Lab_Data importers.
+
+Built on os.scandir so that:
+  * subtrees are pruned *before* they are listed (descend rule per importer), and
+  * directories whose mtime has not changed since the last run are not listed again.
+    A directory's mtime only moves when entries are added, removed or renamed directly
+    inside it, so an unchanged folder (e.g. a closed-out '12-Dec') costs one stat per
+    subfolder instead of a full listing. Its files are not yielded again.
+
+    A report overwritten in place (a re-measured part saved under the same name) does
+    not move the folder mtime on NTFS / SMB shares, so it would never be seen as CHANGED.
+    Every folder is therefore listed again once its last listing is older than
+    RESCAN_DAYS, and the file catalog picks up the changed files then. Set RESCAN_DAYS
+    lower when re-measured reports must arrive sooner, or SKIP_UNCHANGED_DIRS = False
+    to list every folder on every run.
+
+Directory state lives in the same SQLite file as the file catalog (on the same connection,
+see file_catalog.open_connection) and is only saved by commit(), which the importers call
+after their last DB commit. A crash therefore just
+means a full listing on the next run.
+"""
+import json
+import os
+import re
+import time
+
+from file_catalog import CATALOG_PATH, close_connection, open_connection
+
+# --- CONFIGURATION ---
+SKIP_UNCHANGED_DIRS = True
+RESCAN_DAYS = 7  # An unchanged folder is still listed when its last listing is older (None = never)
+PRUNED_LOG_LIMIT = 20  # Pruned folders printed by log_pruned() (the summary always has the count)
+
+def descend_within(pattern, max_depth):
+    """
+    Descend rule: always enter folders up to max_depth below the root; deeper folders
+    are only entered when their path matches the regex pattern (case-insensitive).
+    max_depth None enters every folder.
+    """
+    regex = re.compile(pattern, re.IGNORECASE)
+    def rule(path, depth):
+        return max_depth is None or depth <= max_depth or regex.search(path) is not None
+    return rule
+
+class DirScanner:
+    def __init__(self, name, descend=None, skip_unchanged=SKIP_UNCHANGED_DIRS, catalog_path=CATALOG_PATH):
+        self.name = name
+        self.descend = descend or (lambda path, depth: True)
+        self.skip_unchanged = skip_unchanged
+        self.conn = open_connection(catalog_path)  # Shared with the file catalogs (one SQLite writer)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS dirs (
+                scanner TEXT NOT NULL,
+                path    TEXT NOT NULL,
+                mtime   REAL,
+                subdirs TEXT,
+                listed_at REAL,
+                PRIMARY KEY (scanner, path)
+            )
+        """)
+        # Catalogs written before RESCAN_DAYS: their folders count as never listed, so listed once
+        if 'listed_at' not in [row[1] for row in self.conn.execute("PRAGMA table_info(dirs)")]:
+            self.conn.execute("ALTER TABLE dirs ADD COLUMN listed_at REAL")
+        self.conn.commit()
+        self.state = {
+            path: (mtime, json.loads(subdirs), listed_at)
+            for path, mtime, subdirs, listed_at in self.conn.execute(
+                "SELECT path, mtime, subdirs, listed_at FROM dirs WHERE scanner = ?", (name,))
+        }
+        self._pending = {}
+        self._retry = set()
+        self.dirs_listed = 0
+        self.dirs_skipped = 0
+        self.dirs_pruned = 0
+        self.pruned = []  # Folders the descend rule did not enter (log_pruned)
+
+    def walk(self, root):
+        """
+        Top-down walk like os.walk, yielding (dir_path, [os.DirEntry of files]).
+        entry.stat() reuses the data from the directory listing on Windows (no extra round trip).
+        """
+        stack = [(root, 0, None)]
+        started = time.time()
+        while stack:
+            path, depth, mtime = stack.pop()
+            if mtime is None:
+                try:
+                    mtime = os.stat(path).st_mtime
+                except OSError as e:
+                    print(f"Cannot access {path}: {e}")
+                    continue
+
+            known = self.state.get(path)
+            if self.skip_unchanged and known and known[0] == mtime and self._recent(known[2], started):
+                # Same entries as last run: only check the folders below it
+                self.dirs_skipped += 1
+                for name in reversed(known[1]):
+                    self._push(stack, os.path.join(path, name), depth + 1, None)
+                continue
+
+            try:
+                with os.scandir(path) as it:
+                    entries = list(it)
+            except OSError as e:
+                print(f"Cannot list {path}: {e}")
+                continue
+            self.dirs_listed += 1
+
+            subdirs, files = [], []
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry)
+                elif entry.is_file():
+                    files.append(entry)
+
+            self._pending[path] = (mtime, [e.name for e in subdirs], started)
+            for entry in reversed(subdirs):
+                self._push(stack, entry.path, depth + 1, entry)
+            yield path, files
+
+    def _push(self, stack, path, depth, entry):
+        if not self.descend(path, depth):
+            self.dirs_pruned += 1
+            self.pruned.append(path)
+            return
+        mtime = None
+        if entry is not None:
+            try:
+                mtime = entry.stat(follow_symlinks=False).st_mtime
+            except OSError:
+                pass
+        stack.append((path, depth, mtime))
+
+    @staticmethod
+    def _recent(listed_at, now):
+        """True while a folder listing is younger than RESCAN_DAYS."""
+        if RESCAN_DAYS is None:
+            return True
+        return listed_at is not None and now - listed_at < RESCAN_DAYS * 86400
+
+    def retry_later(self, file_path):
+        """Keeps the file's folder out of the saved state, so it is listed again next run."""
+        self._retry.add(os.path.dirname(file_path))
+
+    def commit(self):
+        rows = [
+            (self.name, path, mtime, json.dumps(subdirs), listed_at)
+            for path, (mtime, subdirs, listed_at) in self._pending.items()
+            if path not in self._retry
+        ]
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO dirs (scanner, path, mtime, subdirs, listed_at) VALUES (?, ?, ?, ?, ?)", rows)
+        self.conn.commit()
+        for scanner, path, mtime, subdirs, listed_at in rows:
+            self.state[path] = (mtime, json.loads(subdirs), listed_at)
+        self._pending.clear()
+        self._retry.clear()
+
+    def summary(self):
+        return f"{self.dirs_listed} folders listed, {self.dirs_skipped} unchanged, {self.dirs_pruned} pruned"
+
+    def log_pruned(self, limit=PRUNED_LOG_LIMIT):
+        """Prints the folders the descend rule did not enter, so a rule that is too tight shows in the log."""
+        for path in self.pruned[:limit]:
+            print(f"Pruned: {path}")
+        if len(self.pruned) > limit:
+            print(f"Pruned: ... and {len(self.pruned) - limit} more folders")
+
+    def totals(self):
+        """Folder counters for the run report (run_metrics)."""
+        return {'dirs_listed': self.dirs_listed, 'dirs_unchanged': self.dirs_skipped, 'dirs_pruned': self.dirs_pruned}
+
+    def close(self):
+        close_connection(self.conn)
@@ -0,0 +1,140 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from multiprocessing import Pool, TimeoutError
+
+# --- CONFIGURATION ---
+# Leave one core free for the DB writer running in the main process.
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+CHUNK_SIZE = 16          # Files handed to a worker per task (cuts IPC overhead for small .asc files)
+MAX_PENDING_CHUNKS = 4   # In-flight chunks per worker, keeps memory bounded while the writer catches up
+# Read-ahead: files are read into memory on threads while the workers parse the ones before them,
+# so share/OneDrive latency is hidden behind parse time (prefetch=True in imap_files)
+PREFETCH_THREADS = 8              # Concurrent reads (network latency bound, not CPU)
+PREFETCH_FILES = 32               # Files being read ahead of the pool
+PREFETCH_BYTES = 256 * 1024 * 1024  # Bytes of read files queued for the workers before reading waits
+
+def job_path(job):
+    """File path of a job: the job itself, or its first item for (path, stat) jobs."""
+    return job if isinstance(job, str) else job[0]
+
+def _read(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None  # The parser opens the path itself and reports the error
+
+def read_ahead(jobs, path_of=job_path, threads=PREFETCH_THREADS, depth=PREFETCH_FILES):
+    """
+    Yields (job, file bytes) in input order while the next `depth` files are read on `threads`
+    threads. The bytes are None when the file could not be read.
+    """
+    jobs = iter(jobs)
+    window = deque()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        def fill():
+            for job in jobs:
+                window.append((job, executor.submit(_read, path_of(job))))
+                if len(window) >= depth:
+                    break
+        fill()
+        while window:
+            job, data = window.popleft()
+            fill()
+            yield job, data.result()
+
+def _run_chunk(func, paths, buffers=None):
+    """
+    Runs func over a list of paths inside a worker. Errors are returned, not raised.
+    With buffers (prefetched file bytes, one per path) func is called as func(path, data).
+    """
+    out = []
+    for p, data in zip(paths, buffers or repeat(None)):
+        try:
+            out.append((p, func(p) if buffers is None else func(p, data), None))
+        except Exception as e:
+            out.append((p, None, f"{type(e).__name__}: {e}"))
+    return out
+
+def _chunks(paths, size, prefetched=False):
+    """Lists of up to size paths, as (paths, buffers) when the input is (path, bytes) from read_ahead."""
+    chunk = []
+    for p in paths:
+        chunk.append(p)
+        if len(chunk) >= size:
+            yield _split(chunk, prefetched)
+            chunk = []
+    if chunk:
+        yield _split(chunk, prefetched)
+
+def _split(chunk, prefetched):
+    if not prefetched:
+        return chunk, None
+    return [p for p, data in chunk], [data for p, data in chunk]
+
+def _chunk_bytes(buffers):
+    return sum(len(data) for data in buffers if data) if buffers else 0
+
+def _resubmit(pool, func, pending):
+    """Queues the not yet finished chunks of a terminated pool on a new pool, keeping their order."""
+    for i, (chunk, buffers, result) in enumerate(pending):
+        if not result.ready():
+            pending[i] = (chunk, buffers, pool.apply_async(_run_chunk, (func, chunk, buffers)))
+
+def imap_files(func, paths, workers=DEFAULT_WORKERS, chunksize=CHUNK_SIZE, timeout=None,
+               prefetch=False, path_of=job_path, max_bytes=PREFETCH_BYTES):
+    """
+    Applies func to every path and yields (path, result, error) tuples in input order.
+    A "path" can be any picklable job, e.g. a (path, stat) tuple.
+    func must pickle to the workers: a module-level function (or a run_metrics.TimedCall of one).
+    workers <= 1 runs everything in the current process (original single-core behaviour).
+
+    timeout (seconds) bounds how long the writer waits for a file once it is next in line.
+    A file that takes longer (e.g. a malformed PDF hanging the parser) is yielded with a
+    'Timeout' error; the pool is restarted and the files queued behind it are resubmitted,
+    so the order of the results does not change. With a timeout every file is its own task,
+    so the error always names the file that hung. Not enforced when workers <= 1.
+
+    prefetch=True reads the files ahead on threads (read_ahead, path_of(job) names the file) and
+    calls func(job, data) with the file's bytes (None when the read failed). At most max_bytes
+    of read files wait for the workers; reading pauses until they catch up.
+    """
+    if prefetch:
+        paths = read_ahead(paths, path_of)
+    if workers <= 1:
+        for chunk, buffers in _chunks(paths, chunksize, prefetch):
+            yield from _run_chunk(func, chunk, buffers)
+        return
+
+    if timeout:
+        chunksize = 1
+    pool = Pool(processes=workers)
+    pending = deque()  # (chunk, buffers, AsyncResult) in input order
+    queued_bytes = 0   # Prefetched bytes of the pending chunks
+    try:
+        def next_results():
+            nonlocal pool, queued_bytes
+            chunk, buffers, result = pending.popleft()
+            queued_bytes -= _chunk_bytes(buffers)
+            try:
+                return result.get(timeout)
+            except TimeoutError:
+                pool.terminate()
+                pool.join()
+                pool = Pool(processes=workers)
+                _resubmit(pool, func, pending)
+                return [(p, None, f"Timeout: no result after {timeout}s") for p in chunk]
+
+        for chunk, buffers in _chunks(paths, chunksize, prefetch):
+            pending.append((chunk, buffers, pool.apply_async(_run_chunk, (func, chunk, buffers))))
+            queued_bytes += _chunk_bytes(buffers)
+            # Hand finished chunks to the writer before queueing more work (or reading more files)
+            while len(pending) >= workers * MAX_PENDING_CHUNKS or (pending and queued_bytes > max_bytes):
+                yield from next_results()
+        while pending:
+            yield from next_results()
+    finally:
+        pool.terminate()
+        pool.join()
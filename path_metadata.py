@@ -0,0 +1,202 @@
+"""
+Path metadata classifier shared by all importers.
+
+Every importer's path rules live here as precompiled rule tables. A path is split into its
+folder and its file name: folder-level attributes are computed once per folder and kept in an
+LRU cache (all files of a folder share them), only the file-name part is scanned per file.
+The results are the same as the original per-file regex code of each importer; the rules
+stay per importer so rows already in SQL Server keep matching new ones.
+"""
+import os
+import re
+from datetime import datetime
+from functools import lru_cache
+
+# --- CONFIGURATION ---
+FOLDER_CACHE_SIZE = 4096
+FILENAME_CACHE_SIZE = 16384
+
+def split_path(full_path):
+    """(folder, tail) with folder + tail == full_path; tail keeps the leading separator."""
+    i = full_path.rfind(os.sep)
+    if i < 0:
+        return "", full_path
+    return full_path[:i], full_path[i:]
+
+FILENAME_DATE_RE = re.compile(r'(\d{10,12})')
+
+@lru_cache(maxsize=FILENAME_CACHE_SIZE)
+def filename_datetime(filename):
+    """
+    Date and time stamped in a file name (e.g. 20251101321 -> 2025-01-10 13:21), or None
+    when there is no 10-12 digit stamp or it is not a valid date. The caller decides the
+    fallback (file creation/modification time).
+    """
+    match = FILENAME_DATE_RE.search(filename)
+    if not match:
+        return None
+    ds = match.group(1)
+    try:
+        year = int(ds[:4])
+        minute = int(ds[-2:])
+        mid = ds[4:-2]
+        # Handle variable length month/day formatting
+        if len(mid) == 4: month, day, hour = int(mid[0]), int(mid[1:3]), int(mid[3])
+        elif len(mid) == 5: month, day, hour = int(mid[0]), int(mid[1:3]), int(mid[3:5])
+        else: month, day, hour = int(mid[0:2]), int(mid[2:4]), int(mid[4:6])
+        return datetime(year=year, month=month, day=day, hour=hour, minute=minute)
+    except ValueError:
+        return None
+
+# --- Rear Cover CMM (.asc) -> CMM_WalkV3Gemini ---
+# Rules are checked in order; the first token found anywhere in the path wins
+CMM_MODEL_RULES = [("967", "967K"), ("031", "031C"), ("T324", "T324")]
+CMM_SHIFT_RULES = [("1ST", "1"), ("3RD", "3")]
+CMM_LINE_RE = re.compile(r'(LINE|L)\s*(\d+)', re.IGNORECASE)
+CMM_PROCESS_RE = re.compile(r'(#(?:1[0-9]0|200|[1-9]0|80LL)|MQC)')
+CMM_PIECE_RE = re.compile(r'[\\ ]([13])(ATC|BTC|TC|F|M|L)')
+CMM_CAVITY_RE = re.compile(r'Cavity-([\w\d]+)', re.IGNORECASE)
+
+def _scan_cmm(text):
+    """All CMM rule hits in one part of a path (none of the rules can span a separator)."""
+    up = text.upper()
+    line = CMM_LINE_RE.search(text)
+    process = CMM_PROCESS_RE.search(up)
+    piece = CMM_PIECE_RE.search(text)
+    return (
+        frozenset(token for token, _ in CMM_MODEL_RULES if token in up),
+        frozenset(token for token, _ in CMM_SHIFT_RULES if token in up),
+        line.group(2) if line else None,
+        process.group(1) if process else None,
+        (piece.group(1), piece.group(2)) if piece else None,
+        "Rear Cover" in text,
+    )
+
+@lru_cache(maxsize=FOLDER_CACHE_SIZE)
+def _cmm_folder(folder):
+    return _scan_cmm(folder)
+
+def classify_cmm(full_path):
+    """
+    Rear Cover .asc metadata (everything except FileCreatedAt). The folder match is
+    taken before the file-name match, like a left-to-right search over the full path.
+    """
+    folder, tail = split_path(full_path)
+    d_models, d_shifts, d_line, d_process, d_piece, d_rear = _cmm_folder(folder)
+    f_models, f_shifts, f_line, f_process, f_piece, f_rear = _scan_cmm(tail)
+
+    models = d_models | f_models
+    model = next((name for token, name in CMM_MODEL_RULES if token in models), "Unknown")
+    shifts = d_shifts | f_shifts
+    shift = next((value for token, value in CMM_SHIFT_RULES if token in shifts), "")
+
+    piece = "N/A"
+    piece_match = d_piece or f_piece
+    if piece_match:
+        piece = piece_match[1]
+        if shift == "": shift = piece_match[0]
+
+    cavity = ""
+    cav_match = CMM_CAVITY_RE.search(os.path.basename(full_path))
+    if cav_match: cavity = cav_match.group(1)[:3]
+
+    return {
+        "PartType": "Rear Cover" if (d_rear or f_rear) else "Unknown",
+        "Model": model,
+        "FilePath": full_path,
+        "FileName": os.path.basename(full_path),
+        "Line#": d_line or f_line or "",
+        "QShift": shift,
+        "Piece": piece,
+        "ProcessNo": d_process or f_process or "N/A",
+        "Cavity": cavity if cavity else "N/A"
+    }
+
+# --- Cam Housing Surfcom PDFs -> CMM_WalkCHGemini (ASSY) / CHAINCASE HEAD (LINE) ---
+CH_SUBFOLDER_RULES = {
+    'assy': lambda p: any(keyword in p.upper() for keyword in ["ASSY", "LINE", "OP"]),
+    # Match 'LINE 1', 'Line 2', 'L1', 'L2' etc.
+    'line': re.compile(r"(LINE\s*\d|L\d)", re.IGNORECASE).search,
+}
+
+@lru_cache(maxsize=FOLDER_CACHE_SIZE)
+def _ch_folder(folder, rule):
+    parts = folder.split(os.sep)
+    part_model, sub_folder = "Unknown", "Unknown"
+    matches = CH_SUBFOLDER_RULES[rule]
+    for i, p in enumerate(parts):
+        if p == "Surfcom" and i > 0: part_model = parts[i-1]
+        if matches(p): sub_folder = p
+    return part_model, sub_folder, parts[-1]
+
+def classify_ch(full_path, rule):
+    """(part_model, sub_folder, operator_initials) for the CH importers; rule is 'assy' or 'line'."""
+    folder, tail = split_path(full_path)
+    part_model, sub_folder, last_folder = _ch_folder(folder, rule)
+    filename = tail[1:] if folder else tail
+    # The file name is the last path component, so it wins the sub-folder rule when it matches
+    if filename == "Surfcom" and folder: part_model = last_folder
+    if CH_SUBFOLDER_RULES[rule](filename): sub_folder = filename
+
+    name_parts = os.path.splitext(os.path.basename(full_path))[0].split()
+    operator_initials = name_parts[-1] if len(name_parts) > 1 else ""
+    return part_model, sub_folder, operator_initials
+
+# --- Cam Housing ASSY PDFs -> CMM_WalkCHPerplexity ---
+CH_MODELS = [
+    "2.4L CH",
+    "A25 CH Gas",
+    "A25 CH Hybrid",
+    "M20 CH",
+    "2GR KAI CH",
+    "V6T LH CH",
+    "V6T RH CH Gas",
+    "V6T LH CH Hybrid",
+]
+CH_SUBFOLDERS = ["ASSY", "LINE 1", "LINE 2", "LINE 3", "LINE 4", "LINE 5"]
+
+@lru_cache(maxsize=FOLDER_CACHE_SIZE)
+def classify_ch_folder(folder):
+    """(model, sub_folder) of a Cam Housing folder, first listed match wins."""
+    path_up = folder.upper()
+    current_sub = next((s for s in CH_SUBFOLDERS if s in path_up), "Other")
+    found_model = next((m for m in CH_MODELS if m.upper() in path_up), "Unknown")
+    return found_model, current_sub
+
+# --- Surfcom PDFs -> extract_surfcomV2Gemini ---
+REAR_COVER_MODELS = ['031C', '967K', 'T324']
+CAM_HOUSING_MODELS = ['2.4L CH', 'A25 CH', '2GR KAI CH', 'M20 CH', 'V6T CH']
+SURFCOM_TOKEN_RE = re.compile(r'[a-zA-Z0-9]+')
+SURFCOM_INITIALS_RE = re.compile(r'([a-zA-Z]+)')
+
+@lru_cache(maxsize=FOLDER_CACHE_SIZE)
+def _surfcom_folder(folder):
+    path_upper = folder.upper()
+    if "REAR COVER" in path_upper:
+        part_type, model_list = "Rear Cover", REAR_COVER_MODELS
+    elif "CAM HOUSING" in path_upper:
+        part_type, model_list = "Cam Housing", CAM_HOUSING_MODELS
+    else:
+        part_type, model_list = "Unknown", []
+    folder_models = tuple(m for m in model_list if m.upper() in path_upper)
+    return part_type, model_list, folder_models
+
+def classify_surfcom(full_path):
+    """(part_type, model, process_no, item_no, operator_initials) for a Surfcom PDF."""
+    root, file = os.path.split(full_path)
+    part_type, model_list, folder_models = _surfcom_folder(root)
+
+    # Identify Model: first model of the list found in the folder or the file name
+    file_upper = file.upper()
+    found_model = next((m for m in model_list if m in folder_models or m.upper() in file_upper), "Unknown")
+
+    # Extract metadata from filename (Process, Item, Initials)
+    tokens = SURFCOM_TOKEN_RE.findall(file)
+    if len(tokens) >= 3:
+        proc = tokens[0].upper().replace('P', '').strip()
+        item = tokens[1].strip()
+        init_match = SURFCOM_INITIALS_RE.search(tokens[2])
+        init = init_match.group(0).upper() if init_match else "??"
+    else:
+        proc, item, init = "Unknown", "Unknown", "Unknown"
+    return part_type, found_model, proc, item, init
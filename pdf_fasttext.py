@@ -0,0 +1,182 @@
+"""
+Raw-text fast path for the machine-generated Surfcom / Cam Housing reports.
+
+pdfplumber builds a full pdfminer LTChar plus an attribute dict for every glyph before any
+parser runs. For reports with a known template this module reads the text operators of the
+content stream directly (pdfminer low-level interpreter with a minimal device), keeps one
+small tuple per glyph and only for the pages the template parses, then groups them into
+words and lines the same way pdfplumber's extract_words / extract_text do.
+
+open_report() serves a template from the fast path when the template's expected labels are
+found in the fast text, and falls back to pdfplumber otherwise (rotated text, fonts without
+a unicode map, a layout change...). HitCounter shows how often the fast path works.
+"""
+import io
+from contextlib import contextmanager, nullcontext
+
+from pdfminer.pdfdevice import PDFTextDevice
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdffont import PDFUnicodeNotDefined
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+
+from pdf_pages import PageCache, open_pages
+
+# --- CONFIGURATION ---
+FAST_TEXT = True  # False = always use pdfplumber (original behaviour)
+
+FAST, FALLBACK = 'fast', 'pdfplumber'
+
+class NotUpright(Exception):
+    """Rotated/skewed text: left to pdfplumber."""
+
+class _GlyphCollector(PDFTextDevice):
+    """pdfminer device that records (text, x0, x1, y0, y1) per glyph and nothing else."""
+    def __init__(self, rsrcmgr):
+        super().__init__(rsrcmgr)
+        self.glyphs = []
+
+    def render_char(self, matrix, font, fontsize, scaling, rise, cid, ncs, graphicstate):
+        try:
+            text = font.to_unichr(cid)
+        except PDFUnicodeNotDefined:
+            text = f"(cid:{cid})"
+        adv = font.char_width(cid) * fontsize * scaling
+        a, b, c, d, e, f = matrix
+        if b or c or a <= 0 or d <= 0:
+            raise NotUpright()
+        # Same glyph box as pdfminer's LTChar (which pdfplumber's chars come from)
+        descent = font.get_descent() * fontsize
+        self.glyphs.append((text, e, e + a * adv, f + d * (descent + rise), f + d * (descent + rise + fontsize)))
+        return adv
+
+class RawPage:
+    """
+    Glyphs of one page with the parts of the pdfplumber Page API the parsers use
+    (width, height, extract_words, extract_text, within_bbox). Wrapped in a PageCache.
+    """
+    def __init__(self, chars, width, height):
+        self.chars = chars  # (text, x0, x1, top, bottom), pdfplumber coordinates
+        self.width = width
+        self.height = height
+
+    def _char_lines(self, y_tolerance):
+        """Chars clustered into lines by 'top' (chained within y_tolerance), each sorted by x0."""
+        lines, current, last = [], [], None
+        for ch in sorted(self.chars, key=lambda ch: ch[3]):
+            if current and ch[3] > last + y_tolerance:
+                lines.append(current)
+                current = []
+            current.append(ch)
+            last = ch[3]
+        if current:
+            lines.append(current)
+        return [sorted(line, key=lambda ch: (ch[1], ch[3])) for line in lines]
+
+    def extract_words(self, x_tolerance=3, y_tolerance=3, **kwargs):
+        words = []
+        for line in self._char_lines(y_tolerance):
+            word = []
+            for ch in line:
+                if ch[0].isspace():
+                    if word: words.append(word)
+                    word = []
+                    continue
+                if word:
+                    prev = word[-1]
+                    if ch[1] < prev[1] or ch[1] > prev[2] + x_tolerance or abs(ch[3] - prev[3]) > y_tolerance:
+                        words.append(word)
+                        word = []
+                word.append(ch)
+            if word: words.append(word)
+        return [{
+            'text': "".join(ch[0] for ch in w),
+            'x0': min(ch[1] for ch in w),
+            'x1': max(ch[2] for ch in w),
+            'top': min(ch[3] for ch in w),
+            'bottom': max(ch[4] for ch in w),
+        } for w in words]
+
+    def extract_text(self, x_tolerance=3, y_tolerance=3, **kwargs):
+        words = self.extract_words(x_tolerance=x_tolerance, y_tolerance=y_tolerance)
+        lines, current, last = [], [], None
+        for w in sorted(words, key=lambda w: w['top']):
+            if current and w['top'] > last + y_tolerance:
+                lines.append(current)
+                current = []
+            current.append(w)
+            last = w['top']
+        if current:
+            lines.append(current)
+        return "\n".join(" ".join(w['text'] for w in sorted(line, key=lambda w: w['x0'])) for line in lines)
+
+    def within_bbox(self, bbox):
+        x0, top, x1, bottom = bbox
+        return RawPage([ch for ch in self.chars if ch[1] >= x0 and ch[2] <= x1 and ch[3] >= top and ch[4] <= bottom],
+                       self.width, self.height)
+
+def read_pages(path_or_file, page_indexes=None):
+    """
+    PageCache(RawPage) for the pages of a PDF up to the last index in page_indexes
+    (all pages when None); later pages are not interpreted at all.
+    """
+    last = max(page_indexes) if page_indexes else None
+    with (open(path_or_file, 'rb') if isinstance(path_or_file, str) else nullcontext(path_or_file)) as fp:
+        doc = PDFDocument(PDFParser(fp))
+        rsrcmgr = PDFResourceManager(caching=True)
+        device = _GlyphCollector(rsrcmgr)
+        interpreter = PDFPageInterpreter(rsrcmgr, device)
+        pages = []
+        for i, page in enumerate(PDFPage.create_pages(doc)):
+            if last is not None and i > last:
+                break
+            device.glyphs = []
+            interpreter.process_page(page)
+            mx0, my0, mx1, my1 = page.mediabox
+            chars = [(text, x0 - mx0, x1 - mx0, my1 - y1, my1 - y0) for text, x0, x1, y0, y1 in device.glyphs]
+            pages.append(PageCache(RawPage(chars, mx1 - mx0, my1 - my0)))
+    return pages
+
+@contextmanager
+def open_report(path_or_file, template, fast=None, data=None):
+    """
+    Yields (pages, extractor) for a report: the fast path pages when the template's labels
+    are found in them, otherwise pdfplumber pages. extractor is FAST or FALLBACK.
+    data is the file's content when it was read ahead (parse_pool); it is parsed from memory.
+    """
+    fast = FAST_TEXT if fast is None else fast
+    if data is not None:
+        path_or_file = io.BytesIO(data)
+    if fast and template.labels is not None:
+        try:
+            pages = read_pages(path_or_file, template.pages)
+        except Exception:
+            pages = None
+        if pages and template.found_labels(pages):
+            yield pages, FAST
+            return
+        if hasattr(path_or_file, 'seek'):
+            path_or_file.seek(0)
+    with open_pages(path_or_file) as pages:
+        yield pages, FALLBACK
+
+class HitCounter:
+    """Per-template count of reports served by the fast path vs. the pdfplumber fallback."""
+    def __init__(self):
+        self.counts = {}
+
+    def record(self, template_name, extractor):
+        hits = self.counts.setdefault(template_name, {FAST: 0, FALLBACK: 0})
+        hits[extractor] += 1
+
+    def summary(self):
+        parts = []
+        for name, hits in self.counts.items():
+            total = hits[FAST] + hits[FALLBACK]
+            parts.append(f"{name}: {hits[FAST]}/{total} fast ({hits[FAST] / total:.0%})")
+        return ", ".join(parts) if parts else "no PDFs parsed"
+
+    def totals(self):
+        """{'<template>_<extractor>': reports} for the run report (run_metrics)."""
+        return {f"{name}_{extractor}": n for name, hits in self.counts.items() for extractor, n in hits.items()}
@@ -0,0 +1,97 @@
+"""
+Per-page extraction cache for the Surfcom PDF importers.
+
+pdfplumber's layout analysis (chars -> words -> text) is the slowest step of every PDF import.
+PageCache runs each extraction at most once per page and hands the same result to every
+parser that asks for it (report date, journal, spec, Ra values), instead of each parser
+calling page.extract_text() / extract_words() again.
+"""
+from bisect import bisect_right
+from contextlib import contextmanager
+from operator import itemgetter
+
+import pdfplumber
+
+# --- CONFIGURATION ---
+LINE_BAND = 3  # Words whose tops are within this many points form one text line
+
+def band_lines(words, band=LINE_BAND):
+    """
+    Groups words into text lines: a list of (line_words sorted left to right, line_text joined
+    with spaces), top to bottom. One sort by 'top', then a single sweep: a word joins the current
+    line while its top is within band points of the line's first word, so words of one line in
+    slightly different fonts (tops a fraction of a point apart) stay together.
+    """
+    lines = []
+    current, start = [], None
+    for w in sorted(words, key=itemgetter('top')):
+        if current and w['top'] - start > band:
+            lines.append(current)
+            current = []
+        if not current:
+            start = w['top']
+        current.append(w)
+    if current:
+        lines.append(current)
+    result = []
+    for line in lines:
+        line.sort(key=itemgetter('x0'))
+        result.append((line, " ".join(w['text'] for w in line)))
+    return result
+
+def words_right_of(line_words, x):
+    """Words of a line (sorted by x0) that start right of x, found by bisection."""
+    return line_words[bisect_right(line_words, x, key=itemgetter('x0')):]
+
+class PageCache:
+    """Lazily extracted, cached text/words/lines of one pdfplumber page."""
+    def __init__(self, page):
+        self.page = page
+        self._text = {}
+        self._words = {}
+        self._lines = {}
+        self._crops = {}
+
+    @property
+    def width(self):
+        return self.page.width
+
+    @property
+    def height(self):
+        return self.page.height
+
+    def text(self, **kwargs):
+        """page.extract_text(**kwargs), '' when the page has no text layer."""
+        key = tuple(sorted(kwargs.items()))
+        if key not in self._text:
+            self._text[key] = self.page.extract_text(**kwargs) or ""
+        return self._text[key]
+
+    def words(self, **kwargs):
+        """page.extract_words(**kwargs)."""
+        key = tuple(sorted(kwargs.items()))
+        if key not in self._words:
+            self._words[key] = self.page.extract_words(**kwargs)
+        return self._words[key]
+
+    def lines(self, band=LINE_BAND, **kwargs):
+        """
+        Words of page.extract_words(**kwargs) banded into text lines, top to bottom
+        (see band_lines). Cached per band/kwargs.
+        """
+        key = (band,) + tuple(sorted(kwargs.items()))
+        if key not in self._lines:
+            self._lines[key] = band_lines(self.words(**kwargs), band)
+        return self._lines[key]
+
+    def crop(self, bbox):
+        """PageCache of the region bbox = (x0, top, x1, bottom), see page.within_bbox."""
+        if bbox not in self._crops:
+            self._crops[bbox] = PageCache(self.page.within_bbox(bbox))
+        return self._crops[bbox]
+
+@contextmanager
+def open_pages(path_or_file):
+    """Opens a PDF and yields its pages as PageCache objects."""
+    with pdfplumber.open(path_or_file) as pdf:
+        yield [PageCache(page) for page in pdf.pages]
@@ -0,0 +1,75 @@
+"""
+Report templates: which pages and page regions of each Surfcom report type hold the data.
+
+Parsers ask a template for the lines/text of a role ('date', 'values') instead of running
+layout analysis over whole pages, so only those regions are extracted. Regions are
+(x0, top, x1, bottom) as fractions of the page size; roles sharing a region share one
+extraction (pdf_pages cache).
+
+To tighten a region: change it here and run bench_pdf_templates.py against a folder of real
+reports. It checks the rows are identical to a full-page parse and shows the time saved.
+labels is a regex the parsed regions must contain for the raw-text fast path (pdf_fasttext)
+to be trusted; without it the template always uses pdfplumber.
+
+The Surfcom regions were measured on real reports. The CH regions (ch_assy, ch_line) were
+measured on the report layouts of bench_ingest.py and on hand-made sample reports whose labels
+sit anywhere below the header, so they only split off the header band; check them with
+bench_pdf_templates.py on a folder of real CH reports before tightening them.
+"""
+import re
+
+# --- CONFIGURATION ---
+FULL_PAGE = (0.0, 0.0, 1.0, 1.0)
+
+class ReportTemplate:
+    def __init__(self, name, regions, pages=None, labels=None):
+        self.name = name
+        self.regions = regions  # role -> (x0, top, x1, bottom) page fractions
+        self.pages = pages      # page indexes to parse, None = all pages
+        self.labels = re.compile(labels, re.MULTILINE) if labels else None  # proves a raw-text read worked
+
+    def found_labels(self, pages):
+        """True when the expected labels are in the 'values' region of the parsed pages."""
+        return any(self.labels.search(self.text(page, 'values')) for page in self.select(pages))
+
+    def select(self, pages):
+        """The pages of a PDF (list of PageCache) this template parses."""
+        if self.pages is None:
+            return pages
+        return [pages[i] for i in self.pages if i < len(pages)]
+
+    def region(self, page, role):
+        """PageCache of the role's region on page."""
+        frac = self.regions[role]
+        if frac == FULL_PAGE:
+            return page
+        x0, top, x1, bottom = frac
+        return page.crop((page.width * x0, page.height * top, page.width * x1, page.height * bottom))
+
+    def lines(self, page, role, **word_kwargs):
+        return self.region(page, role).lines(**word_kwargs)
+
+    def text(self, page, role, **text_kwargs):
+        return self.region(page, role).text(**text_kwargs)
+
+    def full_page(self):
+        """Same template parsing every page in full with pdfplumber (reference for benchmarks)."""
+        return ReportTemplate(self.name, {role: FULL_PAGE for role in self.regions})
+
+TEMPLATES = {
+    # Surfcom single-part report: the parameter table sits in the top-left quarter of page 1
+    'surfcom': ReportTemplate('surfcom', {'values': (0.0, 0.0, 0.75, 0.5)}, pages=(0,),
+                              labels=r"(Ra|Rz|Rt|Pa|Pt)\w*\s+[\d\.]+um"),
+    # CH ASSY journal report: date in the header band, journal blocks below it. The blocks run
+    # to the bottom of the page and on across all pages.
+    'ch_assy': ReportTemplate('ch_assy', {'date': (0.0, 0.0, 1.0, 0.06), 'values': (0.0, 0.06, 1.0, 1.0)},
+                              labels=r"Ramax|Ra\(\d+\)"),
+    # CH Chain Case / Head line report: single page, date in the header band, items below it
+    'ch_line': ReportTemplate('ch_line', {'date': (0.0, 0.0, 1.0, 0.06), 'values': (0.0, 0.06, 1.0, 1.0)},
+                              pages=(0,), labels=r"^(Pt|Ra|Ramax|Ramin|Rasd|Ra\(\d\)|Rz\(\d\)) "),
+}
+
+def get_template(name):
+    if name not in TEMPLATES:
+        raise ValueError(f"Unknown report template '{name}', expected one of {tuple(TEMPLATES)}")
+    return TEMPLATES[name]
@@ -0,0 +1,225 @@
+"""
+Per-run timings and counters of the Lab_Data importers.
+
+Each importer run keeps one RunMetrics: stage timers (walk, stat, dedup_check, parse_wait,
+db round trips, commit, ...) and counters (new / changed / duplicate files, rows written, errors).
+Timers in the importer process are exclusive: a stage running inside another one (the walk
+feeding the parse pool, a DB statement inside a file write) is only counted once, so the stage
+times add up to at most the run's wall time and show where the night went (network share,
+pdfplumber or SQL Server). Parse times measured in the worker processes (TimedCall) are added
+per parser and summed over the workers, so with several workers they overlap the wall time.
+
+At the end of a run write() saves a JSON run report to REPORT_DIR and, when PROMETHEUS_DIR is
+set, a Prometheus text-format file for the textfile collector of node_exporter / windows_exporter.
+Timers are meant for the importer's main thread (the read-ahead threads do not use them).
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# --- CONFIGURATION ---
+REPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'run_reports')
+PROMETHEUS_DIR = None  # Textfile collector folder of the exporter, None = no .prom file
+METRIC_PREFIX = 'lab_import'
+
+class RunMetrics:
+    def __init__(self, run):
+        self.run = run                # Importer name, e.g. the catalog name
+        self.started = datetime.now()
+        self._start = time.perf_counter()
+        self.timers = {}              # (stage, detail) -> [calls, seconds]
+        self.counters = {}
+        self._running = []            # [(stage, detail), started] of the open timers, innermost last
+
+    def _time(self, key, seconds, calls=0):
+        entry = self.timers.setdefault(key, [0, 0.0])
+        entry[0] += calls
+        entry[1] += seconds
+
+    @contextmanager
+    def timer(self, stage, detail=''):
+        """Times the block as one call of stage; an open outer timer is paused meanwhile."""
+        now = time.perf_counter()
+        if self._running:
+            outer = self._running[-1]
+            self._time(outer[0], now - outer[1])
+        self._running.append([(stage, detail), now])
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            key, started = self._running.pop()
+            self._time(key, now - started, calls=1)
+            if self._running:
+                self._running[-1][1] = now
+
+    def timed_iter(self, stage, iterable, detail=''):
+        """Yields the items of iterable; the time spent producing them is counted as stage."""
+        it = iter(iterable)
+        while True:
+            with self.timer(stage, detail):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            yield item
+
+    def add(self, stage, seconds, detail='', calls=1):
+        """Adds time measured elsewhere (e.g. by TimedCall in a worker process)."""
+        self._time((stage, detail), seconds, calls)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def update(self, counts):
+        for name, n in counts.items():
+            self.count(name, n)
+
+    def connection(self, conn):
+        """conn with its statements timed as 'db' round trips and its commits / rollbacks timed."""
+        return TimedConnection(conn, self)
+
+    def report(self):
+        stages = [
+            {'stage': stage, 'detail': detail, 'calls': calls, 'seconds': round(seconds, 4)}
+            for (stage, detail), (calls, seconds) in sorted(self.timers.items(), key=lambda kv: -kv[1][1])
+        ]
+        return {
+            'run': self.run,
+            'started': self.started.isoformat(timespec='seconds'),
+            'finished': datetime.now().isoformat(timespec='seconds'),
+            'wall_seconds': round(time.perf_counter() - self._start, 4),
+            'stages': stages,
+            'counters': dict(sorted(self.counters.items())),
+        }
+
+    def summary(self):
+        """Seconds per stage (details added up), slowest first."""
+        totals = {}
+        for (stage, detail), (calls, seconds) in self.timers.items():
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        parts = [f"{stage} {seconds:.1f}s" for stage, seconds in sorted(totals.items(), key=lambda kv: -kv[1])]
+        return ", ".join(parts) if parts else "nothing timed"
+
+    def prometheus(self):
+        """The report in Prometheus text exposition format (gauges of the last run)."""
+        def labels(**values):
+            return ",".join(f'{k}="{_escape(v)}"' for k, v in values.items())
+        lines = []
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+            lines.extend(f"{METRIC_PREFIX}_{name}{{{label}}} {value}" for label, value in samples)
+
+        report = self.report()
+        metric('stage_seconds', 'gauge', "Seconds spent per stage in the last run.",
+               [(labels(run=self.run, stage=s['stage'], detail=s['detail']), s['seconds']) for s in report['stages']])
+        metric('stage_calls', 'gauge', "Calls per stage in the last run.",
+               [(labels(run=self.run, stage=s['stage'], detail=s['detail']), s['calls']) for s in report['stages']])
+        metric('count', 'gauge', "Counters of the last run.",
+               [(labels(run=self.run, name=n), v) for n, v in report['counters'].items()])
+        metric('run_seconds', 'gauge', "Wall time of the last run.", [(labels(run=self.run), report['wall_seconds'])])
+        metric('last_run_timestamp_seconds', 'gauge', "Start time of the last run (Unix time).",
+               [(labels(run=self.run), round(self.started.timestamp()))])
+        return "\n".join(lines) + "\n"
+
+    def finish(self):
+        """End of an importer run: prints the stage times and writes the run report."""
+        print(f"Time: {self.summary()}")
+        for path in self.write():
+            print(f"Run report: {path}")
+
+    def write(self, report_dir=None, prometheus_dir=None):
+        """
+        Saves <run>_<start time>.json to report_dir (REPORT_DIR) and lab_import_<run>.prom to prometheus_dir
+        (PROMETHEUS_DIR, skipped when None). Returns the paths written; a failed write is only printed.
+        """
+        report_dir = report_dir or REPORT_DIR
+        prometheus_dir = prometheus_dir or PROMETHEUS_DIR
+        written = []
+        try:
+            os.makedirs(report_dir, exist_ok=True)
+            path = os.path.join(report_dir, f"{self.run}_{self.started:%Y%m%d_%H%M%S}.json")
+            with open(path, 'w') as f:
+                json.dump(self.report(), f, indent=2)
+            written.append(path)
+            if prometheus_dir:
+                # Written next to the target and renamed, so the collector never reads half a file
+                path = os.path.join(prometheus_dir, f"{METRIC_PREFIX}_{self.run}.prom")
+                with open(path + '.tmp', 'w', newline='\n') as f:
+                    f.write(self.prometheus())
+                os.replace(path + '.tmp', path)
+                written.append(path)
+        except OSError as e:
+            print(f"Could not write the run report: {e}")
+        return written
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class TimedCall:
+    """
+    Wraps a parse_pool worker function so it returns (result, seconds spent in it).
+    Picklable as long as func is (a module-level function).
+    """
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        result = self.func(*args, **kwargs)
+        return result, time.perf_counter() - start
+
+class TimedCursor:
+    """DB-API cursor whose execute / executemany / fetchall calls are timed as 'db' round trips."""
+    def __init__(self, cursor, metrics):
+        self.__dict__['_cursor'] = cursor
+        self.__dict__['_metrics'] = metrics
+
+    def _call(self, detail, method, *args):
+        with self._metrics.timer('db', detail):
+            result = getattr(self._cursor, method)(*args)
+        return self if result is self._cursor else result  # pyodbc chaining: cursor.execute(...).fetchall()
+
+    def execute(self, *args):
+        return self._call('execute', 'execute', *args)
+
+    def executemany(self, *args):
+        return self._call('executemany', 'executemany', *args)
+
+    def fetchall(self):
+        return self._call('fetch', 'fetchall')
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)  # e.g. fast_executemany (lab_db.bulk_insert)
+
+class TimedConnection:
+    """DB-API connection handing out TimedCursors, with commit / rollback timed."""
+    def __init__(self, conn, metrics):
+        self.__dict__['_conn'] = conn
+        self.__dict__['_metrics'] = metrics
+
+    def cursor(self, *args):
+        return TimedCursor(self._conn.cursor(*args), self._metrics)
+
+    def commit(self):
+        with self._metrics.timer('commit'):
+            self._conn.commit()
+
+    def rollback(self):
+        with self._metrics.timer('rollback'):
+            self._conn.rollback()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)  # e.g. autocommit
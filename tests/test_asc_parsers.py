@@ -0,0 +1,59 @@
+"""The 'bytes' and 'columnar' .asc parsers must give the rows of the original 'rowwise' parser."""
+import pytest
+
+import CMM_WalkV3Gemini as cmm
+
+ASC_LINES = [
+    "1;;;;;;;;",                                     # Header artifact
+    "",
+    ";;;;",                                          # Blank line of separators
+    "1;Item 1;Circle 3;12.5;0.02;-0.02;12.507;0.007;---|+--",
+    "2;Item 2;Plane 1;40;0.05;;40.01;0.01;--+|---",  # Missing LL is stored as 0.0
+    "3;Item 3;Point 7;5,5mm;+0.1mm;-0.1;abc;;",      # Units, a comma and text in numeric fields
+    "4;Item 4;Line 2",                               # Short line
+    "  5 ; Item 5 ;Distance 9; 1e2 ;0.1;-0.1;100.02;0.02;-|- ",
+]
+
+def write_asc(tmp_path, lines, newline='\r\n'):
+    path = tmp_path / "PRG01 202506241321.asc"
+    path.write_bytes(newline.join(lines).encode())
+    return str(path)
+
+def parse(path, parser, monkeypatch, data=None):
+    monkeypatch.setattr(cmm, 'ASC_PARSER', parser)
+    return cmm.parse_asc_file(path, data=data)
+
+@pytest.mark.parametrize('parser', ['bytes', 'columnar'])
+@pytest.mark.parametrize('newline', ['\r\n', '\n'])
+def test_same_rows_as_rowwise(tmp_path, monkeypatch, parser, newline):
+    path = write_asc(tmp_path, ASC_LINES, newline)
+    expected = parse(path, 'rowwise', monkeypatch)
+    assert len(expected) == 5
+    assert parse(path, parser, monkeypatch) == expected
+
+@pytest.mark.parametrize('parser', ['bytes', 'columnar'])
+def test_read_ahead_bytes_parse_like_the_file(tmp_path, monkeypatch, parser):
+    path = write_asc(tmp_path, ASC_LINES)
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert parse(path, parser, monkeypatch, data=data) == parse(path, parser, monkeypatch)
+
+def test_missing_ll_defaults_to_zero(tmp_path, monkeypatch):
+    rows = parse(write_asc(tmp_path, ASC_LINES), 'bytes', monkeypatch)
+    row = dict(zip(cmm.SQL_COLS, rows[1]))
+    assert row['LL'] == 0.0
+    assert row['LowerLimit'] == 40.0
+    assert row['UpperLimit'] == 40.05
+
+@pytest.mark.parametrize('parser', ['bytes', 'columnar'])
+def test_lone_header_line(tmp_path, monkeypatch, parser):
+    # A bare '1' (no semicolons) stops the rowwise parser at that line (IndexError on parts[1]);
+    # the columnar parsers skip it as the header artifact it is
+    expected = parse(write_asc(tmp_path, ASC_LINES), 'rowwise', monkeypatch)
+    path = write_asc(tmp_path, ASC_LINES[:4] + ["1"] + ASC_LINES[4:])
+    assert parse(path, parser, monkeypatch) == expected
+    assert len(parse(path, 'rowwise', monkeypatch)) == 1
+
+@pytest.mark.parametrize('parser', ['bytes', 'columnar', 'rowwise'])
+def test_empty_file(tmp_path, monkeypatch, parser):
+    assert parse(write_asc(tmp_path, ["1;;;;;;;;", ""]), parser, monkeypatch) == []
@@ -0,0 +1,159 @@
+"""FileCatalog transitions: NEW, CHANGED, UNCHANGED, DUPLICATE, repeated checks and failed imports."""
+import os
+
+import pytest
+
+import file_catalog
+from file_catalog import CHANGED, DUPLICATE, NEW, UNCHANGED, FileCatalog
+from lab_scanner import DirScanner
+
+@pytest.fixture
+def catalog_path(tmp_path):
+    return str(tmp_path / "catalog.db")
+
+def write(path, text):
+    path.write_text(text)
+    return str(path), os.stat(path)
+
+def test_new_then_marked_is_unchanged(tmp_path, catalog_path):
+    path, st = write(tmp_path / "a.pdf", "report A")
+    catalog = FileCatalog('test', catalog_path)
+    assert catalog.check(path, st) == NEW
+    catalog.mark(path, st)
+    catalog.close()
+
+    catalog = FileCatalog('test', catalog_path)
+    assert catalog.check(path, st) == UNCHANGED
+
+def test_changed_content(tmp_path, catalog_path):
+    path, st = write(tmp_path / "a.pdf", "report A")
+    catalog = FileCatalog('test', catalog_path)
+    catalog.check(path, st)
+    catalog.mark(path, st)
+    path, st = write(tmp_path / "a.pdf", "report A, re-measured")
+    assert catalog.check(path, st) == CHANGED
+
+def test_touched_but_same_content_is_unchanged(tmp_path, catalog_path):
+    path, st = write(tmp_path / "a.pdf", "report A")
+    catalog = FileCatalog('test', catalog_path)
+    catalog.check(path, st)
+    catalog.mark(path, st)
+    os.utime(path, (st.st_atime + 60, st.st_mtime + 60))
+    assert catalog.check(path, os.stat(path)) == UNCHANGED
+
+def test_seeded_path_is_unchanged(tmp_path, catalog_path):
+    path, st = write(tmp_path / "a.pdf", "report A")
+    catalog = FileCatalog('test', catalog_path)
+    assert catalog.seed({path}) == 1
+    assert catalog.check(path, st) == UNCHANGED
+
+def test_copy_of_a_seeded_path_is_a_duplicate(tmp_path, catalog_path):
+    # Paths seeded from the DB come without a hash: it is taken when the file is first seen
+    path, st = write(tmp_path / "a.pdf", "report A")
+    copy, copy_st = write(tmp_path / "copy.pdf", "report A")
+    catalog = FileCatalog('test', catalog_path)
+    catalog.seed({path})
+    assert catalog.check(path, st) == UNCHANGED
+    assert catalog.check(copy, copy_st) == DUPLICATE
+    catalog.close()
+
+    catalog = FileCatalog('test', catalog_path)
+    assert catalog.check(path, st) == UNCHANGED
+    assert catalog.entries[path][2] == file_catalog.file_hash(path)
+
+def test_second_check_of_a_new_path_stays_new(tmp_path, catalog_path):
+    path, st = write(tmp_path / "a.pdf", "report A")
+    catalog = FileCatalog('test', catalog_path)
+    assert catalog.check(path, st) == NEW
+    assert catalog.check(path, st) == NEW
+    assert path not in catalog
+
+def test_check_without_record_changes_nothing(tmp_path, catalog_path):
+    path, st = write(tmp_path / "a.pdf", "report A")
+    copy, copy_st = write(tmp_path / "copy.pdf", "report A")
+    catalog = FileCatalog('test', catalog_path)
+    assert catalog.check(path, st, record=False) == NEW
+    assert catalog.hashes == {} and catalog.digests == {}
+    # Nothing was claimed, so the copy is NEW too
+    assert catalog.check(copy, copy_st, record=False) == NEW
+
+def test_copy_is_recorded_with_its_owner(tmp_path, catalog_path):
+    path, st = write(tmp_path / "a.pdf", "report A")
+    copy, copy_st = write(tmp_path / "copy.pdf", "report A")
+    catalog = FileCatalog('test', catalog_path)
+    assert catalog.check(path, st) == NEW
+    assert catalog.check(copy, copy_st) == DUPLICATE
+    # Held back until the owner's rows are committed
+    assert copy not in catalog
+    catalog.mark(path, st)
+    catalog.close()
+
+    catalog = FileCatalog('test', catalog_path)
+    assert path in catalog and copy in catalog
+    assert catalog.check(copy, copy_st) == UNCHANGED
+
+def test_copy_of_committed_content_is_recorded_right_away(tmp_path, catalog_path):
+    path, st = write(tmp_path / "a.pdf", "report A")
+    catalog = FileCatalog('test', catalog_path)
+    catalog.check(path, st)
+    catalog.mark(path, st)
+    copy, copy_st = write(tmp_path / "copy.pdf", "report A")
+    assert catalog.check(copy, copy_st) == DUPLICATE
+    assert copy in catalog
+
+def test_failed_import_is_retried_with_its_copies(tmp_path, catalog_path):
+    path, st = write(tmp_path / "a.pdf", "report A")
+    copy, copy_st = write(tmp_path / "copy.pdf", "report A")
+    catalog = FileCatalog('test', catalog_path)
+    catalog.check(path, st)
+    catalog.check(copy, copy_st)
+    assert catalog.release(path) == [copy]
+    catalog.close()
+
+    # Neither counts as imported: the next run imports one of them and records the other as a copy
+    catalog = FileCatalog('test', catalog_path)
+    assert catalog.check(copy, copy_st) == NEW
+    assert catalog.check(path, st) == DUPLICATE
+    catalog.mark(copy, copy_st)
+    assert path in catalog
+
+def test_released_claim_frees_the_content_in_the_same_run(tmp_path, catalog_path):
+    path, st = write(tmp_path / "a.pdf", "report A")
+    copy, copy_st = write(tmp_path / "copy.pdf", "report A")
+    catalog = FileCatalog('test', catalog_path)
+    catalog.check(path, st)
+    catalog.release(path)
+    assert catalog.check(copy, copy_st) == NEW
+
+def test_without_dedup_a_copy_is_new(tmp_path, catalog_path, monkeypatch):
+    monkeypatch.setattr(file_catalog, 'DEDUP_BY_CONTENT', False)
+    path, st = write(tmp_path / "a.pdf", "report A")
+    copy, copy_st = write(tmp_path / "copy.pdf", "report A")
+    catalog = FileCatalog('test', catalog_path)
+    assert catalog.check(path, st) == NEW
+    assert catalog.check(copy, copy_st) == NEW
+
+def test_catalog_and_scanner_share_the_catalog_file(tmp_path, catalog_path):
+    path, st = write(tmp_path / "a.pdf", "report A")
+    catalog = FileCatalog('test', catalog_path)
+    catalog.seed({path})
+    # Takes today's stat as the baseline: an uncommitted write on the catalog file
+    assert catalog.check(path, st) == UNCHANGED
+    scanner = DirScanner('test', catalog_path=catalog_path)
+    list(scanner.walk(str(tmp_path)))
+    scanner.commit()  # Used to fail with 'database is locked' after 5 s
+    scanner.close()
+    catalog.close()
+    assert FileCatalog('test', catalog_path).entries[path][0] == st.st_size
+
+def test_catalogs_of_several_importers_share_the_catalog_file(tmp_path, catalog_path):
+    # import_lab_data keeps one catalog per importer open on the same file
+    a, a_st = write(tmp_path / "a.pdf", "report A")
+    b, b_st = write(tmp_path / "b.pdf", "report B")
+    first, second = FileCatalog('first', catalog_path), FileCatalog('second', catalog_path)
+    first.seed({a})
+    second.seed({b})
+    assert first.check(a, a_st) == UNCHANGED
+    assert second.check(b, b_st) == UNCHANGED  # Used to fail with 'database is locked'
+    first.close()
+    second.close()
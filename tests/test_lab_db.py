@@ -0,0 +1,67 @@
+"""UnitOfWork: a failed file is rolled back on its own (sqlite savepoints stand in for SQL Server's)."""
+import sqlite3
+
+import pytest
+
+import lab_db
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(lab_db, 'SAVEPOINT_SQL', "SAVEPOINT {name}")
+    monkeypatch.setattr(lab_db, 'ROLLBACK_TO_SAVEPOINT_SQL', "ROLLBACK TO {name}")
+    conn = sqlite3.connect(str(tmp_path / "db.sqlite"))
+    conn.execute("CREATE TABLE rows (path TEXT, value REAL)")
+    conn.commit()
+    yield conn
+    conn.close()
+
+def write_file(path, values, fail=False):
+    def func(cursor):
+        written = lab_db.bulk_insert(cursor, 'rows', ['path', 'value'], [(path, v) for v in values])
+        if fail:
+            raise ValueError("bad row")
+        return written
+    return func
+
+def stored(conn):
+    return sorted(conn.execute("SELECT path, value FROM rows").fetchall())
+
+def test_failed_file_is_rolled_back_alone(conn):
+    committed, rolled_back = [], []
+    unit = lab_db.UnitOfWork(conn, 10, on_commit=committed.extend, on_rollback=rolled_back.extend)
+    assert unit.write('a', write_file('a', [1, 2])) == 2
+    with pytest.raises(ValueError):
+        unit.write('b', write_file('b', [3], fail=True))
+    unit.write('c', write_file('c', [4]))
+    unit.commit()
+
+    assert stored(conn) == [('a', 1), ('a', 2), ('c', 4)]
+    assert committed == ['a', 'c']
+    assert rolled_back == []
+    assert (unit.rows, unit.files, unit.commits) == (3, 2, 1)
+
+def test_failed_first_file_rolls_back_the_empty_transaction(conn):
+    committed = []
+    unit = lab_db.UnitOfWork(conn, 10, on_commit=committed.extend)
+    with pytest.raises(ValueError):
+        unit.write('a', write_file('a', [1], fail=True))
+    unit.write('b', write_file('b', [2]))
+    unit.commit()
+    assert stored(conn) == [('b', 2)]
+    assert committed == ['b']
+
+def test_commits_every_files_per_commit(conn):
+    committed = []
+    unit = lab_db.UnitOfWork(conn, 2, on_commit=lambda keys: committed.append(list(keys)))
+    for key in 'abc':
+        unit.write(key, write_file(key, [1]))
+    assert committed == [['a', 'b']]
+    unit.commit()
+    assert committed == [['a', 'b'], ['c']]
+
+def test_file_without_rows_is_not_committed(conn):
+    committed = []
+    unit = lab_db.UnitOfWork(conn, 10, on_commit=committed.extend)
+    assert unit.write('a', write_file('a', [])) == 0
+    unit.commit()
+    assert committed == []
@@ -0,0 +1,91 @@
+"""DirScanner: unchanged folders are skipped, retry_later and RESCAN_DAYS list them again."""
+import os
+import sqlite3
+
+import pytest
+
+import lab_scanner
+from lab_scanner import DirScanner
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "Lab_Data"
+    for folder in ("Surfcom/ASSY", "Surfcom/LINE", "CMM"):
+        (root / folder).mkdir(parents=True)
+        (root / folder / "report.pdf").write_text(folder)
+    return str(root)
+
+def scan(tree, catalog_path, **kwargs):
+    scanner = DirScanner('test', catalog_path=catalog_path, **kwargs)
+    files = sorted(os.path.relpath(e.path, tree) for folder, entries in scanner.walk(tree) for e in entries)
+    return scanner, files
+
+def test_unchanged_folders_are_skipped(tree, tmp_path):
+    catalog = str(tmp_path / "catalog.db")
+    scanner, files = scan(tree, catalog)
+    assert len(files) == 3
+    assert scanner.dirs_listed == 5
+    scanner.commit()
+    scanner.close()
+
+    scanner, files = scan(tree, catalog)
+    assert files == []
+    assert (scanner.dirs_listed, scanner.dirs_skipped) == (0, 5)
+
+def test_changed_folder_is_listed(tree, tmp_path):
+    catalog = str(tmp_path / "catalog.db")
+    scanner, files = scan(tree, catalog)
+    scanner.commit()
+    new_file = os.path.join(tree, "CMM", "new.asc")
+    with open(new_file, 'w') as f:
+        f.write("1;;")
+    folder = os.path.dirname(new_file)
+    st = os.stat(folder)
+    os.utime(folder, (st.st_atime, st.st_mtime + 10))  # Coarse mtime resolution on some file systems
+
+    scanner, files = scan(tree, catalog)
+    assert files == [os.path.join("CMM", "new.asc"), os.path.join("CMM", "report.pdf")]
+
+def test_retry_later_lists_the_folder_again(tree, tmp_path):
+    catalog = str(tmp_path / "catalog.db")
+    scanner, files = scan(tree, catalog)
+    scanner.retry_later(os.path.join(tree, "Surfcom", "ASSY", "report.pdf"))
+    scanner.commit()
+
+    scanner, files = scan(tree, catalog)
+    assert files == [os.path.join("Surfcom", "ASSY", "report.pdf")]
+    scanner.commit()
+    scanner, files = scan(tree, catalog)
+    assert files == []
+
+def test_old_listing_is_refreshed(tree, tmp_path, monkeypatch):
+    catalog = str(tmp_path / "catalog.db")
+    scanner, files = scan(tree, catalog)
+    scanner.commit()
+    scanner.close()
+    conn = sqlite3.connect(catalog)
+    conn.execute("UPDATE dirs SET listed_at = listed_at - 8 * 86400 WHERE path = ?", (os.path.join(tree, "CMM"),))
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(lab_scanner, 'RESCAN_DAYS', 7)
+    scanner, files = scan(tree, catalog)
+    assert files == [os.path.join("CMM", "report.pdf")]
+
+def test_without_skipping_every_folder_is_listed(tree, tmp_path):
+    catalog = str(tmp_path / "catalog.db")
+    scanner, files = scan(tree, catalog)
+    scanner.commit()
+    scanner, files = scan(tree, catalog, skip_unchanged=False)
+    assert len(files) == 3
+
+def test_descend_rule_prunes_subtrees(tree, tmp_path):
+    scanner, files = scan(tree, str(tmp_path / "catalog.db"), descend=lab_scanner.descend_within("surfcom", 0))
+    assert files == [os.path.join("Surfcom", "ASSY", "report.pdf"), os.path.join("Surfcom", "LINE", "report.pdf")]
+    assert scanner.dirs_pruned == 1
+    assert scanner.pruned == [os.path.join(tree, "CMM")]
+
+def test_descend_rule_without_depth_enters_every_folder(tree, tmp_path):
+    scanner, files = scan(tree, str(tmp_path / "catalog.db"), descend=lab_scanner.descend_within("surfcom", None))
+    assert len(files) == 3
+    assert scanner.pruned == []
@@ -0,0 +1,97 @@
+"""The raw-text fast path must give the words and text pdfplumber gives for the same regions."""
+import random
+from datetime import datetime
+
+import pytest
+
+import pdf_fasttext
+from bench_ingest import ch_assy_lines, ch_line_lines, surfcom_lines, write_pdf
+from pdf_fasttext import FALLBACK, FAST, HitCounter, open_report
+from pdf_templates import ReportTemplate, get_template
+from watch_lab_data import load_script
+
+STAMP = datetime(2025, 6, 24, 13, 21)
+REPORTS = {
+    'surfcom': lambda rng: surfcom_lines(rng, STAMP),
+    'ch_assy': lambda rng: ch_assy_lines(rng, STAMP, exhaust=True),
+    'ch_line': lambda rng: ch_line_lines(rng, STAMP),
+}
+
+def report_pdf(tmp_path, name, seed=0):
+    path = str(tmp_path / f"{name} {seed}.pdf")
+    write_pdf(path, REPORTS[name](random.Random(seed)))
+    return path
+
+def regions(path, template, fast):
+    """(extractor, [(text, [(word, x0, top) per line]) per page and role])."""
+    parsed = []
+    with open_report(path, template, fast=fast) as (pages, extractor):
+        for page in template.select(pages):
+            for role in template.regions:
+                lines = [[(w['text'], round(w['x0'], 2), round(w['top'], 2)) for w in words]
+                         for words, text in template.lines(page, role)]
+                parsed.append((template.text(page, role), lines))
+    return extractor, parsed
+
+@pytest.mark.parametrize('name', sorted(REPORTS))
+@pytest.mark.parametrize('seed', [0, 1])
+def test_fast_path_matches_pdfplumber(tmp_path, name, seed):
+    path = report_pdf(tmp_path, name, seed)
+    template = get_template(name)
+    fast_extractor, fast = regions(path, template, fast=True)
+    slow_extractor, slow = regions(path, template, fast=False)
+    assert (fast_extractor, slow_extractor) == (FAST, FALLBACK)
+    assert fast == slow
+
+def test_read_ahead_data_uses_the_fast_path(tmp_path):
+    path = report_pdf(tmp_path, 'surfcom')
+    with open(path, 'rb') as f:
+        data = f.read()
+    template = get_template('surfcom')
+    with open_report(path, template, data=data) as (pages, extractor):
+        assert extractor == FAST
+
+def test_missing_labels_fall_back_to_pdfplumber(tmp_path):
+    path = report_pdf(tmp_path, 'surfcom')
+    template = ReportTemplate('other', {'values': (0.0, 0.0, 1.0, 1.0)}, labels=r"Journal \d+")
+    with open_report(path, template) as (pages, extractor):
+        assert extractor == FALLBACK
+
+def test_rotated_text_falls_back_to_pdfplumber(tmp_path):
+    # A vertical stamp in the margin: the fast path only takes upright text, pdfplumber parses the page
+    surfcom = load_script('extract_surfcomV2Gemini.py')
+    plain = report_pdf(tmp_path, 'surfcom')
+    stamped = str(tmp_path / "stamped.pdf")
+    write_pdf(stamped, REPORTS['surfcom'](random.Random(0)) + [(580, 300, "CONTROLLED COPY", (0, 1, -1, 0))])
+    rows, extractor = surfcom.parse_measurements(stamped)
+    assert extractor == FALLBACK
+    assert rows == surfcom.parse_measurements(plain)[0]
+
+def test_surfcom_rows_match(tmp_path, monkeypatch):
+    surfcom = load_script('extract_surfcomV2Gemini.py')
+    path = report_pdf(tmp_path, 'surfcom')
+    fast_rows, fast_extractor = surfcom.parse_measurements(path)
+    monkeypatch.setattr(pdf_fasttext, 'FAST_TEXT', False)
+    slow_rows, slow_extractor = surfcom.parse_measurements(path)
+    assert (fast_extractor, slow_extractor) == (FAST, FALLBACK)
+    assert fast_rows and fast_rows == slow_rows
+
+@pytest.mark.parametrize('name, script, parse', [
+    ('ch_assy', 'CMM_WalkCHGemini.py', 'extract_pdf_data'),
+    ('ch_line', 'CMM_WalkCHGemini CHAINCASE HEAD.py', 'extract_line_pdf_data'),
+])
+def test_ch_regions_give_the_full_page_rows(tmp_path, name, script, parse):
+    parse = getattr(load_script(script), parse)
+    path = report_pdf(tmp_path, name)
+    template = get_template(name)
+    rows, date, extractor = parse(path, template)
+    assert extractor == FAST
+    assert rows and date == f"{STAMP:%Y/%m/%d}"
+    assert (rows, date) == parse(path, template.full_page())[:-1]
+
+def test_hit_counter():
+    hits = HitCounter()
+    for extractor in (FAST, FAST, FALLBACK):
+        hits.record('surfcom', extractor)
+    assert hits.summary() == "surfcom: 2/3 fast (67%)"
+    assert hits.totals() == {'surfcom_fast': 2, 'surfcom_pdfplumber': 1}
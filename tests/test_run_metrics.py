@@ -0,0 +1,106 @@
+"""RunMetrics: exclusive stage timers, counters and the run report."""
+import json
+import sqlite3
+
+import pytest
+
+import run_metrics
+from run_metrics import RunMetrics, TimedCall
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def perf_counter(self):
+        return self.now
+
+    def tick(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(run_metrics, 'time', clock)
+    return clock
+
+def seconds(metrics, stage, detail=''):
+    return metrics.timers[(stage, detail)][1]
+
+def calls(metrics, stage, detail=''):
+    return metrics.timers[(stage, detail)][0]
+
+def test_nested_timers_are_exclusive(clock):
+    metrics = RunMetrics('test')
+    with metrics.timer('walk'):
+        clock.tick(1)
+        with metrics.timer('stat'):
+            clock.tick(2)
+        clock.tick(3)
+        with metrics.timer('stat'):
+            with metrics.timer('db', 'execute'):
+                clock.tick(4)
+            clock.tick(0.5)
+    assert seconds(metrics, 'walk') == 4
+    assert seconds(metrics, 'stat') == 2.5
+    assert seconds(metrics, 'db', 'execute') == 4
+    assert (calls(metrics, 'walk'), calls(metrics, 'stat'), calls(metrics, 'db', 'execute')) == (1, 2, 1)
+    clock.tick(1)
+    report = metrics.report()
+    assert report['wall_seconds'] == 11.5
+    assert sum(s['seconds'] for s in report['stages']) == 10.5
+
+def test_timed_iter_times_only_the_producer(clock):
+    metrics = RunMetrics('test')
+    def produce():
+        for i in range(3):
+            clock.tick(1)
+            yield i
+    for item in metrics.timed_iter('walk', produce()):
+        clock.tick(10)  # Consumer work is not walk time
+    assert seconds(metrics, 'walk') == 3
+    assert calls(metrics, 'walk') == 4  # The last call ends the iteration
+
+def test_add_and_counters(clock):
+    metrics = RunMetrics('test')
+    metrics.add('parse', 1.5, 'surfcom/fast')
+    metrics.add('parse', 0.5, 'surfcom/fast', calls=2)
+    metrics.count('new')
+    metrics.update({'new': 2, 'rows_written': 40})
+    assert metrics.timers[('parse', 'surfcom/fast')] == [3, 2.0]
+    assert metrics.counters == {'new': 3, 'rows_written': 40}
+    assert metrics.summary() == "parse 2.0s"
+
+def test_timed_call():
+    result, elapsed = TimedCall(sum)([1, 2, 3])
+    assert result == 6 and elapsed >= 0
+
+def test_timed_connection(clock, tmp_path):
+    metrics = RunMetrics('test')
+    conn = metrics.connection(sqlite3.connect(str(tmp_path / "db.sqlite")))
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE t (x)")
+    cursor.executemany("INSERT INTO t VALUES (?)", [(1,), (2,)])
+    conn.commit()
+    assert cursor.execute("SELECT COUNT(*) FROM t").fetchall() == [(2,)]
+    assert calls(metrics, 'db', 'execute') == 2
+    assert calls(metrics, 'db', 'executemany') == 1
+    assert calls(metrics, 'db', 'fetch') == 1
+    assert calls(metrics, 'commit') == 1
+    conn.close()
+
+def test_write_report_and_prometheus(clock, tmp_path):
+    metrics = RunMetrics('surfcom')
+    with metrics.timer('walk'):
+        clock.tick(2)
+    metrics.count('new', 5)
+    paths = metrics.write(str(tmp_path / "reports"), str(tmp_path))
+    assert len(paths) == 2
+    with open(paths[0]) as f:
+        report = json.load(f)
+    assert report['run'] == 'surfcom'
+    assert report['stages'] == [{'stage': 'walk', 'detail': '', 'calls': 1, 'seconds': 2.0}]
+    assert report['counters'] == {'new': 5}
+    with open(paths[1]) as f:
+        prom = f.read()
+    assert 'lab_import_stage_seconds{run="surfcom",stage="walk",detail=""} 2.0' in prom
+    assert 'lab_import_count{run="surfcom",name="new"} 5' in prom
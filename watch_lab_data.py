@@ -0,0 +1,252 @@
+"""
+Watch-folder service: keeps the SQL tables within seconds of the Rear Cover and Cam Housing folders.
+
+Runs until stopped (Ctrl+C). Each cycle lists only folders whose mtime changed (lab_scanner),
+so polling a large tree is cheap. New or changed files are held until their size and mtime
+have been stable for SETTLE_SECONDS (reports are often still being written/synced), then
+handed to the same import_file() functions the batch importers use:
+    .asc under the Rear Cover root        -> CMM_WalkV3Gemini
+    EX/IN PDFs in ASSY folders            -> CMM_WalkCHGemini
+    Chain Case / Head PDFs in LINE folders -> CMM_WalkCHGemini CHAINCASE HEAD
+    PDFs in Surfcom folders                -> extract_surfcomV2Gemini
+Every importer keeps its own catalog entries, so running the batch scripts by hand still works.
+
+If the optional 'watchdog' package is installed, change notifications wake the loop
+immediately on local folders; UNC shares (\\\\server\\...) are always polled.
+"""
+import importlib.util
+import os
+import threading
+import time
+from datetime import datetime
+
+import lab_db
+from file_catalog import DUPLICATE, SKIP, open_catalog
+from lab_scanner import DirScanner
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+# --- CONFIGURATION ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+POLL_SECONDS = 30      # Full poll interval (also the fallback when notifications are unavailable)
+SETTLE_SECONDS = 5     # A file must keep the same size/mtime this long before it is ingested
+RETRY_SECONDS = 60     # A file that failed to import is tried again after this, doubling per failure
+MAX_RETRY_SECONDS = 3600
+USE_NOTIFICATIONS = True
+WATCH_EXTENSIONS = ('.asc', '.pdf')
+
+def log(message):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}", flush=True)
+
+def load_script(file_name):
+    """Imports an importer script by file name (some have spaces, so a plain import does not work)."""
+    module_name = os.path.splitext(file_name)[0].replace(' ', '_')
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPT_DIR, file_name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def within(path, root):
+    """True when path is root or below it (case-insensitive on Windows)."""
+    path, root = os.path.normcase(path), os.path.normcase(root).rstrip(os.sep)
+    return path == root or path.startswith(root + os.sep)
+
+class Route:
+    """One importer: which files it takes, how to ingest one, and its catalog."""
+    def __init__(self, name, catalog, matches, ingest):
+        self.name = name
+        self.catalog = catalog
+        self.matches = matches
+        self.ingest = ingest  # (path, status, stat, content hash) -> rows written
+
+def build_routes(cursor):
+    cmm = load_script('CMM_WalkV3Gemini.py')
+    ch_assy = load_script('CMM_WalkCHGemini.py')
+    ch_line = load_script('CMM_WalkCHGemini CHAINCASE HEAD.py')
+    surfcom = load_script('extract_surfcomV2Gemini.py')
+
+    def pdf_route(module, ingest):
+        # Same rule as import_lab_data: a file is only routed to an importer below that importer's root
+        return Route(
+            module.CATALOG_NAME,
+            open_catalog(module.CATALOG_NAME,
+                         lambda: lab_db.load_imported_paths(cursor, module.DB_TABLE, hash_column=module.HASH_COLUMN)),
+            lambda path: within(path, module.ROOT_PATH) and module.is_target_file(path),
+            ingest,
+        )
+
+    routes = [
+        Route(
+            cmm.CATALOG_NAME,
+            open_catalog(cmm.CATALOG_NAME, cmm.load_db_paths),
+            lambda path: path.lower().endswith('.asc') and within(path, cmm.ROOT_DIRECTORY),
+            cmm.import_file,
+        ),
+        pdf_route(ch_assy, lambda path, status, st, digest: ch_assy.import_file(cursor, path, status, digest)),
+        pdf_route(ch_line, lambda path, status, st, digest: ch_line.import_file(cursor, path, status, digest)),
+        # The stat from the settle check saves the date fallback another round trip
+        pdf_route(surfcom, lambda path, status, st, digest: surfcom.import_file(cursor, path, status, st, digest)),
+    ]
+    roots = [cmm.ROOT_DIRECTORY, ch_assy.ROOT_PATH]
+    return routes, roots
+
+def start_notifications(roots, wake):
+    """Wakes the poll loop on file events. Returns the observer, or None when polling only."""
+    if not (USE_NOTIFICATIONS and Observer):
+        return None
+
+    class Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            if not event.is_directory and str(event.src_path).lower().endswith(WATCH_EXTENSIONS):
+                wake.set()
+
+    observer = Observer()
+    watched = 0
+    for root in roots:
+        if root.startswith('\\\\'):
+            log(f"{root} is a network share, polling only.")
+            continue
+        observer.schedule(Handler(), root, recursive=True)
+        watched += 1
+    if not watched:
+        return None
+    observer.start()
+    return observer
+
+class Watcher:
+    def __init__(self, conn, routes, roots):
+        self.conn = conn
+        self.routes = routes
+        self.scanners = [(root, DirScanner(f"watch:{root}")) for root in roots]
+        self.pending = {}  # path -> (size, mtime, stable_since)
+        self.failures = {}  # path -> failed imports in a row, for the retry backoff
+
+    def discover(self):
+        """Lists changed folders and queues every watched file in them for the settle check."""
+        now = time.time()
+        for root, scanner in self.scanners:
+            for folder, entries in scanner.walk(root):
+                for entry in entries:
+                    if entry.path in self.pending or not entry.name.lower().endswith(WATCH_EXTENSIONS):
+                        continue
+                    routes = [r for r in self.routes if r.matches(entry.path)]
+                    if not routes:
+                        continue
+                    st = entry.stat()
+                    # Files already imported by every importer that wants them are not queued.
+                    # Only a look: the file may still be written, ingest() checks it for real.
+                    if all(r.catalog.check(entry.path, st, record=False) in SKIP for r in routes):
+                        continue
+                    self.pending[entry.path] = (st.st_size, st.st_mtime, now)
+
+    def ingest_settled(self):
+        now = time.time()
+        for path, (size, mtime, since) in list(self.pending.items()):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                del self.pending[path]  # Temp file renamed or deleted
+                continue
+            if (st.st_size, st.st_mtime) != (size, mtime):
+                self.pending[path] = (st.st_size, st.st_mtime, now)  # Still being written
+                continue
+            if now - since < SETTLE_SECONDS:
+                continue
+            del self.pending[path]
+            self.ingest(path, st)
+
+    def retry(self, path):
+        """Queues a file again after a failed import, waiting longer after every failure."""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return
+        failures = self.failures.get(path, 0) + 1
+        self.failures[path] = failures
+        delay = min(RETRY_SECONDS * 2 ** (failures - 1), MAX_RETRY_SECONDS)
+        # stable_since in the future: ingest_settled waits for the delay plus SETTLE_SECONDS
+        self.pending[path] = (st.st_size, st.st_mtime, time.time() + delay)
+
+    def ingest(self, path, st):
+        imported = True
+        for route in self.routes:
+            if not route.matches(path):
+                continue
+            status = route.catalog.check(path, st)
+            if status == DUPLICATE:
+                route.catalog.commit()
+                log(f"{route.name}: {os.path.basename(path)} is a copy of an imported file, skipped")
+            if status in SKIP:
+                continue
+            try:
+                # The hash taken by check() is reused for the rows and for mark()
+                rows = route.ingest(path, status, st, route.catalog.digest(path))
+                self.conn.commit()
+            except Exception as e:
+                self.conn.rollback()
+                log(f"{route.name}: error importing {os.path.basename(path)}: {e}")
+                rows = 0
+            if rows:
+                route.catalog.mark(path, st)
+                route.catalog.commit()
+                log(f"{route.name}: imported {os.path.basename(path)} ({rows} rows, {status})")
+            else:
+                # Kept pending (so save_state keeps its folder unsaved) and retried with a backoff,
+                # together with the copies the catalog held back for it
+                imported = False
+                for copy in route.catalog.release(path):
+                    self.retry(copy)
+        if imported:
+            self.failures.pop(path, None)
+        else:
+            self.retry(path)
+
+    def save_state(self):
+        # Folders with files still settling must be listed again after a restart
+        for root, scanner in self.scanners:
+            for path in self.pending:
+                scanner.retry_later(path)
+            scanner.commit()
+
+    def run(self, wake):
+        while True:
+            self.discover()
+            self.ingest_settled()
+            self.save_state()
+            # Come back quickly while files are settling, otherwise wait for an event or the next poll
+            timeout = SETTLE_SECONDS if self.pending else POLL_SECONDS
+            if wake.wait(timeout):
+                wake.clear()
+                time.sleep(SETTLE_SECONDS)  # Debounce bursts of events (e.g. a folder copy)
+
+    def close(self):
+        for root, scanner in self.scanners:
+            scanner.close()
+        for route in self.routes:
+            route.catalog.close()
+
+def main():
+    conn = lab_db.connect()
+    routes, roots = build_routes(conn.cursor())
+    wake = threading.Event()
+    observer = start_notifications(roots, wake)
+    log(f"Watching {', '.join(roots)} ({'notifications + polling' if observer else 'polling'} every {POLL_SECONDS}s)")
+
+    watcher = Watcher(conn, routes, roots)
+    try:
+        watcher.run(wake)
+    except KeyboardInterrupt:
+        log("Stopping.")
+    finally:
+        if observer:
+            observer.stop()
+            observer.join()
+        watcher.close()
+        conn.close()
+
+if __name__ == "__main__":
+    main()